@@ -0,0 +1,150 @@
+"""Benchmark JSON store serialisation per codec.
+
+Builds synthetic stores shaped like the real ones (stats, tickets, MAC bans,
+tags, server config), then times ``save_data`` and ``load_data`` for each
+codec/format combination and prints the file size. "json pretty" is the
+previous behaviour (stdlib, indent=4).
+
+Usage:
+    python benchmarks/json_codec.py
+    python benchmarks/json_codec.py --users 100000 500000 --repeat 5
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def build_stats(user_count, guild_count):
+    return {
+        str(100_000_000_000_000_000 + user_id): {
+            "xp": round(random.random() * 5000, 2),
+            "servers": {
+                str(900_000_000_000_000_000 + guild): {
+                    "messages": random.randrange(5000),
+                    "media": random.randrange(200),
+                    "voiceminutes": random.randrange(3000),
+                }
+                for guild in random.sample(range(guild_count), k=min(guild_count, random.randint(1, 3)))
+            },
+            "level": random.randrange(80),
+        }
+        for user_id in range(user_count)
+    }
+
+
+def build_tickets(guild_count, tickets_per_guild):
+    now = datetime.datetime.utcnow().isoformat()
+    return {
+        str(900_000_000_000_000_000 + guild): {
+            str(100_000_000_000_000_000 + user): {
+                "channel_id": 800_000_000_000_000_000 + guild * tickets_per_guild + user,
+                "ticket_id": f"{user:08x}",
+                "status": random.choice(["Open", "Closed"]),
+                "created_at": now,
+                "last_activity": now,
+                "assigned_to": None,
+                "feedback": None,
+            }
+            for user in range(tickets_per_guild)
+        }
+        for guild in range(guild_count)
+    }
+
+
+def build_mac_bans(ban_count):
+    now = datetime.datetime.utcnow().isoformat()
+    return {
+        str(100_000_000_000_000_000 + user): {
+            "id": 100_000_000_000_000_000 + user,
+            "name": f"user{user}",
+            "bandate": now,
+            "reason": "Raiding and spamming invite links across several servers",
+            "serverid": 900_000_000_000_000_000,
+            "servername": "Example Server",
+            "bannedby": "moderator (123456789012345678)",
+        }
+        for user in range(ban_count)
+    }
+
+
+def build_tags(guild_count, tags_per_guild):
+    return {
+        str(900_000_000_000_000_000 + guild): {f"tag{tag}": "Some tag content. " * 8 for tag in range(tags_per_guild)}
+        for guild in range(guild_count)
+    }
+
+
+def build_server_config(guild_count):
+    return {
+        str(900_000_000_000_000_000 + guild): {
+            "logchannel": 700_000_000_000_000_000 + guild,
+            "ticketrole": 600_000_000_000_000_000 + guild,
+            "antispam": True,
+            "antiwebhook": True,
+            "logging_events": {"message_delete": True, "member_join": True, "voice": False},
+        }
+        for guild in range(guild_count)
+    }
+
+
+def time_best(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--guilds", type=int, default=500)
+    parser.add_argument("--tickets-per-guild", type=int, default=40)
+    parser.add_argument("--bans", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement, best is reported")
+    args = parser.parse_args()
+
+    import handlers.config as config
+
+    random.seed(1)
+    workdir = tempfile.mkdtemp(prefix="maggibot-bench-")
+    os.chdir(workdir)
+
+    stores = [(f"stats ({users} users)", config.STATS_FILE, build_stats(users, args.guilds)) for users in args.users]
+    stores += [
+        (f"tickets ({args.guilds * args.tickets_per_guild})", config.TICKET_DATA_FILE,
+         build_tickets(args.guilds, args.tickets_per_guild)),
+        (f"mac bans ({args.bans})", config.MAC_FILE, build_mac_bans(args.bans)),
+        (f"tags ({args.guilds * 20})", config.TAGS_CONFIG_FILE, build_tags(args.guilds, 20)),
+        (f"server config ({args.guilds})", config.SERVER_CONFIG_FILE, build_server_config(args.guilds)),
+    ]
+
+    codecs = [("json", False), ("json", True)]
+    if config.orjson is not None:
+        codecs = [("orjson", False), ("orjson", True)] + codecs
+    else:
+        print("orjson is not installed; only the stdlib codec is measured\n")
+
+    print(f"{'store':<24} | {'codec':<14} | {'save ms':>9} | {'load ms':>9} | {'size KiB':>9}")
+    print("-" * 77)
+    for label, filename, data in stores:
+        for codec_name, pretty in codecs:
+            config.codec = config.get_codec(codec_name)
+            config.JSON_PRETTY = pretty
+            save = time_best(lambda: config.save_data(filename, data, mkdir=True), args.repeat)
+            load = time_best(lambda: config.load_data(filename, default=dict), args.repeat)
+            size = os.path.getsize(filename) / 1024
+            name = f"{codec_name} {'pretty' if pretty else 'compact'}"
+            print(f"{label:<24} | {name:<14} | {save * 1000:>9.1f} | {load * 1000:>9.1f} | {size:>9.0f}")
+        print("-" * 77)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,454 @@
+"""Replay synthetic message streams through the real on_message listeners.
+
+Loads the cogs that listen to ``on_message`` into an unconnected bot, builds
+fake messages, members, channels and guilds, and awaits every listener in turn
+for each message, the same work the gateway dispatch schedules. Discord API
+calls (sends, reactions, webhook lookups, ...) are local no-ops, optionally
+delayed by ``--api-latency``, so nothing touches the network. Data files live
+in a throwaway directory.
+
+Reports p50/p99 latency per listener, per message pipeline stage (only for
+messages the stage ran on) and per message (all listeners together) and the
+resulting throughput for each stream:
+
+    plain      text message in a regular channel
+    media      message with 1-3 image/video attachments
+    mentions   message mentioning 5 users (mass-mention alert path)
+    webhook    message sent through a webhook (webhook protection path)
+    ticket_dm  DM from a user with an open ticket (forwarded to the thread)
+    mixed      weighted mix of the above
+
+For CI, ``--json`` writes the results and ``--baseline`` compares against a
+previous ``--json`` file, exiting with status 1 if any stream's p99 per
+message grew by more than ``--tolerance``.
+
+Usage:
+    python benchmarks/on_message_replay.py
+    python benchmarks/on_message_replay.py --messages 2000 --streams plain media
+    python benchmarks/on_message_replay.py --json current.json --baseline baseline.json --tolerance 0.5
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_COGS = [
+    "cogs.stats.stats",
+    "cogs.protection.antispam",
+    "cogs.server.onlyimages",
+    "cogs.protection.AntiWebhook",
+    "cogs.ticket.ticketsystem",
+]
+STREAMS = ["plain", "media", "mentions", "webhook", "ticket_dm", "mixed"]
+MIXED_WEIGHTS = {"plain": 70, "media": 15, "mentions": 5, "webhook": 5, "ticket_dm": 5}
+
+GUILD_ID = 900_000_000_000_000_001
+GENERAL_CHANNEL_ID = 910_000_000_000_000_001
+BOOSTED_CHANNEL_ID = 910_000_000_000_000_002
+IMAGES_CHANNEL_ID = 910_000_000_000_000_003
+LOG_CHANNEL_ID = 910_000_000_000_000_004
+TICKET_THREAD_BASE = 920_000_000_000_000_000
+BOOST_ROLE_ID = 930_000_000_000_000_001
+WEBHOOK_ID = 940_000_000_000_000_001
+USER_BASE = 100_000_000_000_000_000
+BOT_USER_ID = 999_000_000_000_000_001
+
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Fake Discord Objects
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+api_calls = Counter()
+api_latency = 0.0
+
+
+async def fake_api(name, result=None):
+    api_calls[name] += 1
+    if api_latency:
+        await asyncio.sleep(api_latency)
+    return result
+
+
+class FakeAsset:
+    url = "https://cdn.example.invalid/avatar.png"
+
+
+class FakeRole:
+    def __init__(self, role_id):
+        self.id = role_id
+
+
+class FakeUser:
+    def __init__(self, user_id, bot=False, roles=()):
+        self.id = user_id
+        self.bot = bot
+        self.name = f"user{user_id % 100_000}"
+        self.discriminator = "0"
+        self.display_name = self.name
+        self.mention = f"<@{user_id}>"
+        self.display_avatar = FakeAsset()
+        self.avatar = FakeAsset()
+        self.created_at = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+        self.roles = [FakeRole(GUILD_ID)] + list(roles)
+
+    def __str__(self):
+        return self.name
+
+    async def send(self, *args, **kwargs):
+        return await fake_api("user.send")
+
+
+class FakePermissions:
+    send_messages = True
+    administrator = False
+
+
+class FakeChannel:
+    def __init__(self, channel_id, guild=None, name="general"):
+        self.id = channel_id
+        self.guild = guild
+        self.name = name
+        self.mention = f"<#{channel_id}>"
+
+    def permissions_for(self, member):
+        return FakePermissions()
+
+    async def send(self, *args, **kwargs):
+        return await fake_api("channel.send")
+
+    async def webhooks(self):
+        return await fake_api("channel.webhooks", [FakeWebhook()])
+
+
+class FakeWebhook:
+    id = WEBHOOK_ID
+    name = "Announcements"
+    user = FakeUser(USER_BASE - 1)
+
+    async def delete(self, *args, **kwargs):
+        return await fake_api("webhook.delete")
+
+
+class FakeGuild:
+    def __init__(self, guild_id):
+        self.id = guild_id
+        self.name = "Benchmark Guild"
+        self.icon = FakeAsset()
+        self.me = FakeUser(BOT_USER_ID, bot=True)
+        self.owner = FakeUser(USER_BASE - 2)
+        self.afk_channel = None
+        self.channels = {}
+
+    def get_channel(self, channel_id):
+        return self.channels.get(channel_id)
+
+    async def fetch_channel(self, channel_id):
+        return await fake_api("guild.fetch_channel", self.channels.get(channel_id))
+
+
+def fake_dm_channel_type():
+    import discord
+
+    class FakeDMChannel(discord.DMChannel):
+        def __init__(self, channel_id):
+            self.id = channel_id
+
+    return FakeDMChannel
+
+
+class FakeAttachment:
+    def __init__(self, content_type):
+        self.content_type = content_type
+        self.url = "https://cdn.example.invalid/file"
+
+
+class FakeMessage:
+    _next_id = 1_000_000
+
+    def __init__(self, author, channel, guild, content="", attachments=(), mentions=(), webhook_id=None):
+        import discord
+
+        FakeMessage._next_id += 1
+        self.id = FakeMessage._next_id
+        self.author = author
+        self.channel = channel
+        self.guild = guild
+        self.content = content
+        self.attachments = list(attachments)
+        self.mentions = list(mentions)
+        self.webhook_id = webhook_id
+        self.type = discord.MessageType.default
+
+    async def add_reaction(self, emoji):
+        return await fake_api("message.add_reaction")
+
+    async def delete(self):
+        return await fake_api("message.delete")
+
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# World Setup
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+class World:
+    """Guild, channels, members and the data files the cogs read."""
+
+    def __init__(self, user_count, ticket_count):
+        self.guild = FakeGuild(GUILD_ID)
+        for channel_id, name in (
+            (GENERAL_CHANNEL_ID, "general"),
+            (BOOSTED_CHANNEL_ID, "boosted"),
+            (IMAGES_CHANNEL_ID, "images"),
+            (LOG_CHANNEL_ID, "mod-log"),
+        ):
+            self.guild.channels[channel_id] = FakeChannel(channel_id, self.guild, name)
+        self.members = [
+            FakeUser(USER_BASE + i, roles=[FakeRole(BOOST_ROLE_ID)] if i % 10 == 0 else ())
+            for i in range(user_count)
+        ]
+        self.ticket_users = self.members[:ticket_count]
+        self.threads = {
+            TICKET_THREAD_BASE + i: FakeChannel(TICKET_THREAD_BASE + i, self.guild, f"ticket-{i}")
+            for i in range(ticket_count)
+        }
+        self.dm_channel_type = fake_dm_channel_type()
+
+    def write_data_files(self):
+        guild_id = str(GUILD_ID)
+        files = {
+            "config/serverconfig.json": {
+                guild_id: {
+                    "protection": True,
+                    "protectionlogchannel": LOG_CHANNEL_ID,
+                    "logchannel": LOG_CHANNEL_ID,
+                }
+            },
+            "config/onlyimages.json": {str(IMAGES_CHANNEL_ID): True},
+            "data/xpmultiplier.json": {
+                "channels": [str(BOOSTED_CHANNEL_ID)],
+                "multipliers": {str(BOOST_ROLE_ID): 2.0},
+            },
+            "data/tickets.json": {
+                guild_id: {
+                    str(user.id): {
+                        "channel_id": TICKET_THREAD_BASE + i,
+                        "ticket_id": f"T{i:05d}",
+                        "created_at": "2024-01-01T00:00:00",
+                        "last_activity": "2024-01-01T00:00:00",
+                    }
+                    for i, user in enumerate(self.ticket_users)
+                }
+            },
+        }
+        for path, data in files.items():
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                json.dump(data, f)
+
+    def get_channel(self, channel_id):
+        return self.guild.get_channel(channel_id) or self.threads.get(channel_id)
+
+    def get_user(self, user_id):
+        return next((user for user in self.ticket_users if user.id == user_id), None)
+
+    #=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+    # Message Streams
+    #=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+    def _text_channel(self):
+        return self.guild.channels[random.choice((GENERAL_CHANNEL_ID, GENERAL_CHANNEL_ID, BOOSTED_CHANNEL_ID))]
+
+    def plain(self):
+        return FakeMessage(random.choice(self.members), self._text_channel(), self.guild, content="hello there " * random.randint(1, 8))
+
+    def media(self):
+        attachments = [FakeAttachment(random.choice(("image/png", "video/mp4"))) for _ in range(random.randint(1, 3))]
+        channel = self.guild.channels[random.choice((GENERAL_CHANNEL_ID, IMAGES_CHANNEL_ID))]
+        return FakeMessage(random.choice(self.members), channel, self.guild, content="look", attachments=attachments)
+
+    def mentions(self):
+        mentioned = random.sample(self.members, k=min(5, len(self.members)))
+        content = " ".join(user.mention for user in mentioned)
+        return FakeMessage(random.choice(self.members), self._text_channel(), self.guild, content=content, mentions=mentioned)
+
+    def webhook(self):
+        author = FakeUser(WEBHOOK_ID, bot=True)
+        return FakeMessage(author, self.guild.channels[GENERAL_CHANNEL_ID], self.guild, content="New release!", webhook_id=WEBHOOK_ID)
+
+    def ticket_dm(self):
+        user = random.choice(self.ticket_users)
+        return FakeMessage(user, self.dm_channel_type(user.id), None, content="any update on my ticket?")
+
+    def mixed(self):
+        stream = random.choices(list(MIXED_WEIGHTS), weights=list(MIXED_WEIGHTS.values()))[0]
+        return getattr(self, stream)()
+
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Measurement
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(samples_ns):
+    return {
+        "p50_us": percentile(samples_ns, 0.50) / 1000,
+        "p99_us": percentile(samples_ns, 0.99) / 1000,
+        "per_sec": len(samples_ns) / (sum(samples_ns) / 1e9) if sum(samples_ns) else float("inf"),
+    }
+
+
+stage_samples = None
+
+
+def time_stages(pipeline):
+    """Record the ns each message pipeline stage takes into ``stage_samples``."""
+    def timed(name, run):
+        async def timed_run(ctx):
+            start = time.perf_counter_ns()
+            try:
+                return await run(ctx)
+            finally:
+                if stage_samples is not None:
+                    stage_samples.setdefault(name, []).append(time.perf_counter_ns() - start)
+        return timed_run
+
+    for stage in pipeline.stages:
+        stage.run = timed(stage.name, stage.run)
+
+
+async def replay(listeners, make_message, count, warmup):
+    """Await every listener for ``count`` messages; returns ns samples per
+    listener and pipeline stage and for the whole message."""
+    global stage_samples
+    per_cog = {name: [] for name, _ in listeners}
+    total = []
+    for i in range(warmup + count):
+        stage_samples = per_cog if i >= warmup else None
+        message = make_message()
+        message_ns = 0
+        for name, listener in listeners:
+            start = time.perf_counter_ns()
+            await listener(message)
+            elapsed = time.perf_counter_ns() - start
+            message_ns += elapsed
+            if i >= warmup:
+                per_cog[name].append(elapsed)
+        if i >= warmup:
+            total.append(message_ns)
+    stage_samples = None
+    return per_cog, total
+
+
+def build_bot(world, cogs):
+    import discord
+    from discord.ext import commands
+
+    bot = commands.Bot(command_prefix="!", intents=discord.Intents.all())
+    bot._connection.user = FakeUser(BOT_USER_ID, bot=True)
+    bot.get_channel = world.get_channel
+    bot.get_user = world.get_user
+    bot.get_guild = lambda guild_id: world.guild if guild_id == GUILD_ID else None
+    for extension in cogs:
+        bot.load_extension(extension)
+
+    listeners = [
+        (type(listener.__self__).__name__, listener)
+        for listener in bot._event_handlers.get("on_message", [])
+    ]
+    pipeline = getattr(bot, "message_pipeline", None)
+    if pipeline is not None:
+        time_stages(pipeline)
+    return bot, listeners
+
+
+def compare(results, baseline_path, tolerance):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    regressions = []
+    for stream, result in results.items():
+        before = baseline.get(stream, {}).get("total", {}).get("p99_us")
+        after = result["total"]["p99_us"]
+        if before and after > before * (1 + tolerance):
+            regressions.append(f"{stream}: p99 {before:.1f}us -> {after:.1f}us (+{(after / before - 1) * 100:.0f}%)")
+    return regressions
+
+
+async def run(args):
+    global api_latency
+    api_latency = args.api_latency / 1000
+
+    random.seed(args.seed)
+    world = World(args.users, args.tickets)
+    world.write_data_files()
+    bot, listeners = build_bot(world, args.cogs)
+    print(f"on_message listeners: {', '.join(name for name, _ in listeners)}\n")
+
+    results = {}
+    header = f"{'stream':<10} | {'cog':<36} | {'p50 us':>9} | {'p99 us':>9} | {'msg/s':>10}"
+    print(header)
+    print("-" * len(header))
+    for stream in args.streams:
+        api_calls.clear()
+        per_cog, total = await replay(listeners, getattr(world, stream), args.messages, args.warmup)
+        results[stream] = {
+            "cogs": {name: summarize(samples) for name, samples in per_cog.items()},
+            "total": summarize(total),
+            "api_calls_per_message": {name: calls / (args.messages + args.warmup) for name, calls in api_calls.items()},
+        }
+        for name, summary in list(results[stream]["cogs"].items()) + [("TOTAL", results[stream]["total"])]:
+            print(f"{stream:<10} | {name:<36} | {summary['p50_us']:>9.1f} | {summary['p99_us']:>9.1f} | {summary['per_sec']:>10.0f}")
+        print("-" * len(header))
+
+    for task in asyncio.all_tasks():
+        if task is not asyncio.current_task():
+            task.cancel()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=5000, help="Measured messages per stream")
+    parser.add_argument("--warmup", type=int, default=500, help="Unmeasured messages replayed first")
+    parser.add_argument("--streams", nargs="+", choices=STREAMS, default=STREAMS)
+    parser.add_argument("--cogs", nargs="+", default=DEFAULT_COGS, help="Extensions to load")
+    parser.add_argument("--users", type=int, default=5000, help="Distinct message authors")
+    parser.add_argument("--tickets", type=int, default=200, help="Open tickets (ticket_dm authors)")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="Simulated ms per Discord API call")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--baseline", help="Results file of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed p99 growth over the baseline (0.25 = 25%%)")
+    args = parser.parse_args()
+    if args.baseline:
+        args.baseline = os.path.abspath(args.baseline)
+    if args.json:
+        args.json = os.path.abspath(args.json)
+
+    workdir = tempfile.mkdtemp(prefix="maggibot-replay-")
+    os.chdir(workdir)
+    results = asyncio.run(run(args))
+    os.chdir(ROOT)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance)
+        if regressions:
+            print("\nRegressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nNo stream regressed by more than {args.tolerance * 100:.0f}% (p99 per message)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Benchmark memory of the in-memory stats representations.
+
+Builds the nested stats dict (what ``load_stats()`` returns and what the bot
+kept resident before) and the columnar ``StatsTable`` for the same data, then
+reports the traced allocation size of each and the cost of a random
+``ensure_user`` + ``ensure_server`` + increment, the per-message hot path.
+Most messages come from a member in a guild they already have stats for;
+``--new-pair-rate`` of them start a new (user, guild) entry.
+
+Usage:
+    python benchmarks/stats_memory.py
+    python benchmarks/stats_memory.py --users 100000 1000000 --guilds-per-user 2
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+GUILD_COUNT = 2_000
+
+
+def build_stats(user_count, guilds_per_user):
+    return {
+        str(100_000_000_000_000_000 + user_id): {
+            "xp": round(random.random() * 5000, 2),
+            "servers": {
+                str(900_000_000_000_000_000 + random.randrange(GUILD_COUNT)): {
+                    "messages": random.randrange(5000),
+                    "media": random.randrange(200),
+                    "voiceminutes": random.randrange(3000),
+                }
+                for _ in range(guilds_per_user)
+            },
+            "level": random.randrange(80),
+        }
+        for user_id in range(user_count)
+    }
+
+
+def traced(build):
+    gc.collect()
+    tracemalloc.start()
+    value = build()
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return value, size
+
+
+def bench_hot_path(service, pairs, guild_ids, operations, new_pair_rate):
+    start = time.perf_counter()
+    for _ in range(operations):
+        user_id, guild_id = random.choice(pairs)
+        if random.random() < new_pair_rate:
+            guild_id = random.choice(guild_ids)
+        user_stats = service.ensure_user(user_id)
+        server_stats = service.ensure_server(user_stats, guild_id)
+        server_stats["messages"] += 1
+        user_stats["xp"] += 0.1
+    return (time.perf_counter() - start) / operations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, nargs="+", default=[1_000_000])
+    parser.add_argument("--guilds-per-user", type=int, default=1)
+    parser.add_argument("--operations", type=int, default=200_000)
+    parser.add_argument("--new-pair-rate", type=float, default=0.01)
+    args = parser.parse_args()
+
+    from handlers.stats import StatsService
+    from handlers.statstable import StatsTable
+
+    random.seed(1)
+    print(f"{'users':>10} | {'dict MiB':>9} | {'table MiB':>9} | {'B/user dict':>11} | {'B/user table':>12} | {'dict us/op':>10} | {'table us/op':>11}")
+    print("-" * 94)
+    for user_count in args.users:
+        stats, dict_size = traced(lambda: build_stats(user_count, args.guilds_per_user))
+        table, table_size = traced(lambda: StatsTable.from_dict(stats))
+
+        user_ids = random.sample(list(stats), k=min(user_count, 10_000))
+        pairs = [(user_id, guild_id) for user_id in user_ids for guild_id in stats[user_id]["servers"]]
+        guild_ids = [str(900_000_000_000_000_000 + guild) for guild in range(GUILD_COUNT)]
+        timings = []
+        for data in (stats, table):
+            service = StatsService(flush_interval=0, flush_threshold=float("inf"), table="dict")
+            service._stats = data
+            random.seed(2)
+            timings.append(bench_hot_path(service, pairs, guild_ids, args.operations, args.new_pair_rate))
+
+        mib = 1024 * 1024
+        print(
+            f"{user_count:>10} | {dict_size / mib:>9.1f} | {table_size / mib:>9.1f} | "
+            f"{dict_size / user_count:>11.0f} | {table_size / user_count:>12.0f} | "
+            f"{timings[0]:>10.2f} | {timings[1]:>11.2f}"
+        )
+        del stats, table
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Benchmark per-message stats persistence.
+
+Compares the old ``load_stats()`` + ``save_stats()`` per message against the
+write-behind ``StatsService`` at several store sizes and prints messages/sec.
+
+Usage:
+    python benchmarks/stats_write_behind.py
+    python benchmarks/stats_write_behind.py --users 10000 100000 --after-messages 20000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+GUILD_ID = "1000"
+
+
+def build_stats(user_count):
+    return {
+        str(user_id): {
+            "xp": round(random.random() * 500, 2),
+            "servers": {GUILD_ID: {"messages": 10, "media": 1, "voiceminutes": 5}},
+            "level": 0,
+        }
+        for user_id in range(user_count)
+    }
+
+
+def apply_message(user_stats, server_stats, xp_gain):
+    server_stats["messages"] += 1
+    user_stats["xp"] += xp_gain
+    user_stats["level"] = int(user_stats["xp"] // 20)
+
+
+def bench_before(config, user_ids, messages):
+    start = time.perf_counter()
+    for _ in range(messages):
+        user_id = random.choice(user_ids)
+        stats = config.load_stats()
+        user_stats = stats.setdefault(user_id, {"xp": 0.0, "servers": {}, "level": 0})
+        server_stats = user_stats["servers"].setdefault(GUILD_ID, {"messages": 0, "media": 0, "voiceminutes": 0})
+        apply_message(user_stats, server_stats, config.MESSAGE_XP_COUNT)
+        config.save_stats(stats)
+    return messages / (time.perf_counter() - start)
+
+
+def bench_after(config, stats_module, user_ids, messages, flush_every, flush_threshold):
+    service = stats_module.StatsService(flush_interval=0, flush_threshold=flush_threshold)
+    service.stats  # initial load happens once at startup, not per message
+    start = time.perf_counter()
+    for i in range(1, messages + 1):
+        user_id = random.choice(user_ids)
+        user_stats = service.ensure_user(user_id)
+        server_stats = service.ensure_server(user_stats, GUILD_ID)
+        apply_message(user_stats, server_stats, config.MESSAGE_XP_COUNT)
+        service.mark_dirty(user_id)
+        if i % flush_every == 0:
+            service.flush()
+    service.flush()
+    return messages / (time.perf_counter() - start), service.flush_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--active-users", type=int, default=2_000, help="Distinct users sending messages")
+    parser.add_argument("--before-messages", type=int, default=10)
+    parser.add_argument("--after-messages", type=int, default=50_000)
+    parser.add_argument("--flush-every", type=int, default=10_000, help="Messages per simulated flush interval")
+    parser.add_argument("--flush-threshold", type=int, default=5_000)
+    args = parser.parse_args()
+
+    import handlers.config as config
+    import handlers.stats as stats_module
+
+    random.seed(1)
+    workdir = tempfile.mkdtemp(prefix="maggibot-bench-")
+    os.makedirs(os.path.join(workdir, "data"))
+    os.chdir(workdir)
+
+    print(f"{'users':>10} | {'before msg/s':>13} | {'after msg/s':>12} | {'flushes':>7} | {'speedup':>8}")
+    print("-" * 62)
+    for user_count in args.users:
+        config.save_data(config.STATS_FILE, build_stats(user_count))
+        user_ids = [str(random.randrange(user_count)) for _ in range(args.active_users)]
+
+        before = bench_before(config, user_ids, args.before_messages)
+        after, flushes = bench_after(
+            config, stats_module, user_ids, args.after_messages, args.flush_every, args.flush_threshold
+        )
+        print(f"{user_count:>10} | {before:>13.1f} | {after:>12.1f} | {flushes:>7} | {after / before:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,17 +8,16 @@ from handlers.debug import LogDebug, LogError
 class AutoRole(Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.serverconfig = config.loadserverconfig()
 
     @commands.Cog.listener()
     async def on_member_join(self, member: discord.Member):
         """Auto give role."""
         try:
             guild_id = str(member.guild.id)
-            if guild_id not in self.serverconfig or "autoroleid" not in self.serverconfig[guild_id]:
+            role_id = config.get_guild_config(guild_id).get("autoroleid")
+            if role_id is None:
                 return
 
-            role_id = self.serverconfig[guild_id]["autoroleid"]
             role = member.guild.get_role(role_id)
 
             if member and role:
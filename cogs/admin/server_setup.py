@@ -14,11 +14,17 @@ async def safe_respond(ctx: discord.ApplicationContext, embed: discord.Embed):
 class Server(Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.serverconfig = config.loadserverconfig()
-        self.voicegateconfig = config.loadvoicegateconfig()
         self.pending_verifications = set() 
         self.admin_feedback = config.load_admin_feedback()
 
+    @property
+    def serverconfig(self):
+        return config.loadserverconfig()
+
+    @property
+    def voicegateconfig(self):
+        return config.loadvoicegateconfig()
+
 
 
 #=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
@@ -12,7 +12,10 @@ class VoiceGate(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.pending_verifications = set()  
-        self.voicegateconfig = loadvoicegateconfig()
+
+    @property
+    def voicegateconfig(self):
+        return loadvoicegateconfig()
 
 
     @commands.Cog.listener()
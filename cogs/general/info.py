@@ -6,6 +6,7 @@ import platform
 import os
 from datetime import datetime
 from handlers.debug import LogSystem, LogError, LogDebug
+from handlers.instrumentation import INSTRUMENT_HANDLERS, REPORT_SORT_KEYS, handler_report, reset_handler_metrics
 from utils.embed_helpers import create_info_embed
 
 def get_host_uptime():
@@ -201,5 +202,52 @@ class InfoSystem(commands.Cog):
             LogError(f"Update status failed: {str(e)}")
             await interaction.followup.send("❌ Could not update status", ephemeral=True)
 
+    @commands.slash_command(name="handler-stats", description="⏱️ Show which listeners and commands take the most time")
+    @commands.is_owner()
+    async def handler_stats(
+        self,
+        ctx: discord.ApplicationContext,
+        sort: discord.Option(str, "Rank handlers by", choices=list(REPORT_SORT_KEYS), default="total"),
+        reset: discord.Option(bool, "Clear the collected timings afterwards", default=False),
+    ):
+        """Display the top handlers from the instrumentation registry"""
+        await ctx.defer(ephemeral=True)
+        LogSystem(f"Handler stats viewed by {ctx.author.id} (reset={reset})")
+
+        try:
+            embed = self.create_embed(
+                "⏱️ Handler Timings",
+                f"```diff\n+ Top handlers by {sort}\n+ Updated: " + datetime.utcnow().strftime("%H:%M:%S UTC") + "```",
+                "status"
+            )
+
+            rows = handler_report(sort)
+            if not INSTRUMENT_HANDLERS:
+                embed.description = "```diff\n- Instrumentation is disabled (INSTRUMENT_HANDLERS=false)```"
+            elif not rows:
+                embed.description = "```diff\n- No handler calls recorded yet```"
+
+            for row in rows:
+                embed.add_field(
+                    name=row["handler"],
+                    value=f"```yaml\n"
+                          f"Calls: {row['calls']}\n"
+                          f"Total: {row['total'] * 1000:.1f}ms\n"
+                          f"Mean: {row['mean'] * 1000:.2f}ms\n"
+                          f"P99: <={row['p99'] * 1000:.2f}ms\n"
+                          f"Errors: {row['errors']}```",
+                    inline=True
+                )
+
+            if reset:
+                reset_handler_metrics()
+                embed.set_footer(text="Timings have been reset")
+
+            await ctx.followup.send(embed=embed, ephemeral=True)
+
+        except Exception as e:
+            LogError(f"Handler stats command failed: {str(e)}")
+            raise
+
 def setup(bot: commands.Bot):
     bot.add_cog(InfoSystem(bot))
\ No newline at end of file
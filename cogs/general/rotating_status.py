@@ -1,6 +1,6 @@
 import discord
 from discord.ext import commands, tasks
-from handlers.config import mac_load_bans
+import handlers.asyncdb as db
 
 class RotatingStatus(commands.Cog):
     def __init__(self, bot: commands.Bot):
@@ -12,8 +12,10 @@ class RotatingStatus(commands.Cog):
 
     @tasks.loop(seconds=30)
     async def update_status(self):
-        bans = mac_load_bans()
-        banned_count = len(bans) if bans else 0
+        try:
+            banned_count = await db.mac_count_bans()
+        except Exception:
+            banned_count = 0
         statuses = [
             f"\U0001F6AB {banned_count} globally banned",
             f"\U0001F465 Managing {len(self.bot.users)} users",
@@ -1,11 +1,25 @@
 import discord
 from discord.ext import commands
+import asyncio
 import datetime
+import os
 
 import handlers.config as config
-from handlers.debug import LogError
+from handlers.auditlog import audit_log
+from handlers.debug import LogDebug, LogError
+from handlers.sendqueue import send_queue
 from extensions.loggingextension import create_log_embed
 
+# Per-event logging mode, stored in the guild's "logging_events" flags:
+#   True / "thread"  one forum thread per event
+#   "daily"          one digest thread per day
+#   "user"           one digest thread per user (per day for events without a user)
+#   False            disabled
+LOG_MODES = ("thread", "daily", "user")
+# Digest events are collected for this many seconds and posted as one multi-embed message
+LOG_DIGEST_FLUSH_INTERVAL = float(os.getenv("LOG_DIGEST_FLUSH_INTERVAL", 5))
+LOG_DIGEST_MAX_USER_THREADS = int(os.getenv("LOG_DIGEST_MAX_USER_THREADS", 500))
+
 
 class Logging(commands.Cog):
     DEFAULT_EVENT_FLAGS = {
@@ -27,22 +41,28 @@ class Logging(commands.Cog):
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.serverconfig = config.loadserverconfig()
+        self.digest_threads = config.load_logging_threads()
+        self.thread_cache = {}
+        self.thread_locks = {}
 
-    def _refresh_config(self):
-        self.serverconfig = config.loadserverconfig()
+    @property
+    def serverconfig(self):
+        return config.loadserverconfig()
 
     def _get_event_flags(self, guild_id: str) -> dict:
-        guild_cfg = self.serverconfig.get(guild_id, {})
+        guild_cfg = config.get_guild_config(guild_id)
         flags = guild_cfg.get("logging_events", {})
         merged = self.DEFAULT_EVENT_FLAGS.copy()
         if isinstance(flags, dict):
-            merged.update({k: bool(v) for k, v in flags.items() if k in merged})
+            merged.update({k: v if v in LOG_MODES else bool(v) for k, v in flags.items() if k in merged})
         return merged
 
     def _is_enabled(self, guild: discord.Guild, event_name: str) -> bool:
-        self._refresh_config()
-        return self._get_event_flags(str(guild.id)).get(event_name, True)
+        return bool(self._get_event_flags(str(guild.id)).get(event_name, True))
+
+    def _event_mode(self, guild: discord.Guild, event_name: str) -> str:
+        value = self._get_event_flags(str(guild.id)).get(event_name, True)
+        return value if value in LOG_MODES else "thread"
 
     def _trim(self, value: str, max_len: int = 950) -> str:
         if not value:
@@ -55,7 +75,6 @@ class Logging(commands.Cog):
         forum: discord.ForumChannel,
     ):
         try:
-            self._refresh_config()
             guild_id = str(ctx.guild.id)
             if guild_id not in self.serverconfig:
                 self.serverconfig[guild_id] = {}
@@ -80,20 +99,28 @@ class Logging(commands.Cog):
         ctx: discord.ApplicationContext,
         event_name: str,
         enabled: bool,
+        mode: str | None = None,
     ):
         if event_name not in self.DEFAULT_EVENT_FLAGS:
             await ctx.respond("Unknown logging event.", ephemeral=True)
             return
+        if mode is not None and mode not in LOG_MODES:
+            await ctx.respond("Unknown logging mode.", ephemeral=True)
+            return
 
-        self._refresh_config()
         guild_id = str(ctx.guild.id)
         self.serverconfig.setdefault(guild_id, {})
         event_flags = self._get_event_flags(guild_id)
-        event_flags[event_name] = enabled
+        if not enabled:
+            event_flags[event_name] = False
+        elif mode is not None:
+            event_flags[event_name] = mode
+        elif not event_flags[event_name]:
+            event_flags[event_name] = True
         self.serverconfig[guild_id]["logging_events"] = event_flags
         config.saveserverconfig(self.serverconfig)
 
-        state = "enabled" if enabled else "disabled"
+        state = f"enabled ({self._event_mode(ctx.guild, event_name)})" if enabled else "disabled"
         await ctx.respond(
             f"Logging event `{event_name}` is now **{state}**.",
             ephemeral=True,
@@ -108,16 +135,102 @@ class Logging(commands.Cog):
         embed: discord.Embed,
         title: str,
         user_id: int | None = None,
+        event: str | None = None,
     ):
         forum = config.get_logging_forum(guild)
         if not forum or not isinstance(forum, discord.ForumChannel):
             return
-        try:
+
+        mode = self._event_mode(guild, event) if event else "thread"
+        if mode == "thread":
             thread_name = f"{title}-{user_id}" if user_id else title
             thread_name = self._trim(thread_name, max_len=95)
-            await forum.create_thread(name=thread_name, embed=embed)
+            send_queue.enqueue_thread(forum, thread_name, embed)
+            return
+
+        if mode == "user" and user_id:
+            key = f"user-{user_id}"
+            description = f"Log events for <@{user_id}> (`{user_id}`)."
+        else:
+            day = datetime.datetime.utcnow().date().isoformat()
+            key = f"day-{day}"
+            description = f"Log events of {day} (UTC)."
+        try:
+            thread = await self.get_digest_thread(forum, key, description)
         except Exception as e:
-            LogError(f"Failed to post log in guild {guild.id}: {e}")
+            LogError(f"Failed to open log digest thread {key} in guild {guild.id}: {e}")
+            return
+        send_queue.enqueue(thread, embed, linger=LOG_DIGEST_FLUSH_INTERVAL)
+
+    # ------------------------------------------------------------
+    # Digest threads
+    # ------------------------------------------------------------
+    def _cached_thread(self, forum: discord.ForumChannel, thread_id):
+        if not thread_id:
+            return None
+        thread = self.thread_cache.get(thread_id) or forum.guild.get_thread(thread_id)
+        if thread is not None and thread.parent_id == forum.id:
+            self.thread_cache[thread_id] = thread
+            return thread
+        return None
+
+    async def get_digest_thread(self, forum: discord.ForumChannel, key: str, description: str):
+        """The digest thread for ``key``, created on first use and remembered by ID"""
+        guild_id = str(forum.guild.id)
+        thread = self._cached_thread(forum, self.digest_threads.get(guild_id, {}).get(key))
+        if thread:
+            return thread
+
+        lock = self.thread_locks.setdefault((guild_id, key), asyncio.Lock())
+        async with lock:
+            thread_id = self.digest_threads.get(guild_id, {}).get(key)
+            thread = self._cached_thread(forum, thread_id)
+            if thread:
+                return thread
+
+            if thread_id:
+                # Archived threads are not cached, look it up once
+                try:
+                    thread = await forum.guild.fetch_channel(thread_id)
+                except discord.NotFound:
+                    thread = None
+                if thread is not None and getattr(thread, "parent_id", None) != forum.id:
+                    thread = None
+
+            if thread is None:
+                header = discord.Embed(
+                    title="📒 Log Digest",
+                    description=description,
+                    color=discord.Color.blurple(),
+                    timestamp=discord.utils.utcnow(),
+                )
+                thread = await forum.create_thread(name=f"log-{key}", embed=header)
+                self._remember_thread(guild_id, key, thread.id)
+                LogDebug(f"Created log digest thread {key} in guild {guild_id}")
+
+            self.thread_cache[thread.id] = thread
+        self.thread_locks.pop((guild_id, key), None)
+        return thread
+
+    def _remember_thread(self, guild_id: str, key: str, thread_id: int):
+        threads = self.digest_threads.setdefault(guild_id, {})
+        if key.startswith("day-"):
+            # Only today's digest is written to
+            for old_key in [k for k in threads if k.startswith("day-")]:
+                self.thread_cache.pop(threads.pop(old_key), None)
+        threads[key] = thread_id
+        user_keys = [k for k in threads if k.startswith("user-")]
+        for old_key in user_keys[:max(0, len(user_keys) - LOG_DIGEST_MAX_USER_THREADS)]:
+            self.thread_cache.pop(threads.pop(old_key), None)
+        config.save_logging_threads(self.digest_threads)
+
+    @commands.Cog.listener()
+    async def on_raw_thread_delete(self, payload: discord.RawThreadDeleteEvent):
+        self.thread_cache.pop(payload.thread_id, None)
+        threads = self.digest_threads.get(str(payload.guild_id), {})
+        for key in [k for k, thread_id in threads.items() if thread_id == payload.thread_id]:
+            del threads[key]
+            config.save_logging_threads(self.digest_threads)
 
     # ------------------------------------------------------------
     # Event listeners
@@ -139,7 +252,7 @@ class Logging(commands.Cog):
             fields,
             guild=member.guild,
         )
-        await self.post_log(member.guild, embed, "member-join", member.id)
+        await self.post_log(member.guild, embed, "member-join", member.id, event="member_join")
 
     @commands.Cog.listener()
     async def on_member_remove(self, member: discord.Member):
@@ -161,7 +274,7 @@ class Logging(commands.Cog):
             fields,
             guild=member.guild,
         )
-        await self.post_log(member.guild, embed, "member-leave", member.id)
+        await self.post_log(member.guild, embed, "member-leave", member.id, event="member_remove")
 
     @commands.Cog.listener()
     async def on_member_ban(self, guild: discord.Guild, user: discord.User):
@@ -170,7 +283,7 @@ class Logging(commands.Cog):
         description = f"{user.mention} was banned."
         fields = [("User ID", str(user.id), True)]
         embed = create_log_embed("Member Banned", description, "ban", user, fields, guild=guild)
-        await self.post_log(guild, embed, "ban", user.id)
+        await self.post_log(guild, embed, "ban", user.id, event="member_ban")
 
     @commands.Cog.listener()
     async def on_message_delete(self, message: discord.Message):
@@ -198,7 +311,7 @@ class Logging(commands.Cog):
             fields,
             guild=message.guild,
         )
-        await self.post_log(message.guild, embed, "message-delete", message.author.id)
+        await self.post_log(message.guild, embed, "message-delete", message.author.id, event="message_delete")
 
     @commands.Cog.listener()
     async def on_message_edit(self, before: discord.Message, after: discord.Message):
@@ -227,7 +340,7 @@ class Logging(commands.Cog):
             fields,
             guild=after.guild,
         )
-        await self.post_log(after.guild, embed, "message-edit", after.author.id)
+        await self.post_log(after.guild, embed, "message-edit", after.author.id, event="message_edit")
 
     @commands.Cog.listener()
     async def on_member_unban(self, guild: discord.Guild, user: discord.User):
@@ -236,7 +349,7 @@ class Logging(commands.Cog):
         description = f"{user.mention} was unbanned."
         fields = [("User ID", str(user.id), True)]
         embed = create_log_embed("Member Unbanned", description, "ban", user, fields, guild=guild)
-        await self.post_log(guild, embed, "unban", user.id)
+        await self.post_log(guild, embed, "unban", user.id, event="member_unban")
 
     @commands.Cog.listener()
     async def on_member_update(self, before: discord.Member, after: discord.Member):
@@ -257,7 +370,7 @@ class Logging(commands.Cog):
                 fields,
                 guild=after.guild,
             )
-            await self.post_log(after.guild, embed, "nickname-update", after.id)
+            await self.post_log(after.guild, embed, "nickname-update", after.id, event="member_update")
 
         if before.roles != after.roles:
             before_roles = ", ".join(r.mention for r in before.roles if r.name != "@everyone") or "None"
@@ -276,7 +389,7 @@ class Logging(commands.Cog):
                 fields,
                 guild=after.guild,
             )
-            await self.post_log(after.guild, embed, "roles-update", after.id)
+            await self.post_log(after.guild, embed, "roles-update", after.id, event="member_update")
 
         if before.display_avatar != after.display_avatar:
             description = f"Avatar updated for {after.mention}"
@@ -289,7 +402,7 @@ class Logging(commands.Cog):
                 fields,
                 guild=after.guild,
             )
-            await self.post_log(after.guild, embed, "avatar-update", after.id)
+            await self.post_log(after.guild, embed, "avatar-update", after.id, event="member_update")
 
     @commands.Cog.listener()
     async def on_voice_state_update(self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState):
@@ -318,7 +431,7 @@ class Logging(commands.Cog):
                 fields,
                 guild=member.guild,
             )
-            await self.post_log(member.guild, embed, "voice-update", member.id)
+            await self.post_log(member.guild, embed, "voice-update", member.id, event="voice_state")
 
     @commands.Cog.listener()
     async def on_guild_channel_create(self, channel: discord.abc.GuildChannel):
@@ -328,14 +441,8 @@ class Logging(commands.Cog):
             ("Channel ID", str(channel.id), True),
             ("Type", str(channel.type), True),
         ]
-        creator = None
-        try:
-            async for entry in channel.guild.audit_logs(limit=1, action=discord.AuditLogAction.channel_create):
-                if entry.target.id == channel.id:
-                    creator = entry.user
-                    break
-        except Exception:
-            pass
+        entry = await audit_log.find(channel.guild, discord.AuditLogAction.channel_create, channel.id)
+        creator = entry.user if entry else None
 
         description = f"{channel.mention} was created."
         embed = create_log_embed(
@@ -346,7 +453,7 @@ class Logging(commands.Cog):
             fields,
             guild=channel.guild,
         )
-        await self.post_log(channel.guild, embed, "channel-create")
+        await self.post_log(channel.guild, embed, "channel-create", event="channel_create")
 
     @commands.Cog.listener()
     async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
@@ -356,14 +463,8 @@ class Logging(commands.Cog):
             ("Channel ID", str(channel.id), True),
             ("Type", str(channel.type), True),
         ]
-        deleter = None
-        try:
-            async for entry in channel.guild.audit_logs(limit=1, action=discord.AuditLogAction.channel_delete):
-                if entry.target.id == channel.id:
-                    deleter = entry.user
-                    break
-        except Exception:
-            pass
+        entry = await audit_log.find(channel.guild, discord.AuditLogAction.channel_delete, channel.id)
+        deleter = entry.user if entry else None
 
         description = f"{channel.name} was deleted."
         embed = create_log_embed(
@@ -374,7 +475,7 @@ class Logging(commands.Cog):
             fields,
             guild=channel.guild,
         )
-        await self.post_log(channel.guild, embed, "channel-delete")
+        await self.post_log(channel.guild, embed, "channel-delete", event="channel_delete")
 
     @commands.Cog.listener()
     async def on_guild_channel_update(
@@ -400,7 +501,7 @@ class Logging(commands.Cog):
             fields,
             guild=after.guild,
         )
-        await self.post_log(after.guild, embed, "channel-update")
+        await self.post_log(after.guild, embed, "channel-update", event="channel_update")
 
     @commands.Cog.listener()
     async def on_guild_role_create(self, role: discord.Role):
@@ -410,14 +511,8 @@ class Logging(commands.Cog):
             ("Role Name", role.name, True),
             ("Role ID", str(role.id), True),
         ]
-        creator = None
-        try:
-            async for entry in role.guild.audit_logs(limit=1, action=discord.AuditLogAction.role_create):
-                if entry.target.id == role.id:
-                    creator = entry.user
-                    break
-        except Exception:
-            pass
+        entry = await audit_log.find(role.guild, discord.AuditLogAction.role_create, role.id)
+        creator = entry.user if entry else None
 
         description = f"{role.mention} was created."
         embed = create_log_embed(
@@ -428,7 +523,7 @@ class Logging(commands.Cog):
             fields,
             guild=role.guild,
         )
-        await self.post_log(role.guild, embed, "role-create")
+        await self.post_log(role.guild, embed, "role-create", event="role_create")
 
     @commands.Cog.listener()
     async def on_guild_role_delete(self, role: discord.Role):
@@ -438,14 +533,8 @@ class Logging(commands.Cog):
             ("Role Name", role.name, True),
             ("Role ID", str(role.id), True),
         ]
-        deleter = None
-        try:
-            async for entry in role.guild.audit_logs(limit=1, action=discord.AuditLogAction.role_delete):
-                if entry.target.id == role.id:
-                    deleter = entry.user
-                    break
-        except Exception:
-            pass
+        entry = await audit_log.find(role.guild, discord.AuditLogAction.role_delete, role.id)
+        deleter = entry.user if entry else None
 
         description = f"Role {role.name} was deleted."
         embed = create_log_embed(
@@ -456,7 +545,7 @@ class Logging(commands.Cog):
             fields,
             guild=role.guild,
         )
-        await self.post_log(role.guild, embed, "role-delete")
+        await self.post_log(role.guild, embed, "role-delete", event="role_delete")
 
     @commands.Cog.listener()
     async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
@@ -469,14 +558,8 @@ class Logging(commands.Cog):
             ("After Name", after.name, True),
             ("Role ID", str(after.id), True),
         ]
-        editor = None
-        try:
-            async for entry in after.guild.audit_logs(limit=1, action=discord.AuditLogAction.role_update):
-                if entry.target.id == after.id:
-                    editor = entry.user
-                    break
-        except Exception:
-            pass
+        entry = await audit_log.find(after.guild, discord.AuditLogAction.role_update, after.id)
+        editor = entry.user if entry else None
 
         description = f"Role {before.name} updated."
         embed = create_log_embed(
@@ -487,7 +570,7 @@ class Logging(commands.Cog):
             fields,
             guild=after.guild,
         )
-        await self.post_log(after.guild, embed, "role-update")
+        await self.post_log(after.guild, embed, "role-update", event="role_update")
 
 
 def setup(bot: commands.Bot):
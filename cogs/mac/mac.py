@@ -4,12 +4,8 @@ import datetime
 import asyncio
 import os
 from handlers.env import get_mac_channel, get_owner
-from handlers.config import (
-    mac_load_bans,
-    mac_save_bans,
-    mac_load_bypasses,
-    mac_save_bypasses,
-)
+import handlers.asyncdb as db
+from handlers.macindex import mac_index
 from extensions.macextension import trim_field, create_mac_embed
 from handlers.debug import LogDebug, LogError
 
@@ -26,16 +22,20 @@ class MacBan(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
 
+    @commands.Cog.listener()
+    async def on_ready(self):
+        await db.load_mac_index()
+
     @commands.Cog.listener()
     async def on_member_join(self, member: discord.Member):
-        bans = mac_load_bans()
-        ban_record = bans.get(str(member.id))
+        if db.ensure_mac_index():
+            ban_record = mac_index.get_ban(member.id)
+        else:
+            ban_record = await db.mac_get_ban(member.id)
         if not ban_record:
             return
 
-        bypasses = mac_load_bypasses()
-        allowed_servers = bypasses.get(str(member.id), [])
-        if member.guild.id in allowed_servers or str(member.guild.id) in allowed_servers:
+        if await db.mac_has_bypass(member.id, member.guild.id):
             try:
                 dm_embed = create_mac_embed(
                     title="ℹ️ MAC™ Bypass Active",
@@ -111,14 +111,14 @@ class MacBan(commands.Cog):
     @commands.slash_command(name="mac-ban", description="Globally bans a user from all protected servers.")
     @is_owner()
     async def macban(self, ctx: discord.ApplicationContext, user: discord.User, *, reason: str):
-        bans = mac_load_bans()
-        if str(user.id) in bans:
+        existing_ban = await db.mac_get_ban(user.id)
+        if existing_ban:
             embed = create_mac_embed(
                 title="⚠️ Ban Exists",
                 description=f"{user.mention} is already globally banned.",
                 color=discord.Color.orange()
             )
-            embed.add_field(name="Current Reason", value=f"```{trim_field(bans[str(user.id)]['reason'])}```", inline=False)
+            embed.add_field(name="Current Reason", value=f"```{trim_field(existing_ban['reason'])}```", inline=False)
             return await ctx.respond(embed=embed, ephemeral=True)
 
         ban_record = {
@@ -130,8 +130,7 @@ class MacBan(commands.Cog):
             "servername": ctx.guild.name,
             "bannedby": f"{ctx.author.name} ({ctx.author.id})"
         }
-        bans[str(user.id)] = ban_record
-        mac_save_bans(bans)
+        await db.mac_add_ban(ban_record)
 
         embed = create_mac_embed(
             title="✅ Global Ban Issued",
@@ -161,11 +160,7 @@ class MacBan(commands.Cog):
     @commands.slash_command(name="mac-bypass", description="Allows a globally banned user to join this server.")
     @commands.has_permissions(administrator=True)
     async def macbypass(self, ctx: discord.ApplicationContext, user: discord.User):
-        bypasses = mac_load_bypasses()
-        guild_id = ctx.guild.id
-        user_id = str(user.id)
-        servers = set(bypasses.get(user_id, []))
-        if guild_id in servers or str(guild_id) in servers:
+        if await db.mac_has_bypass(user.id, ctx.guild.id):
             embed = create_mac_embed(
                 title="⚠️ Bypass Exists",
                 description=f"{user.mention} already has a bypass for this server.",
@@ -173,9 +168,7 @@ class MacBan(commands.Cog):
             )
             return await ctx.respond(embed=embed, ephemeral=True)
 
-        servers.add(guild_id)
-        bypasses[user_id] = list(servers)
-        mac_save_bypasses(bypasses)
+        await db.mac_add_bypass(user.id, ctx.guild.id)
 
         embed = create_mac_embed(
             title="✅ Bypass Added",
@@ -188,8 +181,7 @@ class MacBan(commands.Cog):
     @commands.slash_command(name="mac-unban", description="Removes a global ban from a user.")
     @is_owner()
     async def macunban(self, ctx: discord.ApplicationContext, user: discord.User):
-        bans = mac_load_bans()
-        if str(user.id) not in bans:
+        if not await db.mac_remove_ban(user.id):
             embed = create_mac_embed(
                 title="⚠️ Ban Not Found",
                 description=f"{user.mention} is not on the global ban list.",
@@ -197,9 +189,6 @@ class MacBan(commands.Cog):
             )
             return await ctx.respond(embed=embed, ephemeral=True)
 
-        del bans[str(user.id)]
-        mac_save_bans(bans)
-
         embed = create_mac_embed(
             title="✅ Global Ban Removed",
             description=f"**{user.mention}** has been removed from the global ban list.",
@@ -222,8 +211,7 @@ class MacBan(commands.Cog):
     @commands.slash_command(name="mac-lookup", description="Looks up a user's global ban record.")
     @is_owner()
     async def maclookup(self, ctx: discord.ApplicationContext, user: discord.User):
-        bans = mac_load_bans()
-        ban_record = bans.get(str(user.id))
+        ban_record = await db.mac_get_ban(user.id)
 
         if not ban_record:
             embed = create_mac_embed(
@@ -248,7 +236,7 @@ class MacBan(commands.Cog):
     @commands.slash_command(name="mac-info", description="Displays statistics about the MAC™ global ban list.")
     @is_owner()
     async def macinfo(self, ctx: discord.ApplicationContext):
-        bans = mac_load_bans()
+        bans = await db.mac_load_bans()
         total_bans = len(bans)
 
         embed = create_mac_embed(
@@ -266,13 +254,50 @@ class MacBan(commands.Cog):
                 ban_list += f"• **{user_name}** (`{ban['id']}`) - <t:{int(datetime.datetime.fromisoformat(ban['bandate']).timestamp())}:R>\n"
             embed.add_field(name="📰 Recent Bans", value=ban_list, inline=False)
 
+        index = mac_index.stats()
+        if index["loaded"]:
+            hit_rate = (index["hits"] / index["lookups"] * 100) if index["lookups"] else 0.0
+            embed.add_field(
+                name="🗂️ Ban Index",
+                value=(
+                    f"**{index['bans']}** bans, **{index['bypass_pairs']}** bypasses ({index['bypass_users']} users)\n"
+                    f"**{index['lookups']}** lookups, **{index['hits']}** hits ({hit_rate:.2f}%)\n"
+                    f"**{index['bypass_checks']}** bypass checks, **{index['bypass_hits']}** granted\n"
+                    f"Loaded in {index['load_seconds'] * 1000:.1f} ms"
+                ),
+                inline=False,
+            )
+        else:
+            embed.add_field(name="🗂️ Ban Index", value="Not loaded", inline=False)
+
+        healthy = await db.check_db_health()
+        pool = db.get_pool_stats()
+        embed.add_field(
+            name="🗄️ Database",
+            value=(
+                f"`{pool['type']}` {'✅ healthy' if healthy else '❌ unreachable'}\n"
+                f"**{pool['in_use']}**/{pool['pool_size']} connections in use, "
+                f"**{pool['acquisitions']}** acquisitions\n"
+                f"**{pool['reconnects']}** reconnects, **{pool['failures']}** failures"
+            ),
+            inline=False,
+        )
+
+        latency = db.get_query_latency()
+        if latency:
+            latency_lines = "\n".join(
+                f"{query_type}: n={hist.count} p50={hist.percentile(0.5) * 1000:.1f}ms p99={hist.percentile(0.99) * 1000:.1f}ms"
+                for query_type, hist in sorted(latency.items())
+            )
+            embed.add_field(name="⏱️ Query Latency", value=f"```{trim_field(latency_lines, 1000)}```", inline=False)
+
         await ctx.respond(embed=embed)
 
     @commands.slash_command(name="mac-export", description="Exports the complete global ban list as a file.")
     @is_owner()
     async def macexport(self, ctx: discord.ApplicationContext):
         await ctx.defer(ephemeral=True)
-        bans = mac_load_bans()
+        bans = await db.mac_load_bans()
         if not bans:
             embed = create_mac_embed(
                 title="ℹ️ No Ban Records",
@@ -301,7 +326,7 @@ class MacBan(commands.Cog):
     @is_owner()
     async def macscanserver(self, ctx: discord.ApplicationContext):
         await ctx.defer()
-        global_bans = mac_load_bans()
+        global_bans = await db.mac_load_bans()
         banned_members_on_server = []
 
         for member in ctx.guild.members:
@@ -7,6 +7,11 @@ import asyncio
 from typing import Optional
 from handlers.debug import LogDebug, LogSystem, LogError
 from handlers.env import get_owner
+from handlers.stats import stats_service
+from handlers.activity import activity_store
+from handlers.voicesessions import voice_sessions
+from handlers.config import flush_pending_saves
+from handlers.sendqueue import send_queue
 
 class OwnerCommands(commands.Cog):
     def __init__(self, bot):
@@ -24,6 +29,25 @@ class OwnerCommands(commands.Cog):
         # Work in progress
         return True
 
+    async def flush_pending_data(self):
+        """Write out buffered data before the bot goes down."""
+        stores = (
+            ("stats", stats_service.flush),
+            ("activity", lambda: activity_store.flush(force=True)),
+            ("voice sessions", lambda: voice_sessions.save(force=True)),
+        )
+        for name, flush in stores:
+            try:
+                flush()
+            except Exception as e:
+                LogError(f"Failed to flush {name} before shutdown: {str(e)}")
+        try:
+            await send_queue.drain()
+            await flush_pending_saves()
+            LogSystem(" Flushed pending data before shutdown")
+        except Exception as e:
+            LogError(f"Failed to flush data before shutdown: {str(e)}")
+
     def create_embed(self, title, description, color_name="info"):
         embed = discord.Embed(
             title=title,
@@ -97,6 +121,7 @@ class OwnerCommands(commands.Cog):
         
         LogSystem(f" Stopping the bot...")
         await self.shutdown_sequence(ctx)
+        await self.flush_pending_data()
         
         try:
             await self.bot.close()
@@ -136,6 +161,7 @@ class OwnerCommands(commands.Cog):
             return await ctx.respond(embed=embed, ephemeral=True)
         
         await self.reboot_sequence(ctx)
+        await self.flush_pending_data()
         
         try:
             await self.bot.close()
@@ -1,16 +1,18 @@
 import discord
 from discord.ext import commands
-from handlers.config import loadserverconfig
+from handlers.auditlog import audit_log
+from handlers.config import get_guild_config
 from handlers.debug import LogDebug, LogError
-from collections import defaultdict
-import asyncio
+from handlers.sendqueue import send_queue
+from handlers.slidingwindow import SlidingWindowCounter
 
 class ChannelProtectionCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.action_counter = defaultdict(int)
         self.COOLDOWN = 60
         self.ACTION_THRESHOLD = 3
+        # Channel creates/deletes per (guild, bot, action) in the last COOLDOWN seconds
+        self.action_counter = SlidingWindowCounter(self.COOLDOWN, max_events=self.ACTION_THRESHOLD + 1)
 
     @commands.Cog.listener()
     async def on_guild_channel_create(self, channel: discord.abc.GuildChannel):
@@ -22,27 +24,22 @@ class ChannelProtectionCog(commands.Cog):
 
     async def check_bot_action(self, channel: discord.abc.GuildChannel, action_type: str):
         guild = channel.guild
-        config = loadserverconfig().get(str(guild.id), {})
+        config = get_guild_config(guild.id)
 
         if not config.get("protection", False):
             return
 
         try:
-            async for entry in guild.audit_logs(limit=1, action=self.get_audit_action(action_type)):
-                if entry.target.id != channel.id or not entry.user.bot:
-                    return
-
-                bot = entry.user
-                self.action_counter[bot.id] += 1
-
-                if self.action_counter[bot.id] > self.ACTION_THRESHOLD:
-                    if bot.public_flags.verified_bot:
-                        await self.log_verified_bot_spam(guild, bot, channel, action_type)
-                    else:
-                        await self.handle_unverified_bot_spam(guild, bot, channel, action_type)
-                    return
-
-                asyncio.create_task(self.reset_counter(bot.id))
+            entry = await audit_log.find(guild, self.get_audit_action(action_type), channel.id)
+            if entry is None or not entry.user or not entry.user.bot:
+                return
+
+            bot = entry.user
+            if self.action_counter.hit((guild.id, bot.id, action_type)) > self.ACTION_THRESHOLD:
+                if bot.public_flags.verified_bot:
+                    await self.log_verified_bot_spam(guild, bot, channel, action_type)
+                else:
+                    await self.handle_unverified_bot_spam(guild, bot, channel, action_type)
         except Exception as e:
             LogError(f"Channel {action_type} audit error in {guild.name}: {str(e)}")
 
@@ -69,10 +66,6 @@ class ChannelProtectionCog(commands.Cog):
         )
         LogDebug(f"Verified bot {bot} exceeded channel action threshold in {guild.name}")
 
-    async def reset_counter(self, bot_id: int):
-        await asyncio.sleep(self.COOLDOWN)
-        self.action_counter[bot_id] = 0
-
     def get_audit_action(self, action_type: str):
         return {
             "create": discord.AuditLogAction.channel_create,
@@ -80,7 +73,7 @@ class ChannelProtectionCog(commands.Cog):
         }[action_type]
 
     async def log_security_event(self, guild: discord.Guild, title: str, description: str, color: discord.Color):
-        config = loadserverconfig().get(str(guild.id), {})
+        config = get_guild_config(guild.id)
         log_channel_id = config.get("logchannel")
 
         if not log_channel_id:
@@ -100,10 +93,7 @@ class ChannelProtectionCog(commands.Cog):
         embed.add_field(name="Server", value=guild.name, inline=True)
         embed.add_field(name="Server ID", value=guild.id, inline=True)
 
-        try:
-            await log_channel.send(embed=embed)
-        except Exception as e:
-            LogError(f"Failed to send log message: {str(e)}")
+        send_queue.enqueue(log_channel, embed)
 
 def setup(bot):
     bot.add_cog(ChannelProtectionCog(bot))
@@ -1,16 +1,22 @@
 import discord
 from discord.ext import commands
-from handlers.config import loadserverconfig
+from handlers.config import get_guild_config
 from handlers.debug import LogDebug, LogError
+from handlers.sendqueue import send_queue
+from handlers.messagepipeline import message_pipeline, GUILD, WEBHOOK, AUTHOR_SELF
 
 class WebhookProtectionCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        message_pipeline(bot).register(self.handle_message, require=GUILD | WEBHOOK, exclude=AUTHOR_SELF, priority=10)
+
+    def cog_unload(self):
+        message_pipeline(self.bot).unregister(self.handle_message)
 
     @commands.Cog.listener()
     async def on_webhooks_update(self, channel: discord.abc.GuildChannel):
         guild = channel.guild
-        config = loadserverconfig().get(str(guild.id), {})
+        config = get_guild_config(guild.id)
         protection = config.get("protection", False)
         log_channel = self.bot.get_channel(config.get("logchannel")) if config.get("logchannel") else None
         
@@ -51,17 +57,14 @@ class WebhookProtectionCog(commands.Cog):
                         embed.add_field(name="Error", value=str(e), inline=False)
 
                 if log_channel:
-                    await log_channel.send(embed=embed)
+                    send_queue.enqueue(log_channel, embed)
 
         except Exception as e:
             LogError(f"Webhook update handler error: {str(e)}")
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
-        if not message.guild or message.author == self.bot.user or not message.webhook_id:
-            return
-
-        config = loadserverconfig().get(str(message.guild.id), {})
+    async def handle_message(self, ctx):
+        message = ctx.message
+        config = ctx.config
         protection = config.get("protection", False)
         log_channel = self.bot.get_channel(config.get("logchannel")) if config.get("logchannel") else None
 
@@ -93,7 +96,7 @@ class WebhookProtectionCog(commands.Cog):
                     embed.add_field(name="Error", value=str(e), inline=False)
 
             if log_channel:
-                await log_channel.send(embed=embed)
+                send_queue.enqueue(log_channel, embed)
 
         except Exception as e:
             LogError(f"Error processing webhook message: {str(e)}")
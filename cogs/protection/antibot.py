@@ -2,6 +2,7 @@ import discord
 from discord.ext import commands
 import json
 import datetime
+from handlers.auditlog import audit_log
 from handlers.debug import LogDebug, LogError
 import handlers.config as config
 from extensions.protectionextension import create_antibot_protection_embed
@@ -13,10 +14,9 @@ class Antibot(commands.Cog):
 
     @commands.Cog.listener()
     async def on_member_join(self, member):
-        serverconfig = config.loadserverconfig()
-        serverconfig[str(member.guild.id)] = serverconfig.get(str(member.guild.id), {})
+        guild_config = config.get_guild_config(member.guild.id)
 
-        if not serverconfig[str(member.guild.id)].get("protection"):
+        if not guild_config.get("protection"):
             LogDebug(f"Protection disabled in {member.guild.name} (ID: {member.guild.id})")
             return
 
@@ -27,17 +27,12 @@ class Antibot(commands.Cog):
         LogDebug(f"Bot detected: {member} (ID: {member.id})")
         inviter = None
 
-        try:
-            async for entry in member.guild.audit_logs(limit=10, action=discord.AuditLogAction.bot_add):
-                if entry.target.id == member.id:
-                    inviter = entry.user
-                    LogDebug(f"Found inviter: {inviter} for bot {member}")
-                    break
-        except Exception as e:
-            LogError(f"Audit log error in {member.guild.name}: {str(e)}")
-            inviter = None
+        entry = await audit_log.find(member.guild, discord.AuditLogAction.bot_add, member.id)
+        if entry is not None:
+            inviter = entry.user
+            LogDebug(f"Found inviter: {inviter} for bot {member}")
 
-        log_channel_id = serverconfig[str(member.guild.id)].get("protectionlogchannel")
+        log_channel_id = guild_config.get("protectionlogchannel")
         if not log_channel_id:
             LogDebug(f"No log channel set for {member.guild.name}")
             return
@@ -54,7 +49,7 @@ class Antibot(commands.Cog):
             await log_channel.send(embed=embed)
             return
 
-        if serverconfig[str(member.guild.id)].get("protection"):
+        if guild_config.get("protection"):
             try:
                 await member.kick(reason="Unverified bot protection")
                 LogDebug(f"Successfully kicked unverified bot: {member}")
@@ -1,20 +1,19 @@
 import discord
 from discord.ext import commands
-from handlers.config import loadserverconfig 
+from handlers.config import get_guild_config
 from handlers.debug import LogDebug, LogError
 
 
 class AntiGhostPing(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.config = loadserverconfig() 
 
     @commands.Cog.listener()
     async def on_message_delete(self, message: discord.Message):
         if not message.guild:
             return
 
-        if not self.config.get(str(message.guild.id), {}).get("protection", False):
+        if not get_guild_config(message.guild.id).get("protection", False):
             return
 
         if not message.mentions:
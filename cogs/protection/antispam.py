@@ -2,48 +2,46 @@ import discord
 from discord.ext import commands
 import datetime
 from handlers.debug import LogDebug, LogError
-import handlers.config as config
 from extensions.protectionextension import create_alert_embed
+from handlers.sendqueue import send_queue
+from handlers.messagepipeline import message_pipeline, GUILD, FEATURE_PROTECTION, AUTHOR_SELF, AUTHOR_BOT, WEBHOOK
 
 class AntiSpam(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        if message.author == self.bot.user:
-            return
-        
-        if not message.guild or message.webhook_id:
-            return
-
-        serverconfig = config.loadserverconfig()
-        server_id = str(message.guild.id)
-        
-        if not serverconfig.get(server_id, {}).get("protection"):
-            return
-
-        if (isinstance(message.author, discord.Member) and \
-           (message.author.guild_permissions.administrator or message.author.bot)):
-            return
-
+        message_pipeline(bot).register(
+            self.handle_message,
+            require=GUILD | FEATURE_PROTECTION,
+            exclude=AUTHOR_SELF | AUTHOR_BOT | WEBHOOK,
+            predicate=self.is_mass_mention,
+            priority=10,
+        )
+
+    def cog_unload(self):
+        message_pipeline(self.bot).unregister(self.handle_message)
+
+    @staticmethod
+    def is_mass_mention(ctx):
+        return len(ctx.message.mentions) > 3 and not ctx.is_admin
+
+    async def handle_message(self, ctx):
+        message = ctx.message
+        guild_config = ctx.config
         mention_count = len(message.mentions)
-        if mention_count <= 3:
-            return
 
         try:
-            log_channel_id = serverconfig[server_id].get("protectionlogchannel")
+            log_channel_id = guild_config.get("protectionlogchannel")
             if not log_channel_id:
                 LogDebug(f"No log channel set in {message.guild.name}")
                 return
 
-            log_channel = await message.guild.fetch_channel(log_channel_id)
+            log_channel = message.guild.get_channel(log_channel_id) or await message.guild.fetch_channel(log_channel_id)
             if not log_channel.permissions_for(message.guild.me).send_messages:
                 LogError(f"No send permissions in {log_channel.name}")
                 return
 
             embed = await create_alert_embed(message, mention_count)
-            await log_channel.send(embed=embed)
+            send_queue.enqueue(log_channel, embed)
             LogDebug(f"Logged mass mention by {message.author} ({mention_count} mentions)")
 
         except discord.NotFound:
@@ -12,9 +12,13 @@ class ProtectionConfigView(View):
         super().__init__(timeout=180)
         self.bot = bot
         self.guild_id = guild_id
-        self.config = config.loadserverconfig()  # [[5]]
-        self.current_protection = self.config.get(str(guild_id), {}).get("protection", False)
-        self.current_log_channel = self.config.get(str(guild_id), {}).get("logchannel", None)
+        guild_config = config.get_guild_config(guild_id)
+        self.current_protection = guild_config.get("protection", False)
+        self.current_log_channel = guild_config.get("logchannel", None)
+
+    @property
+    def config(self):
+        return config.loadserverconfig()
 
     @channel_select(
         placeholder="Select log channel",
@@ -76,7 +80,7 @@ class ProtectionSettings(commands.Cog):
     @commands.has_permissions(administrator=True)
     async def setup_protection(self, ctx: discord.ApplicationContext):
         guild_id = str(ctx.guild.id)
-        config_data = config.loadserverconfig().get(guild_id, {})
+        config_data = config.get_guild_config(guild_id)
         
         current_protection = config_data.get("protection", False)
         current_log_channel = config_data.get("logchannel", None)
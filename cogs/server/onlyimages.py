@@ -4,6 +4,7 @@ import json
 import os
 from handlers.config import load_onlyimages, save_onlyimages
 from handlers.debug import LogError
+from handlers.messagepipeline import message_pipeline, CHANNEL_ONLYIMAGES, AUTHOR_BOT, SYSTEM
 from utils.embed_helpers import create_embed as utils_create_embed
 
 
@@ -13,6 +14,10 @@ class OnlyImages(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.embed_color = 0x2b2d31
+        message_pipeline(bot).register(self.handle_message, require=CHANNEL_ONLYIMAGES, exclude=AUTHOR_BOT | SYSTEM)
+
+    def cog_unload(self):
+        message_pipeline(self.bot).unregister(self.handle_message)
 
     def create_embed(self, title, description, color=None):
         embed = utils_create_embed(
@@ -79,15 +84,8 @@ class OnlyImages(commands.Cog):
         embed.set_thumbnail(url="")
         await ctx.respond(embed=embed)
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
-        if message.author.bot or message.type != discord.MessageType.default:
-            return
-        
-        channels = load_onlyimages()
-        if str(message.channel.id) not in channels:
-            return
-
+    async def handle_message(self, ctx):
+        message = ctx.message
         if not message.attachments:
             try:
                 await message.delete()
@@ -49,10 +49,16 @@ class CentralSetup(commands.Cog):
         ctx: discord.ApplicationContext,
         event: str,
         enabled: bool,
+        mode: discord.Option(
+            str,
+            "One thread per event, or a daily / per-user digest thread",
+            choices=["thread", "daily", "user"],
+            default=None,
+        ),
     ):
         cog = await self._get_cog_or_respond(ctx, "Logging", "Logging setup not available.")
         if cog:
-            await cog.configure_event(ctx, event, enabled)
+            await cog.configure_event(ctx, event, enabled, mode)
 
     @setup.command(name="logging-status", description="Show current logging event settings")
     @commands.has_permissions(administrator=True)
@@ -76,7 +82,7 @@ class CentralSetup(commands.Cog):
             inline=False,
         )
         formatted = "\n".join(
-            f"• `{name}`: {'✅ Enabled' if state else '❌ Disabled'}"
+            f"• `{name}`: {'✅ Enabled' if state else '❌ Disabled'}{f' ({state})' if isinstance(state, str) else ''}"
             for name, state in flags.items()
         )
         embed.add_field(name="Event Flags", value=formatted, inline=False)
@@ -3,19 +3,32 @@ import discord
 import datetime
 from extensions.statsextension import create_stats_embed
 from handlers.debug import LogDebug, LogError
-from handlers.config import load_stats, save_stats, MESSAGE_XP_COUNT, ATTACHMENT_XP_COUNT, VOICE_XP_COUNT, load_multiplier_config
+from handlers.stats import stats_service
+from handlers.activity import activity_store
+from handlers.config import MESSAGE_XP_COUNT, ATTACHMENT_XP_COUNT, VOICE_XP_COUNT, load_multiplier_config
+
+LEADERBOARD_PAGE_SIZE = 10
+PERIOD_CHOICES = ["all", "24h", "7d", "30d"]
+PERIOD_LABELS = {"24h": "Last 24 Hours", "7d": "Last 7 Days", "30d": "Last 30 Days"}
 
 class Leaderboards(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
 
     @commands.slash_command(name="stats", description="📊 Display user statistics")
-    async def stats(self, ctx: discord.ApplicationContext, user: discord.User = None):
+    async def stats(
+        self,
+        ctx: discord.ApplicationContext,
+        user: discord.User = None,
+        period: discord.Option(str, "Lifetime totals or a recent window", choices=PERIOD_CHOICES) = "all",
+    ):
         await ctx.defer()
         LogDebug(f"Stats command by {ctx.author.id}")
         try:
             user = user or ctx.author
-            stats = load_stats().get(str(user.id), {})
+            if period != "all":
+                return await self.send_period_stats(ctx, user, period)
+            stats = stats_service.get_user(user.id) or {}
             embed = create_stats_embed(f"📈 {user.display_name}'s Statistics", color_type="stats")
             embed.set_thumbnail(url=user.display_avatar.url)
 
@@ -34,6 +47,19 @@ class Leaderboards(commands.Cog):
                     value=f"```yaml\n{xp:.2f} XP```", 
                     inline=False
                 )
+                embed.add_field(
+                    name="🏆 Global Rank",
+                    value=f"```yaml\n#{stats_service.rank_of(user.id)} of {len(stats_service.ranking)}```",
+                    inline=False
+                )
+                if ctx.guild and str(ctx.guild.id) in server_stats:
+                    guild_rank = stats_service.guild_rank_of(user.id, ctx.guild.id)
+                    guild_total = len(stats_service.guild_ranking(ctx.guild.id))
+                    embed.add_field(
+                        name="🏠 Server Rank",
+                        value=f"```yaml\n#{guild_rank} of {guild_total}```",
+                        inline=False
+                    )
 
                 server_info = []
                 for guild_id, data in server_stats.items():
@@ -41,6 +67,7 @@ class Leaderboards(commands.Cog):
                     server_info.append(
                         f"-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-\n"
                         f"**{guild}**\n"
+                        f"⭐ XP: {data.get('xp', 0):.2f}\n"
                         f"📨 Messages: {data.get('messages', 0)}\n"
                         f"📎 Media: {data.get('media', 0)}\n"
                         f"🎧 Voice Minutes: {data.get('voiceminutes', 0)}"
@@ -59,22 +86,64 @@ class Leaderboards(commands.Cog):
             LogError(f"Stats error: {str(e)}")
             raise
 
+    async def send_period_stats(self, ctx: discord.ApplicationContext, user: discord.User, period: str):
+        totals = activity_store.totals(user.id, period)
+        embed = create_stats_embed(f"📈 {user.display_name}'s Statistics ({PERIOD_LABELS[period]})", color_type="stats")
+        embed.set_thumbnail(url=user.display_avatar.url)
+
+        if not totals["messages"] and not totals["voiceminutes"] and not totals["xp"]:
+            embed.description = f"```diff\n- No activity in the {PERIOD_LABELS[period].lower()}```"
+            return await ctx.followup.send(embed=embed)
+
+        embed.add_field(
+            name="🌍 All Servers",
+            value=f"```yaml\nXP: {totals['xp']:.2f}\nMessages: {totals['messages']:.0f}\n"
+                  f"Voice: {totals['voiceminutes']:.0f}m\n"
+                  f"Rank: #{activity_store.rank_of(user.id, period)}```",
+            inline=False
+        )
+        if ctx.guild:
+            guild_totals = activity_store.totals(user.id, period, ctx.guild.id)
+            guild_rank = activity_store.rank_of(user.id, period, ctx.guild.id)
+            embed.add_field(
+                name=f"🏠 {ctx.guild.name}",
+                value=f"```yaml\nXP: {guild_totals['xp']:.2f}\nMessages: {guild_totals['messages']:.0f}\n"
+                      f"Voice: {guild_totals['voiceminutes']:.0f}m\n"
+                      f"Rank: {f'#{guild_rank}' if guild_rank else '-'}```",
+                inline=False
+            )
+        await ctx.followup.send(embed=embed)
+
     @commands.slash_command(name="leaderboard", description="🏆 Global XP leaderboard")
-    async def leaderboard(self, ctx: discord.ApplicationContext):
+    async def leaderboard(
+        self,
+        ctx: discord.ApplicationContext,
+        scope: discord.Option(str, "Rank across all servers or only this one", choices=["global", "server"], default="global"),
+        page: discord.Option(int, "Page number", min_value=1, default=1),
+        period: discord.Option(str, "Lifetime XP or XP earned in a recent window", choices=PERIOD_CHOICES, default="all"),
+    ):
         await ctx.defer()
+        if period != "all":
+            return await self.send_period_leaderboard(ctx, period, page, server=scope == "server" and ctx.guild is not None)
+        if scope == "server" and ctx.guild:
+            return await self.send_server_leaderboard(ctx, page)
         LogDebug(f"Leaderboard viewed by {ctx.author.id}")
         try:
-            stats = load_stats()
+            total = len(stats_service.ranking)
+            pages = max(1, -(-total // LEADERBOARD_PAGE_SIZE))
+            page = min(page, pages)
+            offset = (page - 1) * LEADERBOARD_PAGE_SIZE
             embed = create_stats_embed(
                 "🌍 Global XP Leaderboard",
-                "```diff\n+ Top Performers Across All Servers\n+ Updated: " + datetime.datetime.now().strftime("%Y-%m-%d") + "```",
+                "```diff\n+ Top Performers Across All Servers\n+ Updated: " + datetime.datetime.now().strftime("%Y-%m-%d")
+                + f"\n+ Page {page}/{pages} ({total} users)```",
                 "leaderboard"
             )
 
-            if stats:
-                leaderboard = sorted(stats.items(), key=lambda x: x[1].get("xp", 0), reverse=True)[:10]
+            if total:
+                leaderboard = stats_service.top(LEADERBOARD_PAGE_SIZE, offset)
 
-                for rank, (user_id, data) in enumerate(leaderboard, 1):
+                for rank, (user_id, data) in enumerate(leaderboard, offset + 1):
                     member = ctx.guild.get_member(int(user_id))
                     xp = data.get("xp", 0)
                     level = data.get("level", int(xp // 20))
@@ -99,48 +168,53 @@ class Leaderboards(commands.Cog):
             raise
 
     def get_rank_emoji(self, rank):
+        if rank > 10:
+            return f"#{rank}"
         return ["🥇", "🥈", "🥉", "4️⃣", "5️⃣", "6️⃣", "7️⃣", "8️⃣", "9️⃣", "🔟"][rank-1]
     
     @commands.slash_command(name="serverleaderboard", description="🏆 Server-specific XP leaderboard")
-    async def server_leaderboard(self, ctx: discord.ApplicationContext):
+    async def server_leaderboard(
+        self,
+        ctx: discord.ApplicationContext,
+        page: discord.Option(int, "Page number", min_value=1, default=1),
+        period: discord.Option(str, "Lifetime XP or XP earned in a recent window", choices=PERIOD_CHOICES, default="all"),
+    ):
         """Displays XP rankings within current server"""
         await ctx.defer()
+        if period != "all":
+            return await self.send_period_leaderboard(ctx, period, page, server=True)
+        await self.send_server_leaderboard(ctx, page)
+
+    async def send_server_leaderboard(self, ctx: discord.ApplicationContext, page: int = 1):
         LogDebug(f"Server leaderboard viewed in {ctx.guild.id}")
         try:
-            stats = load_stats()
             current_guild = str(ctx.guild.id)
+            total = len(stats_service.guild_ranking(current_guild))
+            pages = max(1, -(-total // LEADERBOARD_PAGE_SIZE))
+            page = min(page, pages)
+            offset = (page - 1) * LEADERBOARD_PAGE_SIZE
             embed = create_stats_embed(
                 f"📊 {ctx.guild.name} Leaderboard",
-                "```diff\n+ Top Members In This Server\n+ Updated: " + datetime.datetime.now().strftime("%Y-%m-%d %H:%M") + "```",
+                "```diff\n+ Top Members In This Server\n+ Updated: " + datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+                + f"\n+ Page {page}/{pages} ({total} members)```",
                 "server_leaderboard"
             )
 
-            server_stats = []
-            for user_id, user_data in stats.items():
-                guild_data = user_data.get("servers", {}).get(current_guild)
-                if guild_data:
-                    server_stats.append((
-                        user_id,
-                        guild_data.get("messages", 0),
-                        guild_data.get("media", 0),
-                        guild_data.get("voiceminutes", 0),
-                        user_data.get("xp", 0),
-                        user_data.get("level", int(user_data.get("xp", 0) // 20))
-                    ))
-
-            if server_stats:
-                sorted_stats = sorted(server_stats, key=lambda x: x[4], reverse=True)[:10]
-                
-                for rank, (user_id, messages, media, voice, xp, level) in enumerate(sorted_stats, 1):
+            if total:
+                leaderboard = stats_service.guild_top(current_guild, LEADERBOARD_PAGE_SIZE, offset)
+
+                for rank, (user_id, user_data) in enumerate(leaderboard, offset + 1):
+                    guild_data = user_data["servers"][current_guild]
+                    level = user_data.get("level", int(user_data.get("xp", 0) // 20))
                     member = ctx.guild.get_member(int(user_id))
                     display_name = getattr(member, "display_name", f"User {user_id}")
                     
                     embed.add_field(
                         name=f"{self.get_rank_emoji(rank)} {display_name}",
-                        value=f"```yaml\nLevel: {level}\nXP: {xp:.2f}\n"
-                              f"Messages: {messages}\n" 
-                              f"Media: {media}\n"
-                              f"Voice: {voice}m```",
+                        value=f"```yaml\nLevel: {level}\nServer XP: {guild_data.get('xp', 0):.2f}\n"
+                              f"Messages: {guild_data.get('messages', 0)}\n" 
+                              f"Media: {guild_data.get('media', 0)}\n"
+                              f"Voice: {guild_data.get('voiceminutes', 0)}m```",
                         inline=False
                     )
             else:
@@ -151,6 +225,45 @@ class Leaderboards(commands.Cog):
             LogError(f"Server leaderboard error: {str(e)}")
             raise
 
+    async def send_period_leaderboard(self, ctx: discord.ApplicationContext, period: str, page: int = 1, server: bool = False):
+        """XP earned during ``period``, across all servers or in the current one"""
+        LogDebug(f"{period} leaderboard viewed by {ctx.author.id} (server={server})")
+        try:
+            guild_id = ctx.guild.id if server else None
+            offset = (page - 1) * LEADERBOARD_PAGE_SIZE
+            total, leaderboard = activity_store.top(period, LEADERBOARD_PAGE_SIZE, offset, guild_id)
+            pages = max(1, -(-total // LEADERBOARD_PAGE_SIZE))
+            if page > pages:
+                page = pages
+                offset = (page - 1) * LEADERBOARD_PAGE_SIZE
+                total, leaderboard = activity_store.top(period, LEADERBOARD_PAGE_SIZE, offset, guild_id)
+
+            title = f"📊 {ctx.guild.name} Leaderboard" if server else "🌍 Global XP Leaderboard"
+            embed = create_stats_embed(
+                f"{title} ({PERIOD_LABELS[period]})",
+                f"```diff\n+ Most Active In The {PERIOD_LABELS[period]}\n+ Updated: " + datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+                + f"\n+ Page {page}/{pages} ({total} {'members' if server else 'users'})```",
+                "server_leaderboard" if server else "leaderboard"
+            )
+
+            for rank, (user_id, totals) in enumerate(leaderboard, offset + 1):
+                member = ctx.guild.get_member(int(user_id)) if ctx.guild else None
+                display_name = getattr(member, "display_name", f"User {user_id}")
+                embed.add_field(
+                    name=f"{self.get_rank_emoji(rank)} {display_name}",
+                    value=f"```yaml\nXP: {totals['xp']:.2f}\n"
+                          f"Messages: {totals['messages']:.0f}\n"
+                          f"Voice: {totals['voiceminutes']:.0f}m```",
+                    inline=False
+                )
+            if not leaderboard:
+                embed.description = f"```diff\n- No activity in the {PERIOD_LABELS[period].lower()}```"
+
+            await ctx.followup.send(embed=embed)
+        except Exception as e:
+            LogError(f"Period leaderboard error: {str(e)}")
+            raise
+
 
 
     @commands.slash_command(name="xp-info", description="ℹ️ Show XP earning system details")
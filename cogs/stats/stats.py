@@ -1,43 +1,59 @@
-from discord.ext import commands
+from discord.ext import commands, tasks
 import discord
 import datetime
 from handlers.debug import LogError, LogDebug
+from handlers.stats import stats_service, STATS_FLUSH_INTERVAL
+from handlers.activity import activity_store
+from handlers.voicesessions import voice_sessions, VOICE_TICK_INTERVAL
+from handlers.messagepipeline import message_pipeline, GUILD, AUTHOR_BOT
 from handlers.config import (
-    load_stats,
-    save_stats,
     MESSAGE_XP_COUNT,
     ATTACHMENT_XP_COUNT,
     VOICE_XP_COUNT,
-    load_multiplier_config,
+    xp_multipliers,
 )
 
 class UserStats(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.voice_times = {}
-
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        if not message.guild or message.author.bot:
-            return
-
+        self.voice_restored = False
+        self.flush_stats.start()
+        self.voice_tick.start()
+        message_pipeline(bot).register(self.handle_message, require=GUILD, exclude=AUTHOR_BOT)
+
+    def cog_unload(self):
+        message_pipeline(self.bot).unregister(self.handle_message)
+        self.flush_stats.cancel()
+        self.voice_tick.cancel()
         try:
-            stats = load_stats()
-            user_id = str(message.author.id)
-            guild_id = str(message.guild.id)
-
-            if user_id not in stats:
-                stats[user_id] = {"xp": 0.0, "servers": {}, "level": 0}
+            voice_sessions.save(force=True)
+        except Exception as e:
+            LogError(f"[VOICE] Final session save failed: {str(e)}")
+        try:
+            stats_service.flush()
+        except Exception as e:
+            LogError(f"[STATS] Final flush failed: {str(e)}")
+        try:
+            activity_store.flush(force=True)
+        except Exception as e:
+            LogError(f"[ACTIVITY] Final save failed: {str(e)}")
 
-            # Initialize level if not present (for old users)
-            if "level" not in stats[user_id]:
-                stats[user_id]["level"] = int(stats[user_id]["xp"] // 20)
+    @tasks.loop(seconds=STATS_FLUSH_INTERVAL)
+    async def flush_stats(self):
+        try:
+            stats_service.flush()
+        except Exception as e:
+            LogError(f"[STATS] Periodic flush failed: {str(e)}")
+        try:
+            activity_store.flush()
+        except Exception as e:
+            LogError(f"[ACTIVITY] Periodic save failed: {str(e)}")
 
-            server_stats = stats[user_id]["servers"].setdefault(guild_id, {
-                "messages": 0,
-                "media": 0,
-                "voiceminutes": 0
-            })
+    async def handle_message(self, ctx):
+        message = ctx.message
+        try:
+            user_stats = stats_service.ensure_user(message.author.id)
+            server_stats = stats_service.ensure_server(user_stats, message.guild.id, message.author.id)
 
             xp_gain = MESSAGE_XP_COUNT
             server_stats["messages"] += 1
@@ -51,32 +67,27 @@ class UserStats(commands.Cog):
                 server_stats["media"] += media_count
                 LogDebug(f"[MSG] {message.author} sent {media_count} media attachment(s) in #{message.channel.name}")
 
-            # Load config for XP multipliers
-            config = load_multiplier_config()
-            if str(message.channel.id) in config.get("channels", []):
-                multipliers = [
-                    config["multipliers"].get(str(role.id), 1)
-                    for role in message.author.roles
-                ]
-                max_multiplier = max(multipliers) if multipliers else 1
-                if max_multiplier > 1:
-                    LogDebug(f"[XP-MULTI] {message.author} has XP multiplier {max_multiplier} in #{message.channel.name}")
-                xp_gain *= max_multiplier
+            multiplier = xp_multipliers.resolve(message.channel.id, message.author.roles)
+            if multiplier != 1:
+                if multiplier > 1:
+                    LogDebug(f"[XP-MULTI] {message.author} has XP multiplier {multiplier} in #{message.channel.name}")
+                xp_gain *= multiplier
 
-            stats[user_id]["xp"] += xp_gain
+            stats_service.add_xp(message.author.id, user_stats, xp_gain, server_stats, message.guild.id)
+            activity_store.record(message.author.id, message.guild.id, messages=1, xp=xp_gain)
 
             # Level-Up logic
-            old_level = stats[user_id]["level"]
-            new_level = int(stats[user_id]["xp"] // 20)
+            old_level = user_stats["level"]
+            new_level = int(user_stats["xp"] // 20)
             if new_level > old_level:
-                stats[user_id]["level"] = new_level
+                user_stats["level"] = new_level
                 try:
                     embed = discord.Embed(
                         title="🎉 Level Up!",
                         description=f"Congratulations, **{message.author.display_name}**!\n\nYou have reached **Level {new_level}**!",
                         color=discord.Color.gold()
                     )
-                    embed.add_field(name="Total XP", value=f"{stats[user_id]['xp']:.2f} XP", inline=False)
+                    embed.add_field(name="Total XP", value=f"{user_stats['xp']:.2f} XP", inline=False)
                     embed.add_field(name="Keep it up!", value="Stay active and climb even higher!", inline=False)
                     embed.set_thumbnail(url=message.author.display_avatar.url)
                     embed.set_footer(text="Maggibot Level System", icon_url=message.guild.icon.url if message.guild.icon else discord.Embed.Empty)
@@ -84,89 +95,144 @@ class UserStats(commands.Cog):
                 except Exception as dm_error:
                     LogError(f"[LEVEL-UP] Could not send DM to {message.author}: {dm_error}")
 
-            save_stats(stats)
+            stats_service.mark_dirty(message.author.id)
 
             LogDebug(f"[XP] {message.author} gained {xp_gain:.2f} XP from message in #{message.channel.name} (Guild: {message.guild.name})")
 
         except Exception as e:
             LogError(f"[ERROR] Message handling error: {str(e)}")
 
+    #=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+    # Voice XP
+    #=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+    @staticmethod
+    def earns_voice_xp(member, state):
+        """Members in the AFK channel or self-deafened do not earn voice XP"""
+        channel = state.channel if state else None
+        if channel is None or member.bot:
+            return False
+        if member.guild.afk_channel and channel.id == member.guild.afk_channel.id:
+            return False
+        return not state.self_deaf
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        await self.restore_voice_sessions()
+
+    async def restore_voice_sessions(self):
+        """Match stored sessions against who is in voice right now"""
+        present = {}
+        for guild in self.bot.guilds:
+            for channel in list(guild.voice_channels) + list(guild.stage_channels):
+                for member in channel.members:
+                    if self.earns_voice_xp(member, member.voice):
+                        present[(guild.id, member.id)] = channel.id
+
+        try:
+            credits = voice_sessions.restore(present)
+            await self.credit_voice_batch(credits)
+            voice_sessions.save()
+        except Exception as e:
+            LogError(f"[VOICE] Session restore failed: {str(e)}")
+        self.voice_restored = True
+
+    @tasks.loop(seconds=VOICE_TICK_INTERVAL)
+    async def voice_tick(self):
+        if not self.voice_restored:
+            # Cog (re)loaded after on_ready already fired
+            if self.bot.is_ready():
+                await self.restore_voice_sessions()
+            return
+        try:
+            await self.credit_voice_batch(voice_sessions.accrue())
+            voice_sessions.save()
+        except Exception as e:
+            LogError(f"[VOICE] Voice tick failed: {str(e)}")
+
+    async def credit_voice_batch(self, credits):
+        """Credit ``[(guild_id, user_id, channel_id, minutes), ...]``"""
+        for guild_id, user_id, channel_id, minutes in credits:
+            guild = self.bot.get_guild(int(guild_id))
+            member = guild.get_member(int(user_id)) if guild else None
+            channel = guild.get_channel(int(channel_id)) if guild else None
+            await self.credit_voice_minutes(guild_id, user_id, member, channel, minutes)
+        if credits:
+            LogDebug(f"[VOICE-TICK] Credited voice minutes to {len(credits)} member(s)")
+
+    async def credit_voice_minutes(self, guild_id, user_id, member, channel, minutes):
+        if minutes <= 0:
+            return
+        guild_id, user_id = str(guild_id), str(user_id)
+        user_stats = stats_service.ensure_user(user_id)
+        server_stats = stats_service.ensure_server(user_stats, guild_id, user_id)
+
+        server_stats["voiceminutes"] += minutes
+        xp_gain = VOICE_XP_COUNT * minutes
+
+        if member and channel:
+            multiplier = xp_multipliers.resolve(channel.id, member.roles)
+            if multiplier != 1:
+                if multiplier > 1:
+                    LogDebug(f"[XP-MULTI] {member} has voice XP multiplier {multiplier} in '{channel.name}'")
+                xp_gain *= multiplier
+
+        stats_service.add_xp(user_id, user_stats, xp_gain, server_stats, guild_id)
+        activity_store.record(user_id, guild_id, voiceminutes=minutes, xp=xp_gain)
+
+        # Level-Up logic for voice XP
+        old_level = user_stats.get("level", int(user_stats["xp"] // 20))
+        new_level = int(user_stats["xp"] // 20)
+        if new_level > old_level:
+            user_stats["level"] = new_level
+            if member:
+                try:
+                    embed = discord.Embed(
+                        title="🎉 Level Up!",
+                        description=f"Congratulations, **{member.display_name}**!\n\nYou have reached **Level {new_level}**!",
+                        color=discord.Color.gold()
+                    )
+                    embed.add_field(name="Total XP", value=f"{user_stats['xp']:.2f} XP", inline=False)
+                    embed.add_field(name="Keep it up!", value="Stay active and climb even higher!", inline=False)
+                    embed.set_thumbnail(url=member.display_avatar.url)
+                    embed.set_footer(text="Maggibot Level System", icon_url=member.guild.icon.url if member.guild.icon else discord.Embed.Empty)
+                    await member.send(embed=embed)
+                except Exception as dm_error:
+                    LogError(f"[LEVEL-UP] Could not send DM to {member}: {dm_error}")
+
+        stats_service.mark_dirty(user_id)
+
+        LogDebug(f"[XP] {member or user_id} gained {xp_gain:.2f} XP from {minutes} voice minutes in '{getattr(channel, 'name', channel)}' (Guild: {guild_id})")
+
     @commands.Cog.listener()
     async def on_voice_state_update(self, member, before, after):
-        if member.bot or before.channel == after.channel:
+        if member.bot:
+            return
+
+        was_earning = self.earns_voice_xp(member, before)
+        is_earning = self.earns_voice_xp(member, after)
+        if before.channel == after.channel and was_earning == is_earning:
             return
 
         try:
-            guild_id = str(member.guild.id)
-            user_id = str(member.id)
-            key = (user_id, guild_id)
             now = datetime.datetime.utcnow()
 
-            # Log leaving a voice channel
-            if before.channel:
+            if before.channel and before.channel != after.channel:
                 LogDebug(f"[VOICE-LEAVE] {member} left voice channel '{before.channel.name}' (ID: {before.channel.id}) at {now.isoformat()} UTC")
 
-                if key in self.voice_times:
-                    join_time = self.voice_times[key]
-                    duration = now - join_time
-                    minutes = int(duration.total_seconds() // 60)
-
-                    LogDebug(f"[VOICE-DURATION] {member} was in voice channel for {minutes} minute(s)")
-
-                    if minutes > 0:
-                        stats = load_stats()
-                        user_stats = stats.setdefault(user_id, {"xp": 0.0, "servers": {}, "level": 0})
-                        server_stats = user_stats["servers"].setdefault(guild_id, {
-                            "messages": 0,
-                            "media": 0,
-                            "voiceminutes": 0
-                        })
-
-                        server_stats["voiceminutes"] += minutes
-                        xp_gain = VOICE_XP_COUNT * minutes
-
-                        config = load_multiplier_config()
-                        if str(before.channel.id) in config.get("channels", []):
-                            multipliers = [
-                                config["multipliers"].get(str(role.id), 1)
-                                for role in member.roles
-                            ]
-                            max_multiplier = max(multipliers) if multipliers else 1
-                            if max_multiplier > 1:
-                                LogDebug(f"[XP-MULTI] {member} has voice XP multiplier {max_multiplier} in '{before.channel.name}'")
-                            xp_gain *= max_multiplier
-
-                        user_stats["xp"] += xp_gain
-
-                        # Level-Up logic for voice XP
-                        old_level = user_stats.get("level", int(user_stats["xp"] // 20))
-                        new_level = int(user_stats["xp"] // 20)
-                        if new_level > old_level:
-                            user_stats["level"] = new_level
-                            try:
-                                embed = discord.Embed(
-                                    title="🎉 Level Up!",
-                                    description=f"Congratulations, **{member.display_name}**!\n\nYou have reached **Level {new_level}**!",
-                                    color=discord.Color.gold()
-                                )
-                                embed.add_field(name="Total XP", value=f"{user_stats['xp']:.2f} XP", inline=False)
-                                embed.add_field(name="Keep it up!", value="Stay active and climb even higher!", inline=False)
-                                embed.set_thumbnail(url=member.display_avatar.url)
-                                embed.set_footer(text="Maggibot Level System", icon_url=member.guild.icon.url if member.guild.icon else discord.Embed.Empty)
-                                await member.send(embed=embed)
-                            except Exception as dm_error:
-                                LogError(f"[LEVEL-UP] Could not send DM to {member}: {dm_error}")
-
-                        save_stats(stats)
-
-                        LogDebug(f"[XP] {member} gained {xp_gain:.2f} XP from {minutes} voice minutes in '{before.channel.name}' (Guild: {member.guild.name})")
-
-                    del self.voice_times[key]
-
-            # Log joining a voice channel
-            if after.channel:
-                self.voice_times[key] = now
+            # Settle the running session; a new one starts below if the member still earns XP
+            closed = voice_sessions.stop(member.guild.id, member.id)
+            if closed:
+                channel_id, minutes = closed
+                LogDebug(f"[VOICE-DURATION] {member} earned {minutes} more minute(s) in their session")
+                channel = before.channel if before.channel and before.channel.id == channel_id else member.guild.get_channel(channel_id)
+                await self.credit_voice_minutes(member.guild.id, member.id, member, channel, minutes)
+
+            if is_earning:
+                voice_sessions.start(member.guild.id, member.id, after.channel.id)
+            if after.channel and before.channel != after.channel:
                 LogDebug(f"[VOICE-JOIN] {member} joined voice channel '{after.channel.name}' (ID: {after.channel.id}) at {now.isoformat()} UTC")
+            elif after.channel and not is_earning:
+                LogDebug(f"[VOICE-IDLE] {member} is AFK or self-deafened in '{after.channel.name}', voice XP paused")
 
         except Exception as e:
             LogError(f"[ERROR] Voice XP error: {str(e)}")
@@ -4,7 +4,8 @@ import json
 import os
 from dotenv import load_dotenv
 from handlers.debug import LogSystem, LogError, LogDebug, LogNetwork
-from handlers.config import load_stats, save_stats, load_multiplier_config, save_multiplier_config
+from handlers.stats import stats_service
+from handlers.config import load_multiplier_config, save_multiplier_config
 from utils.embed_helpers import create_embed as utils_create_embed
 
 load_dotenv()
@@ -121,7 +122,7 @@ class XPSetup(commands.Cog):
         await ctx.defer()
         
         try:
-            stats = load_stats()
+            stats = stats_service.stats
             total = len(stats)
             active = sum(1 for u in stats.values() if u.get("xp", 0) > 0)
             
@@ -0,0 +1,20 @@
+import discord
+from discord.ext import commands
+from handlers.auditlog import audit_log
+from handlers.debug import LogError
+
+class AuditLogIngest(commands.Cog):
+    """Feeds audit log entries pushed by the gateway into handlers.auditlog"""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    @commands.Cog.listener()
+    async def on_audit_log_entry(self, entry: discord.AuditLogEntry):
+        try:
+            audit_log.ingest(entry)
+        except Exception as e:
+            LogError(f"[AUDIT] Failed to ingest audit log entry {entry.id}: {str(e)}")
+
+def setup(bot: commands.Bot):
+    bot.add_cog(AuditLogIngest(bot))
@@ -3,6 +3,7 @@ from discord.ext import commands
 from datetime import datetime
 import os
 from handlers.debug import LogDebug, LogError
+from handlers.sendqueue import send_queue
 from typing import Optional
 
 class CommandLogging(commands.Cog):
@@ -124,7 +125,7 @@ class CommandLogging(commands.Cog):
                 LogError(f"Missing permissions to send messages in {log_channel.name}")
                 return
 
-            await log_channel.send(embed=embed)
+            send_queue.enqueue(log_channel, embed)
             
         except Exception as e:
             LogError(f"Failed to log command: {str(e)}")
@@ -0,0 +1,25 @@
+from discord.ext import commands
+from handlers.debug import LogError
+from handlers.metricsexporter import MetricsExporter, METRICS_ENABLED
+
+class MetricsEndpoint(commands.Cog):
+    """Local Prometheus endpoint (METRICS_ENABLED=true)"""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.exporter = MetricsExporter(bot)
+        self.exporter.install()
+        bot.loop.create_task(self.start_exporter())
+
+    async def start_exporter(self):
+        try:
+            await self.exporter.start()
+        except OSError as e:
+            LogError(f"Metrics endpoint could not bind {self.exporter.host}:{self.exporter.port}: {str(e)}")
+
+    def cog_unload(self):
+        self.bot.loop.create_task(self.exporter.stop())
+
+def setup(bot: commands.Bot):
+    if METRICS_ENABLED:
+        bot.add_cog(MetricsEndpoint(bot))
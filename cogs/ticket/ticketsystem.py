@@ -8,6 +8,7 @@ import io
 import html
 import handlers.config as config
 from handlers.debug import LogDebug, LogError
+from handlers.messagepipeline import message_pipeline, GUILD, DM, AUTHOR_BOT
 
 
 def NoPrivateMessage(ctx):
@@ -21,9 +22,13 @@ def NoPrivateMessage(ctx):
 class TicketSystem(Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.serverconfig = config.loadserverconfig()
         self.tickets = config.load_ticket_data()
         self.save_ticket_data = config.save_ticket_data
+        message_pipeline(bot).register(self.handle_message, exclude=AUTHOR_BOT, predicate=self.has_ticket_traffic)
+
+    @property
+    def serverconfig(self):
+        return config.loadserverconfig()
 
     class TicketOpenView(discord.ui.View):
         def __init__(self, cog):
@@ -85,6 +90,7 @@ class TicketSystem(Cog):
             await self.cog.button_close_ticket(interaction, self.guild_id, self.user_id)
 
     def cog_unload(self):
+        message_pipeline(self.bot).unregister(self.handle_message)
         self.ticket_check_loop.cancel()
 
     async def check_if_able_dm(self, user: discord.User):
@@ -504,7 +510,7 @@ class TicketSystem(Cog):
         if guild_id not in self.tickets:
             self.tickets[guild_id] = {}
         self.tickets[guild_id][str(ctx.author.id)] = ticket_data
-        self.save_ticket_data(self.tickets)
+        self.save_ticket_data(self.tickets, guild_ids=[guild_id])
 
         embed_channel = discord.Embed(
             title="🎟️ Support Ticket Created",
@@ -652,12 +658,12 @@ class TicketSystem(Cog):
 
         # Update ticket status to Closed before locking
         ticket_data["status"] = "Closed"
-        self.save_ticket_data(self.tickets)
+        self.save_ticket_data(self.tickets, guild_ids=[guild_id])
 
         del self.tickets[guild_id][user_id]
         if not self.tickets[guild_id]:
             del self.tickets[guild_id]
-        self.save_ticket_data(self.tickets)
+        self.save_ticket_data(self.tickets, guild_ids=[guild_id])
 
         closed_tag = self.get_tag_by_name(ticket_thread.parent, "closed")
         edit_kwargs = {"locked": True}
@@ -691,7 +697,7 @@ class TicketSystem(Cog):
         ticket_data["assigned_to"] = agent.id
         ticket_data["status"] = "In Progress"
         ticket_data["last_activity"] = datetime.datetime.utcnow().isoformat()
-        self.save_ticket_data(self.tickets)
+        self.save_ticket_data(self.tickets, guild_ids=[guild_id])
 
         embed_assign = discord.Embed(
             title="Ticket Assigned",
@@ -815,7 +821,7 @@ class TicketSystem(Cog):
         if guild_id not in self.tickets:
             self.tickets[guild_id] = {}
         self.tickets[guild_id][str(user.id)] = data
-        self.save_ticket_data(self.tickets)
+        self.save_ticket_data(self.tickets, guild_ids=[guild_id])
 
         embed_channel = discord.Embed(
             title="🎟️ Support Ticket Created",
@@ -882,7 +888,7 @@ class TicketSystem(Cog):
         ticket_data["assigned_to"] = interaction.user.id
         ticket_data["status"] = "In Progress"
         ticket_data["last_activity"] = datetime.datetime.utcnow().isoformat()
-        self.save_ticket_data(self.tickets)
+        self.save_ticket_data(self.tickets, guild_ids=[guild_id])
 
         embed = discord.Embed(
             title="Ticket Claimed",
@@ -956,12 +962,12 @@ class TicketSystem(Cog):
             LogError(f"Failed to send DM to {user_id}: {e}")
 
         ticket_data["status"] = "Closed"
-        self.save_ticket_data(self.tickets)
+        self.save_ticket_data(self.tickets, guild_ids=[guild_id])
 
         del self.tickets[guild_id][user_id]
         if not self.tickets[guild_id]:
             del self.tickets[guild_id]
-        self.save_ticket_data(self.tickets)
+        self.save_ticket_data(self.tickets, guild_ids=[guild_id])
 
         closed_tag = self.get_tag_by_name(ticket_thread.parent, "closed")
         edit_kwargs = {"locked": True}
@@ -1030,7 +1036,7 @@ class TicketSystem(Cog):
                         )
                         await log_channel.send(embed=embed_escalation)
                 ticket_data["status"] = "Escalated"
-                self.save_ticket_data(self.tickets)
+                self.save_ticket_data(self.tickets, guild_ids=[guild_id])
 
     @ticket_check_loop.before_loop
     async def before_ticket_check(self):
@@ -1087,14 +1093,17 @@ class TicketSystem(Cog):
                 del self.tickets[guild_id][user_id]
                 if not self.tickets[guild_id]:
                     del self.tickets[guild_id]
-                self.save_ticket_data(self.tickets)
+                self.save_ticket_data(self.tickets, guild_ids=[guild_id])
 
-    @Cog.listener()
-    async def on_message(self, message: discord.Message):
-        if message.author.bot:
-            return
+    def has_ticket_traffic(self, ctx):
+        """DMs may belong to a ticket; guild messages only in guilds with open tickets"""
+        if ctx.flags & DM:
+            return True
+        return bool(ctx.flags & GUILD) and str(ctx.guild_id) in self.tickets
 
-        if isinstance(message.channel, discord.DMChannel):
+    async def handle_message(self, ctx):
+        message = ctx.message
+        if ctx.flags & DM:
             user = message.author
             # Forward DM only if a ticket exists – otherwise ignore
             for guild_id, tickets in self.tickets.items():
@@ -1118,12 +1127,12 @@ class TicketSystem(Cog):
                             ticket_data["last_activity"] = (
                                 datetime.datetime.utcnow().isoformat()
                             )
-                            self.save_ticket_data(self.tickets)
+                            self.save_ticket_data(self.tickets, guild_ids=[guild_id])
                         except Exception as e:
                             LogError(f"Error forwarding DM message: {e}")
                     break
 
-        elif message.guild is not None:
+        else:
             guild_id = str(message.guild.id)
             if guild_id in self.tickets:
                 for user_id, ticket_data in self.tickets[guild_id].items():
@@ -2,6 +2,7 @@ import discord
 import datetime
 import handlers.config as cfg
 from handlers.debug import LogDebug, LogError, LogModeration
+from handlers.sendqueue import send_queue
 
 def create_mod_embed(title, description, color_type='info', author=None):
     embed_colors = {
@@ -37,21 +38,15 @@ async def send_mod_log(guild_id, embed_data, bot):
         # Text channel logging
         log_channel = cfg.get_log_channel(guild)
         if log_channel and isinstance(log_channel, discord.TextChannel):
-            try:
-                await log_channel.send(embed=embed)
-                LogModeration(f"Log sent to channel {log_channel.id}")
-            except Exception as e:
-                LogError(f"Failed to send log to text channel: {e}")
+            send_queue.enqueue(log_channel, embed)
+            LogModeration(f"Log queued for channel {log_channel.id}")
         else:
             LogDebug(f"No log channel for guild {guild_id}")
 
         # Forum logging
         forum = cfg.get_logging_forum(guild)
         if forum and isinstance(forum, discord.ForumChannel):
-            try:
-                await forum.create_thread(name=embed.title, embed=embed)
-            except Exception as e:
-                LogError(f"Failed to create log thread: {e}")
+            send_queue.enqueue_thread(forum, embed.title, embed)
     except Exception as e:
         LogError(f"Failed to send mod log: {str(e)}")
 
@@ -0,0 +1,338 @@
+import os
+import time
+from array import array
+from handlers.config import load_activity, save_activity
+from handlers.debug import LogDebug
+from handlers.ranking import RankIndex
+
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Activity Windows Configuration
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+ACTIVITY_SAVE_INTERVAL = float(os.getenv("ACTIVITY_SAVE_INTERVAL", 300))
+
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Activity Series
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Recent activity of one user in one guild as two ring buffers per metric: the
+# last HOUR_SLOTS hours at hour resolution and the last DAY_SLOTS days at day
+# resolution. Every event lands in its hour and its day bucket; hours roll off
+# after a day, so older activity is only kept downsampled to days. A window is
+# the sum of at most HOUR_SLOTS or DAY_SLOTS buckets, whatever the traffic.
+#
+# Buckets are aligned to UTC hours/days since the epoch. Slot i of a ring holds
+# the newest hour (day) that is congruent to i; ``hour``/``day`` remember the
+# newest one written so stale slots can be cleared when the ring moves on.
+METRICS = ("messages", "voiceminutes", "xp")
+HOUR_SLOTS = 24
+DAY_SLOTS = 30
+HOUR = 3600
+DAY = 86400
+_DAY_BASE = len(METRICS) * HOUR_SLOTS
+_SLOTS = _DAY_BASE + len(METRICS) * DAY_SLOTS
+
+# period name -> (ring, bucket count)
+PERIODS = {
+    "24h": ("hour", 24),
+    "7d": ("day", 7),
+    "30d": ("day", 30),
+}
+
+
+class ActivitySeries:
+    __slots__ = ("hour", "day", "slots")
+
+    def __init__(self, hour=0, day=0, slots=None):
+        self.hour = hour
+        self.day = day
+        # float32 halves the footprint; per-bucket values stay far below its precision limits
+        self.slots = array("f", slots) if slots is not None else array("f", bytes(4 * _SLOTS))
+
+    @staticmethod
+    def _clear(slots, base, ring, first, last):
+        """Zero the buckets of every metric for units ``first`` to ``last``."""
+        for unit in range(first, min(last, first + ring - 1) + 1):
+            index = unit % ring
+            for metric in range(len(METRICS)):
+                slots[base + metric * ring + index] = 0.0
+
+    def record(self, now, messages=0, voiceminutes=0, xp=0.0):
+        hour, day = int(now // HOUR), int(now // DAY)
+        slots = self.slots
+        values = (messages, voiceminutes, xp)
+
+        if hour > self.hour:
+            self._clear(slots, 0, HOUR_SLOTS, max(self.hour + 1, hour - HOUR_SLOTS + 1), hour)
+            self.hour = hour
+        if hour > self.hour - HOUR_SLOTS:
+            index = hour % HOUR_SLOTS
+            for metric, value in enumerate(values):
+                if value:
+                    slots[metric * HOUR_SLOTS + index] += value
+
+        if day > self.day:
+            self._clear(slots, _DAY_BASE, DAY_SLOTS, max(self.day + 1, day - DAY_SLOTS + 1), day)
+            self.day = day
+        if day > self.day - DAY_SLOTS:
+            index = day % DAY_SLOTS
+            for metric, value in enumerate(values):
+                if value:
+                    slots[_DAY_BASE + metric * DAY_SLOTS + index] += value
+
+    def window(self, period, now):
+        """``(messages, voiceminutes, xp)`` summed over ``period`` ending at ``now``."""
+        ring, count = PERIODS[period]
+        if ring == "hour":
+            base, size, newest, current = 0, HOUR_SLOTS, self.hour, int(now // HOUR)
+        else:
+            base, size, newest, current = _DAY_BASE, DAY_SLOTS, self.day, int(now // DAY)
+
+        first = max(current - count + 1, newest - size + 1)
+        last = min(current, newest)
+        totals = [0.0] * len(METRICS)
+        slots = self.slots
+        for unit in range(first, last + 1):
+            index = unit % size
+            for metric in range(len(METRICS)):
+                totals[metric] += slots[base + metric * size + index]
+        return totals
+
+    def expired(self, now):
+        """True once nothing recorded here falls inside any window."""
+        return self.day <= int(now // DAY) - DAY_SLOTS
+
+    def to_json(self):
+        return {"h": self.hour, "d": self.day, "s": [round(value, 4) for value in self.slots]}
+
+    @classmethod
+    def from_json(cls, data):
+        slots = data.get("s")
+        if not slots or len(slots) != _SLOTS:
+            slots = None
+        return cls(data.get("h", 0), data.get("d", 0), slots)
+
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Period Rankings
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Within one hour (24h) or one day (7d/30d) a window covers a fixed set of
+# buckets, so totals only grow. A ranking is built for the current unit and
+# then only the users recorded since the last query are re-ranked; the next
+# unit starts from a fresh build.
+def _unit(period, now):
+    ring, _ = PERIODS[period]
+    return int(now // (HOUR if ring == "hour" else DAY))
+
+class PeriodRanking:
+    """RankIndex of one (period, guild, metric) leaderboard for one unit."""
+
+    __slots__ = ("unit", "index", "values", "stale")
+
+    def __init__(self, unit, entries):
+        self.unit = unit
+        self.values = dict(entries)
+        self.index = RankIndex((int(user_id), value) for user_id, value in self.values.items())
+        self.stale = set()
+
+    def set(self, user_id, value):
+        old = self.values.get(user_id)
+        if old is None:
+            if value > 0:
+                self.index.insert(int(user_id), value)
+                self.values[user_id] = value
+        elif value > 0:
+            self.index.update(int(user_id), old, value)
+            self.values[user_id] = value
+        else:
+            self.index.remove(int(user_id), old)
+            del self.values[user_id]
+
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Activity Store
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+def _totals(values):
+    return dict(zip(METRICS, values))
+
+class ActivityStore:
+    """Windowed (24h / 7d / 30d) activity per user and guild.
+
+    Only members active within the last DAY_SLOTS days have a series, so period
+    leaderboards rank that set rather than every user that ever posted. The
+    store is saved every ``save_interval`` seconds by the stats flush task.
+    The saved document is kept between saves and only the series changed since
+    the last save are serialised again. Leaderboards keep a PeriodRanking per
+    (guild or None, period, metric) queried, dropped again at the daily prune.
+    """
+
+    def __init__(self, save_interval=ACTIVITY_SAVE_INTERVAL):
+        self.save_interval = save_interval
+        self._guilds = None
+        self._users = {}
+        self._rankings = {}  # guild_id or None -> {(period, metric): PeriodRanking}
+        self._document = None
+        self._dirty = set()
+        self._pruned_day = None
+        self._last_save = time.monotonic()
+
+    @property
+    def guilds(self):
+        """``{guild_id: {user_id: ActivitySeries}}``, loaded on first use."""
+        if self._guilds is None:
+            self._guilds = {}
+            self._document = {}
+            for guild_id, members in load_activity().items():
+                for user_id, data in members.items():
+                    guild_id, user_id = str(guild_id), str(user_id)
+                    self._attach(guild_id, user_id, ActivitySeries.from_json(data))
+                    self._document.setdefault(guild_id, {})[user_id] = data
+        return self._guilds
+
+    def _attach(self, guild_id, user_id, series):
+        self._guilds.setdefault(guild_id, {})[user_id] = series
+        self._users.setdefault(user_id, {})[guild_id] = series
+
+    def record(self, user_id, guild_id, messages=0, voiceminutes=0, xp=0.0, now=None):
+        user_id, guild_id = str(user_id), str(guild_id)
+        now = time.time() if now is None else now
+        series = self.guilds.get(guild_id, {}).get(user_id)
+        if series is None:
+            series = ActivitySeries(int(now // HOUR), int(now // DAY))
+            self._attach(guild_id, user_id, series)
+        series.record(now, messages, voiceminutes, xp)
+        self._dirty.add((guild_id, user_id))
+        for scope in (guild_id, None):
+            for ranking in self._rankings.get(scope, {}).values():
+                ranking.stale.add(user_id)
+
+    def totals(self, user_id, period, guild_id=None, now=None):
+        """``{"messages", "voiceminutes", "xp"}`` of ``user_id`` over ``period``,
+        in ``guild_id`` or summed across guilds."""
+        now = time.time() if now is None else now
+        self.guilds  # load on first use
+        series_by_guild = self._users.get(str(user_id), {})
+        if guild_id is not None:
+            series = series_by_guild.get(str(guild_id))
+            return _totals(series.window(period, now) if series else [0.0] * len(METRICS))
+
+        values = [0.0] * len(METRICS)
+        for series in series_by_guild.values():
+            for metric, value in enumerate(series.window(period, now)):
+                values[metric] += value
+        return _totals(values)
+
+    def _ranked(self, period, guild_id, metric, now):
+        """``(user_id, totals)`` of everyone with ``metric`` > 0 in the window."""
+        if guild_id is not None:
+            user_ids = self.guilds.get(str(guild_id), {}).keys()
+        else:
+            self.guilds  # load on first use
+            user_ids = self._users.keys()
+        for user_id in user_ids:
+            totals = self.totals(user_id, period, guild_id, now)
+            if totals[metric] > 0:
+                yield user_id, totals
+
+    def _ranking(self, period, guild_id, metric, now):
+        """The PeriodRanking for ``now``, re-ranking users recorded since the
+        last query, or rebuilt when the window moved to a new unit."""
+        unit = _unit(period, now)
+        rankings = self._rankings.setdefault(guild_id, {})
+        ranking = rankings.get((period, metric))
+        if ranking is None or ranking.unit != unit:
+            entries = ((user_id, totals[metric]) for user_id, totals in self._ranked(period, guild_id, metric, now))
+            ranking = rankings[(period, metric)] = PeriodRanking(unit, entries)
+        elif ranking.stale:
+            for user_id in ranking.stale:
+                ranking.set(user_id, self.totals(user_id, period, guild_id, now)[metric])
+            ranking.stale.clear()
+        return ranking
+
+    def top(self, period, count=10, offset=0, guild_id=None, metric="xp", now=None):
+        """``(total, [(user_id, totals), ...])`` for one page of the ``period``
+        leaderboard, where ``total`` is the number of ranked users."""
+        now = time.time() if now is None else now
+        guild_id = None if guild_id is None else str(guild_id)
+        ranking = self._ranking(period, guild_id, metric, now)
+        page = [
+            (str(user_id), self.totals(user_id, period, guild_id, now))
+            for user_id, _ in ranking.index.top(count, offset)
+        ]
+        return len(ranking.index), page
+
+    def rank_of(self, user_id, period, guild_id=None, metric="xp", now=None):
+        """1-based rank of ``user_id`` on the ``period`` leaderboard, or None
+        if they had no activity in it."""
+        now = time.time() if now is None else now
+        guild_id = None if guild_id is None else str(guild_id)
+        ranking = self._ranking(period, guild_id, metric, now)
+        value = ranking.values.get(str(user_id))
+        if value is None:
+            return None
+        return ranking.index.rank(int(user_id), value)
+
+    def prune(self, now=None):
+        """Drop series that no longer contribute to any window."""
+        now = time.time() if now is None else now
+        # Series only expire when the day rolls over
+        self._pruned_day = int(now // DAY)
+        # Leaderboards nobody asked for since are not worth keeping current
+        self._rankings.clear()
+        removed = 0
+        for guild_id, members in list(self.guilds.items()):
+            for user_id, series in list(members.items()):
+                if series.expired(now):
+                    del members[user_id]
+                    user_series = self._users[user_id]
+                    del user_series[guild_id]
+                    if not user_series:
+                        del self._users[user_id]
+                    self._dirty.add((guild_id, user_id))
+                    removed += 1
+            if not members:
+                del self._guilds[guild_id]
+        return removed
+
+    def to_json(self):
+        """The document as saved, with every pending change applied."""
+        self.guilds  # load on first use
+        self._apply(self._dirty)
+        return self._document
+
+    def _apply(self, changed):
+        """Re-serialise the ``(guild_id, user_id)`` series in ``changed`` into
+        the saved document. Returns the guild ids touched."""
+        document = self._document
+        guild_ids = set()
+        for guild_id, user_id in changed:
+            series = self._guilds.get(guild_id, {}).get(user_id)
+            members = document.get(guild_id)
+            if series is not None:
+                if members is None:
+                    members = document[guild_id] = {}
+                members[user_id] = series.to_json()
+            elif members is not None:
+                members.pop(user_id, None)
+                if not members:
+                    del document[guild_id]
+            guild_ids.add(guild_id)
+        return guild_ids
+
+    def flush(self, force=False):
+        """Persist the store if it changed and ``save_interval`` has passed
+        (or ``force``). Returns True if anything was written."""
+        if self._guilds is None or not self._dirty:
+            return False
+        if not force and time.monotonic() - self._last_save < self.save_interval:
+            return False
+
+        removed = self.prune() if self._pruned_day != int(time.time() // DAY) else 0
+        dirty, self._dirty = self._dirty, set()
+        try:
+            save_activity(self._document, guild_ids=self._apply(dirty))
+        except Exception:
+            self._dirty |= dirty
+            raise
+        self._last_save = time.monotonic()
+        LogDebug(f"[ACTIVITY] Saved {len(dirty)} changed series ({removed} expired)")
+        return True
+
+
+activity_store = ActivityStore()
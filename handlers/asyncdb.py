@@ -0,0 +1,199 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import handlers.config as config
+import handlers.database as database
+from handlers.database import DB_TYPE, current_sqlite_connection, get_pool_stats
+from handlers.debug import LogError, LogSystem
+from handlers.macindex import mac_index
+from handlers.metrics import histogram, get_histograms, describe
+
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Async Database Facade
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Coroutines call these instead of the blocking handlers.config MAC helpers so
+# a slow MySQL round-trip never stalls the gateway. Queries run on a bounded
+# worker pool, are timed per query type and give up after DB_QUERY_TIMEOUT.
+DB_WORKERS = int(os.getenv("DB_WORKERS", 4))
+DB_MAX_PENDING = int(os.getenv("DB_MAX_PENDING", 64))
+DB_QUERY_TIMEOUT = float(os.getenv("DB_QUERY_TIMEOUT", 5))
+MAC_INDEX_RETRY = float(os.getenv("MAC_INDEX_RETRY", 60))
+
+_db_executor = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix="maggibot-db")
+_pending_slots = None
+timeout_counts = {}
+describe("db_query_seconds", "Latency of MAC database queries", "query")
+
+class _Job:
+    __slots__ = ("fn", "args", "cancelled", "conn", "lock")
+
+    def __init__(self, fn, args):
+        self.fn = fn
+        self.args = args
+        self.cancelled = threading.Event()
+        self.conn = None
+        self.lock = threading.Lock()
+
+    def run(self):
+        # Skip work whose caller already gave up while it sat in the queue
+        if self.cancelled.is_set():
+            raise asyncio.CancelledError()
+        with self.lock:
+            self.conn = current_sqlite_connection()
+        try:
+            return self.fn(*self.args)
+        finally:
+            with self.lock:
+                self.conn = None
+
+    def cancel(self):
+        self.cancelled.set()
+        with self.lock:
+            if self.conn is not None:
+                # Aborts the running SQLite statement; safe from any thread
+                self.conn.interrupt()
+
+def _slots():
+    global _pending_slots
+    if _pending_slots is None:
+        _pending_slots = asyncio.Semaphore(DB_MAX_PENDING)
+    return _pending_slots
+
+async def run_query(query_type, fn, *args, timeout=None):
+    """Run blocking ``fn(*args)`` on the DB worker pool.
+
+    Raises ``asyncio.TimeoutError`` after ``timeout`` seconds (default
+    DB_QUERY_TIMEOUT). On timeout or cancellation the job is marked cancelled
+    so it is skipped if it has not started, and interrupted if it is a running
+    SQLite statement.
+    """
+    started = time.perf_counter()
+    if DB_TYPE == "json":
+        # JSON lookups are in-process and the files are written by save_data
+        try:
+            return fn(*args)
+        finally:
+            histogram("db_query_seconds", query_type).observe(time.perf_counter() - started)
+
+    timeout = DB_QUERY_TIMEOUT if timeout is None else timeout
+    loop = asyncio.get_running_loop()
+    job = _Job(fn, args)
+    try:
+        async with _slots():
+            future = loop.run_in_executor(_db_executor, job.run)
+            return await asyncio.wait_for(future, timeout)
+    except asyncio.TimeoutError:
+        job.cancel()
+        timeout_counts[query_type] = timeout_counts.get(query_type, 0) + 1
+        LogError(f"Database query '{query_type}' timed out after {timeout}s")
+        raise
+    except asyncio.CancelledError:
+        job.cancel()
+        raise
+    finally:
+        histogram("db_query_seconds", query_type).observe(time.perf_counter() - started)
+
+async def check_db_health():
+    """Run the database health check on the worker pool. False on timeout."""
+    try:
+        return await run_query("health_check", database.check_db_health)
+    except asyncio.TimeoutError:
+        database.db_health["healthy"] = False
+        database.db_health["checked_at"] = time.time()
+        return False
+
+def get_query_latency():
+    """``{query type: Histogram}`` for every query type seen so far."""
+    return get_histograms("db_query_seconds")
+
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# MAC Queries
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Reads are answered from the resident ban index (handlers.macindex) once it
+# is loaded; until then they fall through to the store. After a failed load
+# the index is not retried for MAC_INDEX_RETRY seconds, and retries run in the
+# background so a join during a database outage only pays for a point lookup.
+_index_lock = None
+_index_task = None
+_index_retry_at = 0.0
+
+async def load_mac_index(force=False):
+    """Load the MAC ban index once (or again with ``force``). Returns True if loaded."""
+    global _index_lock, _index_retry_at
+    if mac_index.loaded and not force:
+        return True
+    if _index_lock is None:
+        _index_lock = asyncio.Lock()
+    async with _index_lock:
+        if mac_index.loaded and not force:
+            return True
+        if force:
+            mac_index.invalidate()
+        try:
+            # Full table reads; allow more than the per-lookup timeout
+            loaded = await run_query(
+                "mac_index_load", mac_index.load, config.mac_load_bans, config.mac_load_bypasses,
+                timeout=DB_QUERY_TIMEOUT * 6,
+            )
+        except Exception as e:
+            LogError(f"Failed to load MAC ban index: {str(e)}")
+            loaded = False
+        if loaded:
+            _index_retry_at = 0.0
+            LogSystem(f" MAC ban index loaded: {len(mac_index)} bans in {mac_index.load_seconds * 1000:.1f} ms")
+        else:
+            _index_retry_at = time.monotonic() + MAC_INDEX_RETRY
+        return loaded
+
+def ensure_mac_index():
+    """True if the ban index is loaded. Otherwise starts a background load,
+    unless one is running or the last one failed under MAC_INDEX_RETRY
+    seconds ago, and returns False without waiting for it."""
+    global _index_task
+    if mac_index.loaded:
+        return True
+    if (_index_task is None or _index_task.done()) and time.monotonic() >= _index_retry_at:
+        _index_task = asyncio.get_running_loop().create_task(load_mac_index())
+    return False
+
+async def mac_load_bans():
+    if mac_index.loaded:
+        return mac_index.bans()
+    return await run_query("mac_load_bans", config.mac_load_bans)
+
+async def mac_count_bans():
+    if mac_index.loaded:
+        return len(mac_index)
+    return await run_query("mac_count_bans", config.mac_count_bans)
+
+async def mac_get_ban(user_id):
+    if mac_index.loaded:
+        return mac_index.get_ban(int(user_id))
+    return await run_query("mac_get_ban", config.mac_get_ban, user_id)
+
+async def _run_mutation(query_type, filename, fn, *args):
+    # JSON mutations only queue the file write; wait for it so a failed write
+    # reaches the command instead of being reported as success
+    result = await run_query(query_type, fn, *args)
+    if DB_TYPE == "json":
+        await config.wait_for_save(filename)
+    return result
+
+async def mac_add_ban(ban):
+    return await _run_mutation("mac_add_ban", config.MAC_FILE, config.mac_add_ban, ban)
+
+async def mac_remove_ban(user_id):
+    return await _run_mutation("mac_remove_ban", config.MAC_FILE, config.mac_remove_ban, user_id)
+
+async def mac_has_bypass(user_id, server_id):
+    if mac_index.loaded:
+        return mac_index.has_bypass(int(user_id), int(server_id))
+    return await run_query("mac_has_bypass", config.mac_has_bypass, user_id, server_id)
+
+async def mac_add_bypass(user_id, server_id):
+    return await _run_mutation("mac_add_bypass", config.MAC_BYPASS_FILE, config.mac_add_bypass, user_id, server_id)
+
+async def mac_remove_bypass(user_id, server_id):
+    return await _run_mutation("mac_remove_bypass", config.MAC_BYPASS_FILE, config.mac_remove_bypass, user_id, server_id)
@@ -0,0 +1,163 @@
+import asyncio
+import os
+import time
+import discord
+from handlers.debug import LogDebug, LogError
+from handlers.metrics import describe, increment
+
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Audit Log Configuration
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Listeners that need "who did this" ask this service instead of paging the
+# audit log themselves. Entries pushed by the gateway (on_audit_log_entry)
+# land in a per-guild buffer of the last AUDIT_BUFFER_SIZE entries, indexed
+# by (action, target id), so most lookups are answered without an API call.
+# A lookup that misses waits up to AUDIT_FETCH_DELAY seconds for the pushed
+# entry; only if it does not arrive, one fetch of the latest entries (all
+# action types) answers every lookup still waiting in that guild. A fetch
+# shortly after the previous one only pages through the entries newer than
+# the last one seen, up to AUDIT_FETCH_MAX. Entries older than
+# AUDIT_CACHE_TTL seconds are not matched.
+AUDIT_CACHE_TTL = float(os.getenv("AUDIT_CACHE_TTL", 10))
+AUDIT_FETCH_DELAY = float(os.getenv("AUDIT_FETCH_DELAY", 0.5))
+AUDIT_FETCH_MAX = int(os.getenv("AUDIT_FETCH_MAX", 500))
+AUDIT_BUFFER_SIZE = int(os.getenv("AUDIT_BUFFER_SIZE", 256))
+
+describe("audit_log_lookups_total", "Audit log lookups, by how they were answered", "result")
+describe("audit_log_fetches_total", "Audit log fetches, by outcome", "outcome")
+describe("audit_log_pushed_total", "Audit log entries received from the gateway")
+
+def entry_target_id(entry):
+    return getattr(entry.target, "id", None)
+
+def entry_age(entry, now):
+    """Seconds since ``entry`` was created, from its snowflake ID."""
+    return now - ((entry.id >> 22) + discord.utils.DISCORD_EPOCH) / 1000
+
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Audit Log Service
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+class GuildAuditLog:
+    """Ring buffer of a guild's newest audit log entries by (action, target id)."""
+
+    __slots__ = ("entries", "size", "waiters", "newest_id", "fetched_at", "started_at", "failed_until", "fetch")
+
+    def __init__(self, size=AUDIT_BUFFER_SIZE):
+        self.entries = {}
+        self.size = size
+        self.waiters = {}
+        self.newest_id = None
+        self.fetched_at = 0.0
+        self.started_at = 0.0
+        self.failed_until = 0.0
+        self.fetch = None
+
+    def add(self, entry):
+        key = (entry.action, entry_target_id(entry))
+        cached = self.entries.get(key)
+        if cached is None or entry.id >= cached.id:
+            # Re-insert so the dict stays ordered oldest to newest
+            self.entries.pop(key, None)
+            self.entries[key] = entry
+            while len(self.entries) > self.size:
+                del self.entries[next(iter(self.entries))]
+        for waiter in self.waiters.pop(key, ()):
+            if not waiter.done():
+                waiter.set_result(entry)
+
+    def get(self, key, ttl):
+        entry = self.entries.get(key)
+        if entry is not None and entry_age(entry, time.time()) < ttl:
+            return entry
+        return None
+
+class AuditLogService:
+    """Shared, short-lived cache of each guild's recent audit log entries."""
+
+    def __init__(self, ttl=AUDIT_CACHE_TTL, delay=AUDIT_FETCH_DELAY, max_entries=AUDIT_FETCH_MAX, buffer_size=AUDIT_BUFFER_SIZE):
+        self.ttl = ttl
+        self.delay = delay
+        self.max_entries = max_entries
+        self.buffer_size = buffer_size
+        self._guilds = {}
+
+    def _state(self, guild_id):
+        state = self._guilds.get(guild_id)
+        if state is None:
+            state = self._guilds[guild_id] = GuildAuditLog(self.buffer_size)
+        return state
+
+    def ingest(self, entry):
+        """Add an entry pushed by the gateway and wake lookups waiting for it."""
+        self._state(entry.guild.id).add(entry)
+        increment("audit_log_pushed_total")
+
+    async def find(self, guild, action, target_id):
+        """The newest entry of ``action`` on ``target_id``, or None if the
+        audit log has none (or cannot be read)."""
+        state = self._state(guild.id)
+        key = (action, target_id)
+        entry = state.get(key, self.ttl)
+        if entry is not None:
+            increment("audit_log_lookups_total", "buffered")
+            return entry
+
+        asked_at = time.monotonic()
+        waiter = asyncio.get_running_loop().create_future()
+        state.waiters.setdefault(key, []).append(waiter)
+        try:
+            # At most two rounds: if the shared fetch had already requested its
+            # page before this lookup came in, the entry may be in the next one.
+            for _ in range(2):
+                if time.monotonic() < state.failed_until:
+                    break
+                if state.fetch is None:
+                    state.fetch = asyncio.get_running_loop().create_task(self._fetch(guild, state))
+                await asyncio.wait((waiter, state.fetch), return_when=asyncio.FIRST_COMPLETED)
+                entry = waiter.result() if waiter.done() else state.get(key, self.ttl)
+                if entry is not None or state.started_at >= asked_at:
+                    break
+        finally:
+            waiters = state.waiters.get(key)
+            if waiters and waiter in waiters:
+                waiters.remove(waiter)
+                if not waiters:
+                    del state.waiters[key]
+
+        if entry is None:
+            increment("audit_log_lookups_total", "miss")
+        else:
+            increment("audit_log_lookups_total", "pushed" if waiter.done() else "fetched")
+        return entry
+
+    async def _fetch(self, guild, state):
+        try:
+            # Pushed entries and lookups for the same burst arrive while we wait
+            await asyncio.sleep(self.delay)
+            if not state.waiters:
+                increment("audit_log_fetches_total", "skipped")
+                return
+            state.started_at = now = time.monotonic()
+            if state.newest_id is not None and now - state.fetched_at < self.ttl:
+                entries = guild.audit_logs(limit=self.max_entries, after=discord.Object(id=state.newest_id))
+            else:
+                entries = guild.audit_logs(limit=100)
+            count = 0
+            async for entry in entries:
+                state.add(entry)
+                count += 1
+                # Only fetched entries advance the cursor: pushes can skip
+                # entries whose user was not cached
+                if state.newest_id is None or entry.id > state.newest_id:
+                    state.newest_id = entry.id
+            state.fetched_at = now
+            increment("audit_log_fetches_total", "ok")
+            LogDebug(f"[AUDIT] Fetched {count} audit log entries in {guild.name}")
+        except Exception as e:
+            state.failed_until = time.monotonic() + self.ttl
+            increment("audit_log_fetches_total", "failed")
+            LogError(f"[AUDIT] Audit log fetch failed in {guild.name}: {str(e)}")
+        finally:
+            state.fetch = None
+
+audit_log = AuditLogService()
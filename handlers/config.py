@@ -1,40 +1,488 @@
+import asyncio
 import json
 import os
-from handlers.debug import LogError
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+from handlers.debug import LogError, LogDebug
+from handlers.metrics import increment, describe
+from handlers.storage import storage, migrate_json_stores
 from dotenv import load_dotenv
 
 load_dotenv()
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# JSON Codec
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# JSON_CODEC=auto uses orjson when it is installed and the stdlib otherwise.
+# Files are written compact unless JSON_PRETTY=true.
+JSON_CODEC = os.getenv("JSON_CODEC", "auto").lower()
+JSON_PRETTY = os.getenv("JSON_PRETTY", "false").lower() == "true"
+
+def _json_default(obj):
+    # Lets dict-like views (e.g. handlers.statstable) serialise as plain dicts
+    to_json = getattr(obj, "to_json", None)
+    if to_json is None:
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+    return to_json()
+
+class _StdlibCodec:
+    name = "json"
+
+    def dumps(self, data, pretty=False):
+        if pretty:
+            return json.dumps(data, indent=4, default=_json_default).encode("utf-8")
+        return json.dumps(data, separators=(",", ":"), default=_json_default).encode("utf-8")
+
+    def loads(self, payload):
+        return json.loads(payload)
+
+class _OrjsonCodec:
+    name = "orjson"
+
+    def dumps(self, data, pretty=False):
+        # Non-str keys are stringified like json.dumps does
+        options = orjson.OPT_NON_STR_KEYS
+        if pretty:
+            options |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=_json_default, option=options)
+
+    def loads(self, payload):
+        return orjson.loads(payload)
+
+def get_codec(name=JSON_CODEC):
+    """Return the codec for ``name`` ("auto", "orjson" or "json")."""
+    if name in ("auto", "orjson") and orjson is not None:
+        return _OrjsonCodec()
+    if name == "orjson":
+        LogError("JSON_CODEC=orjson but orjson is not installed, using json")
+    return _StdlibCodec()
+
+codec = get_codec()
+
+def json_dumps(data, pretty=None):
+    """Serialise ``data`` to UTF-8 bytes with the active codec."""
+    return codec.dumps(data, JSON_PRETTY if pretty is None else pretty)
+
+def json_loads(payload):
+    return codec.loads(payload)
+
 #=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
 # Generic File Handlers
 #=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+describe("storage_reads_total", "Store loads (file reads or SQLite loads)", "store")
+describe("storage_read_bytes_total", "Bytes read from JSON store files", "store")
+describe("storage_writes_total", "Store writes (snapshots, journal appends or SQLite saves)", "store")
+describe("storage_written_bytes_total", "Bytes written to JSON store files and journals", "store")
+
 def load_data(filename, default=None, transform_fn=None):
-    """Generic function to load data from JSON files"""
+    """Generic function to load data from JSON files
+
+    Reads what is on disk, so a save still queued by ``save_data`` is not
+    visible yet. Stores that are read, modified and saved again go through a
+    ``CachedJSONStore``, which keeps handing out the in-memory data instead.
+    """
+    store = SQLITE_STORES.get(filename) if storage else None
+    if store is not None:
+        data = storage.load(store)
+        increment("storage_reads_total", filename)
+        if not data:
+            return default() if callable(default) else default
+        return transform_fn(data) if transform_fn else data
+
+    journaled = JOURNAL_ENABLED and filename in JOURNALED_FILES
     try:
-        if not os.path.exists(filename):
+        if os.path.exists(filename):
+            with open(filename, "rb") as f:
+                raw = f.read()
+            increment("storage_reads_total", filename)
+            increment("storage_read_bytes_total", filename, len(raw))
+            data = json_loads(raw)
+        elif journaled and os.path.exists(journal_path(filename)):
+            data = {}
+        else:
             return default() if callable(default) else default
+
+        if journaled and isinstance(data, dict):
+            replay_journal(filename, data)
+        return transform_fn(data) if transform_fn else data
             
-        with open(filename, "r") as f:
-            data = json.load(f)
-            return transform_fn(data) if transform_fn else data
-            
-    except (FileNotFoundError, json.JSONDecodeError) as e:
+    except (FileNotFoundError, ValueError) as e:
         LogError(f"Error loading {filename}: {str(e)}")
         return default() if callable(default) else default
 
-def save_data(filename, data, mkdir=False):
-    """Generic function to save data to JSON files"""
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Atomic, Non-Blocking Persistence
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+SAVE_WORKERS = int(os.getenv("SAVE_WORKERS", 2))
+SERIALISE_RETRIES = 3
+
+_save_executor = ThreadPoolExecutor(max_workers=SAVE_WORKERS, thread_name_prefix="maggibot-save")
+_pending_saves = {}   # filename -> (latest data, mkdir, changed keys, future)
+_active_saves = {}    # filename -> drain task
+_latest_saves = {}    # filename -> future of the newest save not yet written
+_written_mtimes = {}  # filename -> mtime of our last completed write
+
+def _serialise(data):
+    # The snapshot is taken off-loop while listeners may still mutate the
+    # data. A dict resized mid-dump is simply retried; any later mutation is
+    # followed by another save, which the coalescer writes afterwards.
+    for attempt in range(SERIALISE_RETRIES):
+        try:
+            return json_dumps(data)
+        except RuntimeError:
+            if attempt == SERIALISE_RETRIES - 1:
+                raise
+
+def write_atomic(filename, data, mkdir=False):
+    """Serialise ``data`` and atomically replace ``filename`` with it.
+
+    The payload goes to a temp file in the same directory, is fsynced and then
+    moved over the target with ``os.replace``, so a crash leaves either the old
+    or the new file, never a truncated one.
+    """
+    directory = os.path.dirname(filename) or "."
+    if mkdir:
+        os.makedirs(directory, exist_ok=True)
+
+    payload = _serialise(data)
     try:
-        if mkdir:
-            os.makedirs(os.path.dirname(filename), exist_ok=True)
-            
-        with open(filename, "w") as f:
-            json.dump(data, f, indent=4)
-        return True
-        
-    except Exception as e:
-        LogError(f"Error saving {filename}: {str(e)}")
+        mode = os.stat(filename).st_mode & 0o777
+    except FileNotFoundError:
+        mode = 0o644
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(filename)}.", suffix=".tmp", dir=directory)
+    try:
+        # mkstemp creates 0600 files; keep the mode the store had before
+        os.fchmod(fd, mode)
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, filename)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
         raise
+    _written_mtimes[filename] = os.stat(filename).st_mtime_ns
+    increment("storage_writes_total", filename)
+    increment("storage_written_bytes_total", filename, len(payload))
+
+def _write_store(filename, data, mkdir=False, keys=None):
+    store = SQLITE_STORES.get(filename) if storage else None
+    if store is None:
+        if JOURNAL_ENABLED and filename in JOURNALED_FILES:
+            if keys is not None and not journal_full(filename):
+                append_journal(filename, data, keys, mkdir)
+                if not journal_full(filename):
+                    return
+            # Compaction: full snapshot, then a fresh journal based on it
+            write_atomic(filename, data, mkdir)
+            reset_journal(filename)
+            return
+        write_atomic(filename, data, mkdir)
+        return
+
+    for attempt in range(SERIALISE_RETRIES):
+        try:
+            storage.save(store, data, keys)
+            increment("storage_writes_total", filename)
+            return
+        except RuntimeError:
+            if attempt == SERIALISE_RETRIES - 1:
+                raise
+
+async def _drain_saves(filename):
+    loop = asyncio.get_running_loop()
+    try:
+        while filename in _pending_saves:
+            data, mkdir, keys, future = _pending_saves.pop(filename)
+            try:
+                await loop.run_in_executor(_save_executor, _write_store, filename, data, mkdir, keys)
+            except Exception as e:
+                LogError(f"Error saving {filename}: {str(e)}")
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(True)
+            if _latest_saves.get(filename) is future:
+                del _latest_saves[filename]
+    finally:
+        _active_saves.pop(filename, None)
+
+def save_data(filename, data, mkdir=False, keys=None):
+    """Generic function to save data to JSON files
+
+    Inside the event loop the write is handed to a worker thread and coalesced
+    per file: while a write is in flight only the most recent snapshot is kept
+    and written next. The call then returns a future that resolves once that
+    snapshot is written, or raises the write error; callers that report
+    success to a user should await it (see ``wait_for_save``). Nobody has to
+    await it, failures are logged either way. Outside the event loop the file
+    is written synchronously and errors are raised.
+
+    ``keys`` optionally names the top-level entries that changed; the SQLite
+    backend then upserts only those rows.
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+
+    if loop is None:
+        try:
+            _write_store(filename, data, mkdir, keys)
+            return True
+        except Exception as e:
+            LogError(f"Error saving {filename}: {str(e)}")
+            raise
+
+    pending = _pending_saves.get(filename)
+    if pending is not None and keys is not None:
+        keys = None if pending[2] is None else pending[2] | set(keys)
+    elif keys is not None:
+        keys = set(keys)
+    if pending is not None:
+        # Coalesced into the queued write, so it resolves with that one
+        future = pending[3]
+    else:
+        future = loop.create_future()
+        # Failures are logged in _drain_saves; don't warn about unawaited ones
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+    _pending_saves[filename] = (data, mkdir, keys, future)
+    _latest_saves[filename] = future
+    if filename not in _active_saves:
+        _active_saves[filename] = loop.create_task(_drain_saves(filename))
+    return future
+
+def is_save_pending(filename):
+    return filename in _pending_saves or filename in _active_saves
+
+async def wait_for_save(filename):
+    """Wait until the newest save of ``filename`` is written. Raises its error."""
+    future = _latest_saves.get(filename)
+    if future is not None:
+        await asyncio.shield(future)
+
+async def flush_pending_saves():
+    """Wait until every scheduled write has reached the disk."""
+    while _active_saves:
+        await asyncio.gather(*list(_active_saves.values()), return_exceptions=True)
+
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Append-Only Journal
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Keyed saves of JOURNALED_FILES append one line per changed top-level entry to
+# "<file>.journal" instead of rewriting the whole file; load_data replays the
+# journal over the snapshot. The save that takes the journal past
+# JOURNAL_MAX_BYTES or JOURNAL_MAX_LINES also writes a full snapshot and starts
+# a new journal, so the journal stays bounded between restarts. A line holds the
+# entry's new value rather than an increment, so replaying it twice is
+# harmless. The header line records which snapshot the journal belongs to.
+JOURNAL_ENABLED = os.getenv("JOURNAL_ENABLED", "true").lower() == "true"
+JOURNAL_MAX_BYTES = int(os.getenv("JOURNAL_MAX_BYTES", 8 * 1024 * 1024))
+JOURNAL_MAX_LINES = int(os.getenv("JOURNAL_MAX_LINES", 100000))
+
+_journal_sizes = {}  # filename -> bytes in the journal
+_journal_lines = {}  # filename -> entries in the journal
+
+def journal_path(filename):
+    return f"{filename}.journal"
+
+def _snapshot_id(filename):
+    try:
+        st = os.stat(filename)
+    except FileNotFoundError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+def _journal_line(record):
+    return json_dumps(record, pretty=False) + b"\n"
+
+def _append_bytes(path, payload):
+    with open(path, "ab") as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+
+def reset_journal(filename):
+    """Start an empty journal on top of the current snapshot of ``filename``."""
+    header = _journal_line({"base": _snapshot_id(filename)})
+    with open(journal_path(filename), "wb") as f:
+        f.write(header)
+        f.flush()
+        os.fsync(f.fileno())
+    _journal_sizes[filename] = len(header)
+    _journal_lines[filename] = 0
+
+def journal_size(filename):
+    size = _journal_sizes.get(filename)
+    if size is None:
+        try:
+            size = os.path.getsize(journal_path(filename))
+        except FileNotFoundError:
+            size = 0
+        _journal_sizes[filename] = size
+    return size
+
+def journal_lines(filename):
+    lines = _journal_lines.get(filename)
+    if lines is None:
+        try:
+            with open(journal_path(filename), "rb") as f:
+                # Every line after the header is an entry
+                lines = max(f.read().count(b"\n") - 1, 0)
+        except FileNotFoundError:
+            lines = 0
+        _journal_lines[filename] = lines
+    return lines
+
+def journal_full(filename):
+    """True once the journal should be compacted into a new snapshot."""
+    return journal_size(filename) >= JOURNAL_MAX_BYTES or journal_lines(filename) >= JOURNAL_MAX_LINES
+
+def append_journal(filename, data, keys, mkdir=False):
+    """Append the current value of each key in ``keys`` (or its deletion) and fsync."""
+    for attempt in range(SERIALISE_RETRIES):
+        try:
+            payload = b"".join(
+                _journal_line({"k": key, "v": data[key]}) if key in data else _journal_line({"k": key, "del": True})
+                for key in keys
+            )
+            break
+        except RuntimeError:
+            if attempt == SERIALISE_RETRIES - 1:
+                raise
+
+    if mkdir:
+        os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+    if journal_size(filename) == 0:
+        reset_journal(filename)
+    _append_bytes(journal_path(filename), payload)
+    _journal_sizes[filename] += len(payload)
+    _journal_lines[filename] = journal_lines(filename) + len(keys)
+    increment("storage_writes_total", filename)
+    increment("storage_written_bytes_total", filename, len(payload))
+
+def replay_journal(filename, data):
+    """Apply the journal of ``filename`` to ``data`` in place. Returns entries applied."""
+    path = journal_path(filename)
+    try:
+        with open(path, "rb") as f:
+            raw = f.read()
+    except FileNotFoundError:
+        return 0
+    if not raw:
+        return 0
+
+    lines = raw.split(b"\n")
+    try:
+        header = json_loads(lines[0])
+    except ValueError:
+        header = None
+    if not isinstance(header, dict) or header.get("base") != _snapshot_id(filename):
+        # The snapshot was rewritten after this journal started (e.g. a crash
+        # between compaction and reset), so it already holds these entries.
+        LogDebug(f"[JOURNAL] Discarding stale journal for {filename}")
+        reset_journal(filename)
+        return 0
+
+    applied = 0
+    valid_bytes = len(lines[0]) + 1
+    for line in lines[1:]:
+        if not line:
+            continue
+        try:
+            record = json_loads(line)
+        except ValueError:
+            # Torn final write from a crash; drop it so later appends stay readable
+            LogError(f"Truncating torn journal entry in {path} after {applied} entries")
+            os.truncate(path, valid_bytes)
+            break
+        if record.get("del"):
+            data.pop(record["k"], None)
+        else:
+            data[record["k"]] = record["v"]
+        applied += 1
+        valid_bytes += len(line) + 1
+
+    _journal_sizes[filename] = os.path.getsize(path)
+    _journal_lines[filename] = applied
+    if applied:
+        LogDebug(f"[JOURNAL] Replayed {applied} entries for {filename}")
+    return applied
+
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Cached JSON Stores
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+EMPTY_CONFIG = MappingProxyType({})
+
+class CachedJSONStore:
+    """Process-wide, write-through cache for a single JSON file.
+
+    Every caller shares the same dict, so a cog that mutates it and calls
+    ``save`` is immediately visible to all other cogs. Edits made outside the
+    process are picked up through an mtime check, throttled to once per
+    ``check_interval`` seconds so hot listeners never hit the disk.
+    """
+
+    def __init__(self, filename, default=dict, check_interval=1.0, transform_fn=None, mkdir=False):
+        self.filename = filename
+        self.default = default
+        self.transform_fn = transform_fn
+        self.mkdir = mkdir
+        self.check_interval = check_interval
+        self.generation = 0
+        self._data = None
+        self._mtime = None
+        self._checked_at = 0.0
+
+    def _stat_mtime(self):
+        try:
+            return os.stat(self.filename).st_mtime_ns
+        except OSError:
+            return None
+
+    def get(self):
+        now = time.monotonic()
+        if self._data is not None and now - self._checked_at < self.check_interval:
+            return self._data
+
+        if self._data is not None and is_save_pending(self.filename):
+            # The cache is newer than the file until our own write lands
+            return self._data
+
+        self._checked_at = now
+        mtime = self._stat_mtime()
+        if self._data is not None and mtime == _written_mtimes.get(self.filename):
+            self._mtime = mtime
+        if self._data is None or mtime != self._mtime:
+            self._data = load_data(self.filename, default=self.default, transform_fn=self.transform_fn)
+            self._mtime = mtime
+            self.generation += 1
+        return self._data
+
+    def save(self, data):
+        save_data(self.filename, data, mkdir=self.mkdir)
+        self._data = data
+        self._mtime = _written_mtimes.get(self.filename)
+        self._checked_at = time.monotonic()
+        self.generation += 1
+
+    def get_entry(self, key):
+        """Return the cached sub-dict for ``key`` or a read-only empty mapping."""
+        return self.get().get(str(key), EMPTY_CONFIG)
+
+    def invalidate(self):
+        self._data = None
 
 #=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
 # File Path Configuration
@@ -51,10 +499,13 @@ RANDOM_MATH_FILE = "config/randommathchannel.json"
 MAC_FILE = "data/mac.json"
 MAC_BYPASS_FILE = "data/mac_bypass.json"
 STATS_FILE = "data/stats.json"
+ACTIVITY_FILE = "data/activity.json"
+VOICE_SESSIONS_FILE = "data/voice_sessions.json"
 XP_MULTIPLIER_FILE = "data/xpmultiplier.json"
 TICKET_DATA_FILE = "data/tickets.json"
 COOKIES_FILE = "data/cookies.json"
 TAGS_CONFIG_FILE = "data/tags.json"
+LOGGING_THREADS_FILE = "data/logging_threads.json"
 
 # Categorised File List
 JSON_FILES = [
@@ -67,12 +518,37 @@ JSON_FILES = [
     MAC_FILE,
     MAC_BYPASS_FILE,
     STATS_FILE,
+    ACTIVITY_FILE,
+    VOICE_SESSIONS_FILE,
     XP_MULTIPLIER_FILE,
     TICKET_DATA_FILE,
     COOKIES_FILE,
-    TAGS_CONFIG_FILE
+    TAGS_CONFIG_FILE,
+    LOGGING_THREADS_FILE
 ]
 
+# High-churn stores persisted through the append-only journal
+JOURNALED_FILES = {STATS_FILE, TICKET_DATA_FILE}
+
+# Store names used by the SQLite backend (handlers.storage). MAC files are not
+# listed here, they follow DB_TYPE through handlers.database instead.
+SQLITE_STORES = {
+    SERVER_CONFIG_FILE: "server_config",
+    ADMIN_FEEDBACK_FILE: "admin_feedback",
+    LOCKDOWN_CONFIG_FILE: "lockdown",
+    VOICEGATE_CONFIG_FILE: "voicegate_config",
+    ONLY_IMAGES_FILE: "only_images",
+    RANDOM_MATH_FILE: "random_math",
+    STATS_FILE: "stats",
+    ACTIVITY_FILE: "activity",
+    VOICE_SESSIONS_FILE: "voice_sessions",
+    XP_MULTIPLIER_FILE: "xp_multiplier",
+    TICKET_DATA_FILE: "tickets",
+    COOKIES_FILE: "cookies",
+    TAGS_CONFIG_FILE: "tags",
+    LOGGING_THREADS_FILE: "logging_threads",
+}
+
 CONFIG_FILES = [
     SERVER_CONFIG_FILE,
     ADMIN_FEEDBACK_FILE,
@@ -86,10 +562,13 @@ DATA_FILES = [
     MAC_FILE,
     MAC_BYPASS_FILE,
     STATS_FILE,
+    ACTIVITY_FILE,
+    VOICE_SESSIONS_FILE,
     XP_MULTIPLIER_FILE,
     TICKET_DATA_FILE,
     COOKIES_FILE,
-    TAGS_CONFIG_FILE
+    TAGS_CONFIG_FILE,
+    LOGGING_THREADS_FILE
 ]
 
 #=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
@@ -117,19 +596,24 @@ VOICE_XP_COUNT = float(os.getenv('VOICE_XP_COUNT', 0.2))
 #=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
 # Server Configuration Handlers
 #=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+server_config_store = CachedJSONStore(SERVER_CONFIG_FILE)
+
 def loadserverconfig():
-    return load_data(SERVER_CONFIG_FILE, default=dict)
+    return server_config_store.get()
 
 def saveserverconfig(serverconfig):
-    save_data(SERVER_CONFIG_FILE, serverconfig)
+    server_config_store.save(serverconfig)
+
+def get_guild_config(guild_id):
+    """Cached view of one guild's server config. Treat it as read-only and
+    write through ``loadserverconfig``/``saveserverconfig``."""
+    return server_config_store.get_entry(guild_id)
 
 def get_log_channel(guild):
-    serverconfig = loadserverconfig()
-    return guild.get_channel(serverconfig.get(str(guild.id), {}).get("log_channel"))
+    return guild.get_channel(get_guild_config(guild.id).get("log_channel"))
 
 def get_logging_forum(guild):
-    serverconfig = loadserverconfig()
-    forum_id = serverconfig.get(str(guild.id), {}).get("logging_forum")
+    forum_id = get_guild_config(guild.id).get("logging_forum")
     return guild.get_channel(forum_id)
 
 #=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
@@ -138,32 +622,90 @@ def get_logging_forum(guild):
 def load_stats():
     return load_data(STATS_FILE, default=dict)
 
-def save_stats(stats):
-    save_data(STATS_FILE, stats)
+def save_stats(stats, user_ids=None):
+    save_data(STATS_FILE, stats, keys=user_ids)
+
+def load_activity():
+    return load_data(ACTIVITY_FILE, default=dict)
+
+def save_activity(activity, guild_ids=None):
+    save_data(ACTIVITY_FILE, activity, keys=guild_ids)
+
+def load_voice_sessions():
+    return load_data(VOICE_SESSIONS_FILE, default=dict)
+
+def save_voice_sessions(sessions):
+    save_data(VOICE_SESSIONS_FILE, sessions)
 
 #=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
 # XP Multiplier Configuration
 #=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+def _multiplier_transform(data):
+    data.setdefault("channels", [])
+    data.setdefault("multipliers", {})
+    return data
+
+multiplier_config_store = CachedJSONStore(
+    XP_MULTIPLIER_FILE, default=lambda: {"channels": [], "multipliers": {}}, transform_fn=_multiplier_transform
+)
+
 def load_multiplier_config():
-    default = {"channels": [], "multipliers": {}}
-    loaded = load_data(XP_MULTIPLIER_FILE, default=default)
-    for key in default:
-        if key not in loaded:
-            loaded[key] = default[key]
-    return loaded
+    return multiplier_config_store.get()
 
 def save_multiplier_config(config):
-    save_data(XP_MULTIPLIER_FILE, config)
+    multiplier_config_store.save(config)
+    xp_multipliers.compile(config)
+
+class XPMultiplierTable:
+    """The multiplier config compiled for per-message lookups: boosted channel
+    ids as a frozenset and role id -> multiplier as an int-keyed dict.
+
+    Built from disk on first use and recompiled by ``save_multiplier_config``,
+    so resolving a multiplier never touches the file or converts ids to str.
+    """
+
+    def __init__(self):
+        self.channels = None
+        self.roles = None
+
+    def compile(self, config):
+        self.channels = frozenset(int(channel_id) for channel_id in config.get("channels", []))
+        self.roles = {int(role_id): float(multiplier) for role_id, multiplier in config.get("multipliers", {}).items()}
+
+    def resolve(self, channel_id, roles):
+        """Highest multiplier among ``roles`` in ``channel_id`` (1 outside
+        boosted channels; roles without a multiplier count as 1)."""
+        if self.channels is None:
+            self.compile(load_multiplier_config())
+        if channel_id not in self.channels:
+            return 1
+        lookup = self.roles.get
+        best = None
+        for role in roles:
+            multiplier = lookup(role.id, 1)
+            if best is None or multiplier > best:
+                best = multiplier
+        return 1 if best is None else best
+
+xp_multipliers = XPMultiplierTable()
 
 #=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
 # Admin feedback configuration
 #=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+def _admin_feedback_transform(data):
+    data.setdefault("configs", {})
+    data.setdefault("feedbacks", {})
+    return data
+
+admin_feedback_store = CachedJSONStore(
+    ADMIN_FEEDBACK_FILE, default=lambda: {"configs": {}, "feedbacks": {}}, transform_fn=_admin_feedback_transform
+)
+
 def load_admin_feedback():
-    default = {"configs": {}, "feedbacks": {}}
-    return load_data(ADMIN_FEEDBACK_FILE, default=default)
+    return admin_feedback_store.get()
 
 def save_admin_feedback(data):
-    save_data(ADMIN_FEEDBACK_FILE, data)
+    admin_feedback_store.save(data)
 
 #=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
 # Ticket configuration
@@ -171,8 +713,8 @@ def save_admin_feedback(data):
 def load_ticket_data():
     return load_data(TICKET_DATA_FILE, default=dict)
 
-def save_ticket_data(data):
-    save_data(TICKET_DATA_FILE, data)
+def save_ticket_data(data, guild_ids=None):
+    save_data(TICKET_DATA_FILE, data, keys=guild_ids)
 
 #=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
 # Lockdown Configuration
@@ -190,159 +732,342 @@ def save_lockdown_config(lockdown_status):
 #=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
 # Voicegate Configuration
 #=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+voicegate_config_store = CachedJSONStore(VOICEGATE_CONFIG_FILE)
+
 def loadvoicegateconfig():
-    return load_data(VOICEGATE_CONFIG_FILE, default=dict)
+    return voicegate_config_store.get()
 
 def savevoicegateconfig(config):
-    save_data(VOICEGATE_CONFIG_FILE, config)
+    voicegate_config_store.save(config)
 
 #=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
 # OnlyImages Configuration
 #=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+def _onlyimages_transform(data):
+    return {channel_id: True for channel_id in data} if isinstance(data, list) else data
+
+onlyimages_store = CachedJSONStore(ONLY_IMAGES_FILE, transform_fn=_onlyimages_transform, mkdir=True)
+
 def load_onlyimages():
-    def transform(data):
-        return {channel_id: True for channel_id in data} if isinstance(data, list) else data
-    return load_data(ONLY_IMAGES_FILE, default=dict, transform_fn=transform)
+    return onlyimages_store.get()
 
 def save_onlyimages(channels):
-    save_data(ONLY_IMAGES_FILE, channels, mkdir=True)
+    onlyimages_store.save(channels)
 
 #=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
 # Random Math + Cookies Configuration
 #=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+randommath_store = CachedJSONStore(RANDOM_MATH_FILE)
+cookies_store = CachedJSONStore(COOKIES_FILE)
+
 def load_randommath():
-    return load_data(RANDOM_MATH_FILE, default=dict)
+    return randommath_store.get()
 
 def save_randommath(data):
-    save_data(RANDOM_MATH_FILE, data)
+    randommath_store.save(data)
 
 def load_cookies():
-    return load_data(COOKIES_FILE, default=dict)
+    return cookies_store.get()
 
 def save_cookies(data):
-    save_data(COOKIES_FILE, data)
+    cookies_store.save(data)
 
 #=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
 # Tags Configuration
 #=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+tags_store = CachedJSONStore(TAGS_CONFIG_FILE)
+
 def load_tags():
-    return load_data(TAGS_CONFIG_FILE, default=dict)
+    return tags_store.get()
 
 def save_tags(tags):
-    save_data(TAGS_CONFIG_FILE, tags)
+    tags_store.save(tags)
+
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Logging Digest Threads
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+def load_logging_threads():
+    return load_data(LOGGING_THREADS_FILE, default=dict)
+
+def save_logging_threads(threads):
+    save_data(LOGGING_THREADS_FILE, threads)
 
 #=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
 # MAC Ban System Configuration
 #=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
-from handlers.database import get_db_connection, DB_TYPE
+from handlers.database import db_connection, DB_TYPE
+from handlers.macindex import mac_index
+
+MAC_BAN_COLUMNS = ("id", "name", "bandate", "reason", "serverid", "servername", "bannedby")
+
+def _mac_placeholder():
+    return "%s" if DB_TYPE == "mysql" else "?"
+
+def _mac_ban_row(ban):
+    return tuple(ban.get(column) for column in MAC_BAN_COLUMNS)
+
+def _mac_ban_upsert_sql():
+    columns = ", ".join(MAC_BAN_COLUMNS)
+    placeholders = ", ".join(_mac_placeholder() for _ in MAC_BAN_COLUMNS)
+    updates = [column for column in MAC_BAN_COLUMNS if column != "id"]
+    if DB_TYPE == "mysql":
+        assignments = ", ".join(f"{column} = VALUES({column})" for column in updates)
+        return f"INSERT INTO mac_bans ({columns}) VALUES ({placeholders}) ON DUPLICATE KEY UPDATE {assignments}"
+    assignments = ", ".join(f"{column} = excluded.{column}" for column in updates)
+    return f"INSERT INTO mac_bans ({columns}) VALUES ({placeholders}) ON CONFLICT(id) DO UPDATE SET {assignments}"
+
+def _mac_bypass_insert_sql():
+    p = _mac_placeholder()
+    if DB_TYPE == "mysql":
+        return f"INSERT IGNORE INTO mac_bypass (user_id, server_id) VALUES ({p}, {p})"
+    return f"INSERT OR IGNORE INTO mac_bypass (user_id, server_id) VALUES ({p}, {p})"
+
+def _mac_execute(sql, params=(), many=False):
+    """Run one statement (or an executemany batch) and commit. Returns rowcount."""
+    with db_connection() as conn:
+        if not conn:
+            return 0
+        cursor = conn.cursor()
+        if many:
+            cursor.executemany(sql, params)
+        else:
+            cursor.execute(sql, params)
+        conn.commit()
+        return cursor.rowcount
+
+def _mac_query(sql, params=()):
+    """Run a SELECT and return the rows as dicts."""
+    with db_connection() as conn:
+        if not conn:
+            return []
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        column_names = [description[0] for description in cursor.description]
+        return [dict(zip(column_names, row)) for row in cursor.fetchall()]
+
+def _normalise_json_bans(data):
+    if isinstance(data, list):
+        bans = {str(ban["id"]): ban for ban in data}
+    else:
+        bans = {str(k): v for k, v in data.items()}
+
+    for user_id, ban in bans.items():
+        if "id" not in ban:
+            try:
+                ban["id"] = int(user_id)
+            except ValueError:
+                ban["id"] = user_id
+    return bans
+
+def _normalise_json_bypasses(data):
+    return {str(k): v for k, v in data.items()}
+
+# JSON mode only; the database backends are queried directly
+mac_bans_store = CachedJSONStore(MAC_FILE, transform_fn=_normalise_json_bans, mkdir=True)
+mac_bypass_store = CachedJSONStore(MAC_BYPASS_FILE, transform_fn=_normalise_json_bypasses, mkdir=True)
 
 def mac_load_bans():
     if DB_TYPE == "json":
-        data = load_data(MAC_FILE, default=dict)
-        if isinstance(data, list):
-            bans = {str(ban["id"]): ban for ban in data}
-        else:
-            bans = {str(k): v for k, v in data.items()}
-
-        for user_id, ban in bans.items():
-            if "id" not in ban:
-                try:
-                    ban["id"] = int(user_id)
-                except ValueError:
-                    ban["id"] = user_id
-        return bans
+        return mac_bans_store.get()
+    return {str(ban["id"]): ban for ban in _mac_query("SELECT * FROM mac_bans")}
+
+
+def mac_count_bans():
+    if DB_TYPE == "json":
+        return len(mac_load_bans())
+    rows = _mac_query("SELECT COUNT(*) AS total FROM mac_bans")
+    return rows[0]["total"] if rows else 0
+
+
+def mac_get_ban(user_id):
+    """Return the ban record for ``user_id`` or None."""
+    if DB_TYPE == "json":
+        return mac_load_bans().get(str(user_id))
+    rows = _mac_query(f"SELECT * FROM mac_bans WHERE id = {_mac_placeholder()}", (int(user_id),))
+    return rows[0] if rows else None
+
+
+def mac_add_bans(bans):
+    """Insert or update several ban records in one batch."""
+    bans = list(bans)
+    if not bans:
+        return 0
+    if DB_TYPE == "json":
+        stored = mac_load_bans()
+        for ban in bans:
+            stored[str(ban["id"])] = ban
+        mac_bans_store.save(stored)
     else:
-        conn = get_db_connection()
-        if not conn:
-            return {}
-        cursor = conn.cursor(dictionary=True if DB_TYPE == 'mysql' else False)
-        cursor.execute("SELECT * FROM mac_bans")
-        rows = cursor.fetchall()
-        conn.close()
-
-        bans = {}
-        if DB_TYPE == 'sqlite':
-            # For sqlite, rows are tuples, convert them to dicts
-            column_names = [description[0] for description in cursor.description]
-            for row in rows:
-                ban_data = dict(zip(column_names, row))
-                bans[str(ban_data['id'])] = ban_data
-        else: # mysql
-            for row in rows:
-                bans[str(row['id'])] = row
-        return bans
+        _mac_execute(_mac_ban_upsert_sql(), [_mac_ban_row(ban) for ban in bans], many=True)
+    mac_index.put_bans(bans)
+    return len(bans)
 
 
-def mac_save_bans(bans):
+def mac_add_ban(ban):
+    """Insert or update a single ban record (upsert on ``ban["id"]``)."""
+    return mac_add_bans([ban])
+
+
+def mac_remove_ban(user_id):
+    """Delete a ban. Returns True if a record was removed."""
     if DB_TYPE == "json":
-        save_data(MAC_FILE, bans, mkdir=True)
+        bans = mac_load_bans()
+        if bans.pop(str(user_id), None) is None:
+            return False
+        mac_bans_store.save(bans)
+        removed = True
     else:
-        conn = get_db_connection()
-        if not conn:
-            return
-        cursor = conn.cursor()
-        
-        # Inefficient for databases, but matches the current logic.
-        # A better implementation would be specific add/update/delete functions.
-        cursor.execute("DELETE FROM mac_bans")
-
-        for ban in bans.values():
-            if DB_TYPE == 'mysql':
-                sql = "INSERT INTO mac_bans (id, name, bandate, reason, serverid, servername, bannedby) VALUES (%s, %s, %s, %s, %s, %s, %s)"
-            elif DB_TYPE == 'sqlite':
-                sql = "INSERT INTO mac_bans (id, name, bandate, reason, serverid, servername, bannedby) VALUES (?, ?, ?, ?, ?, ?, ?)"
-            
-            values = (ban.get('id'), ban.get('name'), ban.get('bandate'), ban.get('reason'), ban.get('serverid'), ban.get('servername'), ban.get('bannedby'))
-            cursor.execute(sql, values)
+        removed = _mac_execute(f"DELETE FROM mac_bans WHERE id = {_mac_placeholder()}", (int(user_id),)) > 0
+    mac_index.drop_ban(user_id)
+    return removed
 
-        conn.commit()
-        conn.close()
+
+def mac_save_bans(bans):
+    """Replace the whole ban list with ``bans`` (bulk import/export path)."""
+    if DB_TYPE == "json":
+        mac_bans_store.save(_normalise_json_bans(bans))
+    else:
+        stale = [(int(user_id),) for user_id in mac_load_bans() if user_id not in bans]
+        mac_add_bans(bans.values())
+        if stale:
+            _mac_execute(f"DELETE FROM mac_bans WHERE id = {_mac_placeholder()}", stale, many=True)
+    mac_index.replace_bans(bans)
 
 
 def mac_load_bypasses():
     if DB_TYPE == "json":
-        data = load_data(MAC_BYPASS_FILE, default=dict)
-        return {str(k): v for k, v in data.items()}
+        return mac_bypass_store.get()
+
+    bypasses = {}
+    for row in _mac_query("SELECT user_id, server_id FROM mac_bypass"):
+        bypasses.setdefault(str(row["user_id"]), []).append(row["server_id"])
+    return bypasses
+
+
+def mac_has_bypass(user_id, server_id):
+    if DB_TYPE == "json":
+        servers = mac_load_bypasses().get(str(user_id), [])
+        return int(server_id) in servers or str(server_id) in servers
+    p = _mac_placeholder()
+    rows = _mac_query(
+        f"SELECT 1 AS found FROM mac_bypass WHERE user_id = {p} AND server_id = {p}",
+        (int(user_id), int(server_id)),
+    )
+    return bool(rows)
+
+
+def mac_add_bypasses(pairs):
+    """Add several ``(user_id, server_id)`` bypasses; existing ones are ignored."""
+    pairs = [(int(user_id), int(server_id)) for user_id, server_id in pairs]
+    if not pairs:
+        return 0
+    if DB_TYPE == "json":
+        bypasses = mac_load_bypasses()
+        for user_id, server_id in pairs:
+            servers = bypasses.setdefault(str(user_id), [])
+            if server_id not in servers and str(server_id) not in servers:
+                servers.append(server_id)
+        mac_bypass_store.save(bypasses)
     else:
-        conn = get_db_connection()
-        if not conn:
-            return {}
-        cursor = conn.cursor(dictionary=True if DB_TYPE == 'mysql' else False)
-        cursor.execute("SELECT user_id, server_id FROM mac_bypass")
-        rows = cursor.fetchall()
-        conn.close()
-
-        bypasses = {}
-        if DB_TYPE == 'sqlite':
-            for row in rows:
-                user_id, server_id = row
-                bypasses.setdefault(str(user_id), []).append(server_id)
-        else:  # mysql
-            for row in rows:
-                user_id = str(row['user_id'])
-                bypasses.setdefault(user_id, []).append(row['server_id'])
-        return bypasses
+        _mac_execute(_mac_bypass_insert_sql(), pairs, many=True)
+    mac_index.add_bypasses(pairs)
+    return len(pairs)
 
 
-def mac_save_bypasses(bypasses):
+def mac_add_bypass(user_id, server_id):
+    return mac_add_bypasses([(user_id, server_id)])
+
+
+def mac_remove_bypass(user_id, server_id):
+    """Delete one bypass. Returns True if it existed."""
     if DB_TYPE == "json":
-        save_data(MAC_BYPASS_FILE, bypasses, mkdir=True)
+        bypasses = mac_load_bypasses()
+        servers = bypasses.get(str(user_id), [])
+        remaining = [s for s in servers if str(s) != str(server_id)]
+        if len(remaining) == len(servers):
+            return False
+        if remaining:
+            bypasses[str(user_id)] = remaining
+        else:
+            del bypasses[str(user_id)]
+        mac_bypass_store.save(bypasses)
+        removed = True
     else:
-        conn = get_db_connection()
-        if not conn:
-            return
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM mac_bypass")
+        p = _mac_placeholder()
+        removed = _mac_execute(
+            f"DELETE FROM mac_bypass WHERE user_id = {p} AND server_id = {p}",
+            (int(user_id), int(server_id)),
+        ) > 0
+    mac_index.drop_bypass(user_id, server_id)
+    return removed
 
-        for user_id, servers in bypasses.items():
-            for server_id in servers:
-                if DB_TYPE == 'mysql':
-                    sql = "INSERT INTO mac_bypass (user_id, server_id) VALUES (%s, %s)"
-                elif DB_TYPE == 'sqlite':
-                    sql = "INSERT INTO mac_bypass (user_id, server_id) VALUES (?, ?)"
-                cursor.execute(sql, (int(user_id), server_id))
 
-        conn.commit()
-        conn.close()
+def mac_save_bypasses(bypasses):
+    """Replace all bypasses with ``bypasses`` (bulk import/export path)."""
+    if DB_TYPE == "json":
+        mac_bypass_store.save(_normalise_json_bypasses(bypasses))
+        mac_index.replace_bypasses(bypasses)
+        return
+
+    wanted = {(int(user_id), int(server_id)) for user_id, servers in bypasses.items() for server_id in servers}
+    current = {
+        (int(user_id), int(server_id))
+        for user_id, servers in mac_load_bypasses().items()
+        for server_id in servers
+    }
+    mac_add_bypasses(wanted - current)
+    stale = list(current - wanted)
+    if stale:
+        p = _mac_placeholder()
+        _mac_execute(f"DELETE FROM mac_bypass WHERE user_id = {p} AND server_id = {p}", stale, many=True)
+    mac_index.replace_bypasses(bypasses)
+
+
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# JSON -> SQLite Migration
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+def _read_json_file(filename):
+    if not os.path.exists(filename):
+        return None
+    with open(filename, "rb") as f:
+        data = json_loads(f.read())
+    if filename in JOURNALED_FILES and isinstance(data, dict):
+        replay_journal(filename, data)
+    return data
+
+def migrate_json_to_sqlite():
+    """Import every JSON store into the SQLite backend.
+
+    The JSON files are read directly, whatever STORAGE_TYPE is set to, so the
+    migration can run before switching over. MAC bans and bypasses are
+    imported into the DB_TYPE database when that is not ``json``.
+    Returns ``{filename: rows written}``.
+    """
+    stores = {}
+    for filename, store in SQLITE_STORES.items():
+        data = _read_json_file(filename)
+        if data is None:
+            continue
+        if filename == ONLY_IMAGES_FILE and isinstance(data, list):
+            data = {channel_id: True for channel_id in data}
+        stores[store] = data
+
+    written = migrate_json_stores(stores)
+    results = {filename: written[store] for filename, store in SQLITE_STORES.items() if store in written}
+
+    if DB_TYPE != "json":
+        bans = _read_json_file(MAC_FILE)
+        if bans:
+            if isinstance(bans, list):
+                bans = {str(ban["id"]): ban for ban in bans}
+            for user_id, ban in bans.items():
+                ban.setdefault("id", int(user_id))
+            mac_save_bans(bans)
+            results[MAC_FILE] = len(bans)
 
+        bypasses = _read_json_file(MAC_BYPASS_FILE)
+        if bypasses:
+            mac_save_bypasses(bypasses)
+            results[MAC_BYPASS_FILE] = sum(len(servers) for servers in bypasses.values())
 
+    return results
@@ -1,32 +1,211 @@
-
 import os
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 import mysql.connector
+import mysql.connector.pooling
 from dotenv import load_dotenv
+from handlers.debug import LogError, LogSystem
+from handlers.metrics import register_gauge
 
 load_dotenv()
 
 DB_TYPE = os.getenv("DB_TYPE", "json")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Connection Pool
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+_mysql_pool = None
+_sqlite_local = threading.local()
+_sqlite_connections = set()
+_pool_lock = threading.Lock()
+_initialised = False
+
+pool_stats = {
+    "connections_opened": 0,
+    "acquisitions": 0,
+    "in_use": 0,
+    "reconnects": 0,
+    "failures": 0,
+    "init_seconds": None,
+}
+
+# Result of the most recent check_db_health() (None until one ran)
+db_health = {"healthy": None, "checked_at": None}
+
+def _count(key, amount=1):
+    with _pool_lock:
+        pool_stats[key] += amount
+
+def _mysql_config():
+    return {
+        "host": os.getenv("DB_HOST"),
+        "user": os.getenv("DB_USER"),
+        "password": os.getenv("DB_PASSWORD"),
+        "database": os.getenv("DB_NAME"),
+    }
+
+def _get_mysql_pool():
+    global _mysql_pool
+    with _pool_lock:
+        if _mysql_pool is None:
+            _mysql_pool = mysql.connector.pooling.MySQLConnectionPool(
+                pool_name="maggibot",
+                pool_size=DB_POOL_SIZE,
+                pool_reset_session=True,
+                **_mysql_config(),
+            )
+            pool_stats["connections_opened"] += DB_POOL_SIZE
+    return _mysql_pool
+
+def _open_sqlite():
+    conn = sqlite3.connect(os.getenv("DB_NAME", "data/mac.db"))
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    with _pool_lock:
+        _sqlite_connections.add(conn)
+        pool_stats["connections_opened"] += 1
+    return conn
 
+def _drop_sqlite():
+    conn = getattr(_sqlite_local, "conn", None)
+    _sqlite_local.conn = None
+    if conn is not None:
+        with _pool_lock:
+            _sqlite_connections.discard(conn)
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
 
-def get_db_connection():
+def _acquire():
     if DB_TYPE == "mysql":
-        return mysql.connector.connect(
-            host=os.getenv("DB_HOST"),
-            user=os.getenv("DB_USER"),
-            password=os.getenv("DB_PASSWORD"),
-            database=os.getenv("DB_NAME"),
-        )
-    elif DB_TYPE == "sqlite":
-        return sqlite3.connect(os.getenv("DB_NAME", "data/mac.db"))
+        conn = _get_mysql_pool().get_connection()
+        if not conn.is_connected():
+            try:
+                conn.reconnect(attempts=2, delay=0.5)
+            except Exception:
+                # Hand the connection back, or failed reconnects drain the pool
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+                raise
+            _count("reconnects")
+        return conn
+    if DB_TYPE == "sqlite":
+        # One long-lived connection per thread; sqlite3 objects may not be
+        # shared across threads.
+        conn = getattr(_sqlite_local, "conn", None)
+        if conn is None:
+            conn = _sqlite_local.conn = _open_sqlite()
+        return conn
     return None
 
+def _release(conn, broken=False):
+    if DB_TYPE == "mysql":
+        # close() on a pooled connection hands it back to the pool
+        try:
+            conn.close()
+        except mysql.connector.Error:
+            pass
+    elif DB_TYPE == "sqlite" and broken:
+        _drop_sqlite()
+
+@contextmanager
+def db_connection():
+    """Borrow a pooled connection for the configured DB_TYPE.
+
+    Yields None when DB_TYPE is json. A connection that raised a database
+    error is discarded so the next caller reconnects.
+    """
+    if not _initialised:
+        init_database()
+
+    try:
+        conn = _acquire()
+    except (sqlite3.Error, mysql.connector.Error) as e:
+        _count("failures")
+        LogError(f"Database connection failed: {str(e)}")
+        raise
 
-def create_mac_bans_table():
-    conn = get_db_connection()
     if conn is None:
+        yield None
         return
 
+    _count("acquisitions")
+    _count("in_use")
+    broken = False
+    try:
+        yield conn
+    except (sqlite3.Error, mysql.connector.Error):
+        broken = True
+        _count("failures")
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        raise
+    finally:
+        _count("in_use", -1)
+        _release(conn, broken)
+
+def check_db_health():
+    """Run a trivial query on a pooled connection. Returns True if it worked.
+
+    Blocking; coroutines go through ``handlers.asyncdb.check_db_health``.
+    """
+    healthy = True
+    if DB_TYPE in ("mysql", "sqlite"):
+        try:
+            with db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT 1")
+                cursor.fetchall()
+        except Exception as e:
+            LogError(f"Database health check failed: {str(e)}")
+            if DB_TYPE == "sqlite":
+                _drop_sqlite()
+            healthy = False
+    db_health["healthy"] = healthy
+    db_health["checked_at"] = time.time()
+    return healthy
+
+def get_pool_stats():
+    with _pool_lock:
+        stats = dict(pool_stats)
+    stats["type"] = DB_TYPE
+    if DB_TYPE == "mysql":
+        stats["pool_size"] = DB_POOL_SIZE
+    elif DB_TYPE == "sqlite":
+        with _pool_lock:
+            stats["pool_size"] = len(_sqlite_connections)
+    else:
+        stats["pool_size"] = 0
+    return stats
+
+def _pool_gauge():
+    stats = get_pool_stats()
+    return {"in_use": stats["in_use"], "size": stats["pool_size"]}
+
+def _pool_events_gauge():
+    with _pool_lock:
+        return {key: pool_stats[key] for key in ("connections_opened", "acquisitions", "reconnects", "failures")}
+
+def _health_gauge():
+    # No sample until the first check has run
+    return {} if db_health["healthy"] is None else int(db_health["healthy"])
+
+register_gauge("db_pool_connections", _pool_gauge, "MAC database connections, in use and pool size", "state")
+register_gauge("db_pool_events", _pool_events_gauge, "MAC database pool events since startup", "event")
+register_gauge("db_healthy", _health_gauge, "1 if the last MAC database health check succeeded")
+
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Schema
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+def create_mac_bans_table(conn):
     cursor = conn.cursor()
     if DB_TYPE == "mysql":
         cursor.execute(
@@ -57,14 +236,9 @@ def create_mac_bans_table():
             """
         )
     conn.commit()
-    conn.close()
 
 
-def create_mac_bypass_table():
-    conn = get_db_connection()
-    if conn is None:
-        return
-
+def create_mac_bypass_table(conn):
     cursor = conn.cursor()
     if DB_TYPE == "mysql":
         cursor.execute(
@@ -87,8 +261,33 @@ def create_mac_bypass_table():
             """
         )
     conn.commit()
-    conn.close()
 
 
-create_mac_bans_table()
-create_mac_bypass_table()
+def init_database():
+    """Create the MAC tables. Runs once; called from main() at startup and
+    lazily by the first ``db_connection()`` otherwise."""
+    global _initialised
+    if _initialised:
+        return
+    _initialised = True
+
+    if DB_TYPE not in ("mysql", "sqlite"):
+        return
+
+    started = time.perf_counter()
+    try:
+        with db_connection() as conn:
+            create_mac_bans_table(conn)
+            create_mac_bypass_table(conn)
+    except Exception as e:
+        _initialised = False
+        LogError(f"Database init failed: {str(e)}")
+        raise
+
+    pool_stats["init_seconds"] = time.perf_counter() - started
+    LogSystem(f" Database ({DB_TYPE}) initialised in {pool_stats['init_seconds'] * 1000:.1f} ms")
+
+
+def current_sqlite_connection():
+    """The calling thread's SQLite connection, if it has one yet."""
+    return getattr(_sqlite_local, "conn", None)
@@ -0,0 +1,94 @@
+import os
+import time
+from handlers.debug import LogSystem
+from handlers.metrics import histogram, get_histograms, get_counters, increment, reset_metrics, describe
+
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Handler Instrumentation
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Times every event listener (cog listeners and @bot.event handlers) and every
+# application command into the histogram registry of handlers.metrics, keyed
+# "Cog.on_event" or "/command". The wall time includes awaited API calls.
+# The cost is two perf_counter calls and a histogram observe per invocation.
+INSTRUMENT_HANDLERS = os.getenv("INSTRUMENT_HANDLERS", "true").lower() == "true"
+HANDLER_SECONDS = "handler_seconds"
+HANDLER_ERRORS = "handler_errors_total"
+describe(HANDLER_SECONDS, "Wall time of event listeners and slash commands", "handler")
+describe(HANDLER_ERRORS, "Exceptions raised by event listeners and slash commands", "handler")
+
+def handler_label(coro):
+    owner = getattr(coro, "__self__", None)
+    if owner is not None:
+        return f"{type(owner).__name__}.{coro.__name__}"
+    return getattr(coro, "__qualname__", repr(coro))
+
+def timed_handler(coro, label):
+    hist = histogram(HANDLER_SECONDS, label)
+    perf_counter = time.perf_counter
+
+    async def timed(*args, **kwargs):
+        started = perf_counter()
+        try:
+            return await coro(*args, **kwargs)
+        except Exception:
+            increment(HANDLER_ERRORS, label)
+            raise
+        finally:
+            hist.observe(perf_counter() - started)
+
+    return timed
+
+def instrument_bot(bot):
+    """Wrap event dispatch and application command invocation of ``bot``."""
+    if not INSTRUMENT_HANDLERS:
+        return False
+
+    schedule_event = bot._schedule_event
+    invoke_command = bot.invoke_application_command
+
+    def _schedule_event(coro, event_name, *args, **kwargs):
+        return schedule_event(timed_handler(coro, handler_label(coro)), event_name, *args, **kwargs)
+
+    async def invoke_application_command(ctx):
+        label = f"/{ctx.command.qualified_name}"
+        started = time.perf_counter()
+        try:
+            await invoke_command(ctx)
+        finally:
+            histogram(HANDLER_SECONDS, label).observe(time.perf_counter() - started)
+            # py-cord reports command errors through dispatch_error instead of raising
+            if getattr(ctx, "command_failed", False):
+                increment(HANDLER_ERRORS, label)
+
+    bot._schedule_event = _schedule_event
+    bot.invoke_application_command = invoke_application_command
+    LogSystem("Handler instrumentation enabled")
+    return True
+
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Reports
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+REPORT_SORT_KEYS = ("total", "p99", "calls", "errors")
+
+def handler_report(sort="total", limit=10):
+    """Top ``limit`` handlers by ``sort`` as a list of dicts (times in seconds)."""
+    errors = get_counters(HANDLER_ERRORS)
+    rows = [
+        {
+            "handler": label,
+            "calls": hist.count,
+            "total": hist.sum,
+            "mean": hist.mean,
+            "p99": hist.percentile(0.99),
+            "max": hist.max,
+            "errors": errors.get(label, 0),
+        }
+        for label, hist in get_histograms(HANDLER_SECONDS).items()
+        if hist.count or errors.get(label)
+    ]
+    rows.sort(key=lambda row: row[sort], reverse=True)
+    return rows[:limit]
+
+def reset_handler_metrics():
+    reset_metrics(HANDLER_SECONDS)
+    reset_metrics(HANDLER_ERRORS)
@@ -0,0 +1,172 @@
+import threading
+import time
+
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Resident MAC Ban Index
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Loaded once from the MAC store and kept current by the mutation helpers in
+# handlers.config, so on_member_join answers "is this user banned here?" with
+# two dict lookups instead of a table scan per join.
+_NO_GUILDS = frozenset()
+
+def _as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class MacBanIndex:
+    def __init__(self):
+        self._bans = {}
+        self._bypasses = {}
+        self._lock = threading.Lock()
+        self.loaded = False
+        self.version = 0
+        self.loaded_at = None
+        self.load_seconds = None
+        self.lookups = 0
+        self.hits = 0
+        self.bypass_checks = 0
+        self.bypass_hits = 0
+
+    #=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+    # Lookups
+    #=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+    def get_ban(self, user_id):
+        """The ban record for ``user_id`` (an int) or None."""
+        self.lookups += 1
+        ban = self._bans.get(user_id)
+        if ban is not None:
+            self.hits += 1
+        return ban
+
+    def is_banned(self, user_id):
+        return self.get_ban(user_id) is not None
+
+    def has_bypass(self, user_id, guild_id):
+        self.bypass_checks += 1
+        if guild_id in self._bypasses.get(user_id, _NO_GUILDS):
+            self.bypass_hits += 1
+            return True
+        return False
+
+    def __len__(self):
+        return len(self._bans)
+
+    def bans(self):
+        """Snapshot of all ban records, keyed by str(user_id) like mac_load_bans."""
+        return {str(user_id): ban for user_id, ban in list(self._bans.items())}
+
+    #=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+    # Loading
+    #=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+    def load(self, load_bans, load_bypasses, retries=3):
+        """Build the index from ``load_bans()``/``load_bypasses()``.
+
+        Blocking; run it off the event loop. If a mutation lands while the
+        tables are being read the snapshot may be missing it, so the load is
+        repeated (up to ``retries`` times) until the version is stable.
+        """
+        started = time.perf_counter()
+        for _ in range(retries):
+            version = self.version
+            bans = {}
+            for user_id, ban in load_bans().items():
+                key = _as_int(user_id)
+                if key is not None:
+                    bans[key] = ban
+            bypasses = {}
+            for user_id, servers in load_bypasses().items():
+                key = _as_int(user_id)
+                guilds = frozenset(g for g in map(_as_int, servers) if g is not None)
+                if key is not None and guilds:
+                    bypasses[key] = guilds
+            with self._lock:
+                if self.version != version:
+                    continue
+                self._bans = bans
+                self._bypasses = bypasses
+                self.loaded = True
+                self.loaded_at = time.time()
+                self.load_seconds = time.perf_counter() - started
+                return True
+        return False
+
+    def invalidate(self):
+        with self._lock:
+            self.loaded = False
+            self.version += 1
+
+    #=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+    # Mutations (called by handlers.config after the store write succeeded)
+    #=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+    def put_bans(self, bans):
+        with self._lock:
+            self.version += 1
+            for ban in bans:
+                key = _as_int(ban.get("id"))
+                if key is not None:
+                    self._bans[key] = ban
+
+    def drop_ban(self, user_id):
+        with self._lock:
+            self.version += 1
+            self._bans.pop(_as_int(user_id), None)
+
+    def replace_bans(self, bans):
+        with self._lock:
+            self.version += 1
+            if self.loaded:
+                self._bans = {
+                    key: ban for key, ban in ((_as_int(user_id), ban) for user_id, ban in bans.items())
+                    if key is not None
+                }
+
+    def add_bypasses(self, pairs):
+        with self._lock:
+            self.version += 1
+            for user_id, guild_id in pairs:
+                current = self._bypasses.get(user_id, _NO_GUILDS)
+                self._bypasses[user_id] = current | {guild_id}
+
+    def drop_bypass(self, user_id, guild_id):
+        with self._lock:
+            self.version += 1
+            user_id, guild_id = _as_int(user_id), _as_int(guild_id)
+            remaining = self._bypasses.get(user_id, _NO_GUILDS) - {guild_id}
+            if remaining:
+                self._bypasses[user_id] = remaining
+            else:
+                self._bypasses.pop(user_id, None)
+
+    def replace_bypasses(self, bypasses):
+        with self._lock:
+            self.version += 1
+            if self.loaded:
+                rebuilt = {}
+                for user_id, servers in bypasses.items():
+                    key = _as_int(user_id)
+                    guilds = frozenset(g for g in map(_as_int, servers) if g is not None)
+                    if key is not None and guilds:
+                        rebuilt[key] = guilds
+                self._bypasses = rebuilt
+
+    #=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+    # Stats
+    #=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+    def stats(self):
+        return {
+            "loaded": self.loaded,
+            "bans": len(self._bans),
+            "bypass_users": len(self._bypasses),
+            "bypass_pairs": sum(len(guilds) for guilds in list(self._bypasses.values())),
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "bypass_checks": self.bypass_checks,
+            "bypass_hits": self.bypass_hits,
+            "load_seconds": self.load_seconds,
+        }
+
+
+mac_index = MacBanIndex()
@@ -0,0 +1,173 @@
+import asyncio
+import discord
+from handlers.config import EMPTY_CONFIG, get_guild_config, load_onlyimages
+from handlers.debug import LogError
+from handlers.instrumentation import INSTRUMENT_HANDLERS, handler_label, timed_handler
+
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Message Flags
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Every message is described by one bitmask: where it was sent, who sent it,
+# which features the guild has enabled and which flags its channel carries.
+# Stages declare the bits they require and the bits that exclude them.
+GUILD = 1 << 0
+DM = 1 << 1
+AUTHOR_BOT = 1 << 2
+AUTHOR_SELF = 1 << 3
+WEBHOOK = 1 << 4
+SYSTEM = 1 << 5
+
+# Guild features, from the guild's server config
+FEATURE_PROTECTION = 1 << 8
+
+# Channel flags
+CHANNEL_ONLYIMAGES = 1 << 16
+
+GUILD_FEATURES = (
+    ("protection", FEATURE_PROTECTION),
+)
+
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Message Context
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+class MessageContext:
+    """What every stage needs to know about a message, computed once."""
+
+    __slots__ = ("message", "guild", "guild_id", "config", "flags", "_is_admin")
+
+    def __init__(self, bot, message):
+        self.message = message
+        self.guild = guild = message.guild
+        author = message.author
+        channel = message.channel
+
+        flags = 0
+        if author.bot:
+            flags |= AUTHOR_BOT
+        if bot.user is not None and author.id == bot.user.id:
+            flags |= AUTHOR_SELF
+        if message.webhook_id:
+            flags |= WEBHOOK
+        if message.type != discord.MessageType.default:
+            flags |= SYSTEM
+
+        if guild is None:
+            self.guild_id = None
+            self.config = EMPTY_CONFIG
+            if isinstance(channel, discord.DMChannel):
+                flags |= DM
+        else:
+            self.guild_id = guild.id
+            self.config = config = get_guild_config(guild.id)
+            flags |= GUILD
+            for key, bit in GUILD_FEATURES:
+                if config.get(key):
+                    flags |= bit
+
+        if str(channel.id) in load_onlyimages():
+            flags |= CHANNEL_ONLYIMAGES
+
+        self.flags = flags
+        self._is_admin = None
+
+    @property
+    def is_admin(self):
+        """Whether the author has administrator in this guild (computed on first use)."""
+        if self._is_admin is None:
+            author = self.message.author
+            self._is_admin = isinstance(author, discord.Member) and author.guild_permissions.administrator
+        return self._is_admin
+
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Pipeline
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+class MessageStage:
+    __slots__ = ("name", "handler", "run", "require", "exclude", "predicate", "priority")
+
+    def __init__(self, handler, require=0, exclude=0, predicate=None, priority=50):
+        self.name = handler_label(handler)
+        self.handler = handler
+        self.run = timed_handler(handler, self.name) if INSTRUMENT_HANDLERS else handler
+        self.require = require
+        self.exclude = exclude
+        self.predicate = predicate
+        self.priority = priority
+
+    def matches(self, flags):
+        return flags & self.require == self.require and not flags & self.exclude
+
+class MessagePipeline:
+    """The bot's single ``on_message`` listener.
+
+    Cogs register stages instead of listening themselves. For each message
+    the pipeline builds one ``MessageContext`` and runs only the stages whose
+    flag filter and optional ``predicate(ctx)`` accept it. The stage list for
+    a flag combination is resolved once and cached, so a message no stage
+    wants costs the context and one dict lookup.
+
+    Matched stages run concurrently, started in priority order, as they did
+    when each was its own listener: a stage awaiting the API (a level-up DM,
+    a ticket forward) never holds up the others. Stages must therefore not
+    depend on each other's effects. An exception in one stage is logged and
+    does not affect the rest.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.stages = []
+        self._routes = {}
+
+    def register(self, handler, require=0, exclude=0, predicate=None, priority=50):
+        """Add ``handler(ctx)`` as a stage; lower ``priority`` runs first."""
+        self.unregister(handler)
+        self.stages.append(MessageStage(handler, require, exclude, predicate, priority))
+        self.stages.sort(key=lambda stage: stage.priority)
+        self._routes.clear()
+
+    def unregister(self, handler):
+        self.stages = [stage for stage in self.stages if stage.handler != handler]
+        self._routes.clear()
+
+    def route(self, flags):
+        stages = self._routes.get(flags)
+        if stages is None:
+            stages = self._routes[flags] = tuple(stage for stage in self.stages if stage.matches(flags))
+        return stages
+
+    async def dispatch(self, message):
+        stages = None
+        try:
+            ctx = MessageContext(self.bot, message)
+            stages = self.route(ctx.flags)
+        except Exception as e:
+            LogError(f"[PIPELINE] Failed to build message context: {str(e)}")
+        if not stages:
+            return
+
+        matched = []
+        for stage in stages:
+            try:
+                if stage.predicate is None or stage.predicate(ctx):
+                    matched.append(stage)
+            except Exception as e:
+                LogError(f"[PIPELINE] Stage {stage.name} predicate failed: {str(e)}")
+
+        if len(matched) == 1:
+            await self._run(matched[0], ctx)
+        elif matched:
+            await asyncio.gather(*(self._run(stage, ctx) for stage in matched))
+
+    @staticmethod
+    async def _run(stage, ctx):
+        try:
+            await stage.run(ctx)
+        except Exception as e:
+            LogError(f"[PIPELINE] Stage {stage.name} failed: {str(e)}")
+
+def message_pipeline(bot):
+    """The bot's pipeline, created and attached as its ``on_message`` listener on first use."""
+    pipeline = getattr(bot, "message_pipeline", None)
+    if pipeline is None:
+        pipeline = bot.message_pipeline = MessagePipeline(bot)
+        bot.add_listener(pipeline.dispatch, "on_message")
+    return pipeline
@@ -0,0 +1,165 @@
+import threading
+from bisect import bisect_left
+
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Histograms
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Upper bounds in seconds; the last bucket catches everything above.
+DEFAULT_BUCKETS = (
+    0.00001, 0.000025, 0.00005,
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+class Histogram:
+    """Fixed-bucket latency histogram. ``observe`` is a bisect and two adds."""
+
+    __slots__ = ("buckets", "counts", "count", "sum", "max")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the ``q`` quantile (0..1)."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= target:
+                return self.buckets[index] if index < len(self.buckets) else self.max
+        return self.max
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else 0.0
+
+
+_histograms = {}
+_registry_lock = threading.Lock()
+
+def histogram(name, label=None):
+    """Return the histogram registered under ``(name, label)``, creating it once."""
+    key = (name, label)
+    hist = _histograms.get(key)
+    if hist is None:
+        with _registry_lock:
+            hist = _histograms.setdefault(key, Histogram())
+    return hist
+
+def get_histograms(name):
+    """All histograms registered under ``name`` as ``{label: Histogram}``."""
+    return {label: hist for (hist_name, label), hist in list(_histograms.items()) if hist_name == name}
+
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Counters
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+_counters = {}
+_counter_lock = threading.Lock()
+
+def increment(name, label=None, amount=1):
+    # Storage counters are bumped from the save worker threads as well
+    key = (name, label)
+    with _counter_lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+def get_counters(name):
+    """All counters registered under ``name`` as ``{label: int}``."""
+    return {label: value for (counter_name, label), value in list(_counters.items()) if counter_name == name}
+
+def reset_metrics(name):
+    """Zero every histogram and counter registered under ``name``."""
+    for (hist_name, _), hist in list(_histograms.items()):
+        if hist_name == name:
+            hist.reset()
+    for key in list(_counters):
+        if key[0] == name:
+            _counters[key] = 0
+
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Gauges & Metadata
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Gauges are callbacks evaluated at collection time, returning a number or
+# ``{label: number}``. ``describe`` adds the help text and label name used by
+# the Prometheus exposition; undescribed metrics use the label name "label".
+_gauges = {}
+_metadata = {}
+
+def describe(name, help_text, label="label"):
+    _metadata[name] = (help_text, label)
+
+def register_gauge(name, fn, help_text=None, label="label"):
+    _gauges[name] = fn
+    if help_text:
+        describe(name, help_text, label)
+
+def collect():
+    """Snapshot of every metric as ``[(name, type, help, label, samples)]``.
+
+    Cheap enough to run on the event loop; the returned values are copies, so
+    formatting them can happen in another thread.
+    """
+    families = {}
+    for (name, label), hist in list(_histograms.items()):
+        families.setdefault((name, "histogram"), []).append(
+            (label, (hist.buckets, list(hist.counts), hist.count, hist.sum))
+        )
+    with _counter_lock:
+        counters = list(_counters.items())
+    for (name, label), value in counters:
+        families.setdefault((name, "counter"), []).append((label, value))
+    for name, fn in list(_gauges.items()):
+        value = fn()
+        samples = list(value.items()) if isinstance(value, dict) else [(None, value)]
+        families[(name, "gauge")] = samples
+
+    return [
+        (name, kind, *_metadata.get(name, (name.replace("_", " "), "label")), samples)
+        for (name, kind), samples in sorted(families.items())
+    ]
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(pairs):
+    pairs = [(key, value) for key, value in pairs if value is not None]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+def format_prometheus(families, prefix="maggibot_"):
+    """Render ``collect()`` output in the Prometheus text format (0.0.4)."""
+    lines = []
+    for name, kind, help_text, label_name, samples in families:
+        full_name = prefix + name
+        lines.append(f"# HELP {full_name} {_escape(help_text)}")
+        lines.append(f"# TYPE {full_name} {kind}")
+        for label, value in samples:
+            if kind == "histogram":
+                buckets, counts, count, total = value
+                cumulative = 0
+                for bound, bucket_count in zip(buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f"{full_name}_bucket{_labels([(label_name, label), ('le', repr(bound))])} {cumulative}")
+                lines.append(f"{full_name}_bucket{_labels([(label_name, label), ('le', '+Inf')])} {count}")
+                lines.append(f"{full_name}_sum{_labels([(label_name, label)])} {total}")
+                lines.append(f"{full_name}_count{_labels([(label_name, label)])} {count}")
+            else:
+                lines.append(f"{full_name}{_labels([(label_name, label)])} {value}")
+    lines.append("")
+    return "\n".join(lines)
@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import os
+import time
+from aiohttp import web
+from handlers.debug import LogError, LogSystem
+from handlers.metrics import collect, format_prometheus, histogram, increment, register_gauge, describe
+
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Metrics Endpoint Configuration
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() == "true"
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", 9108))
+LOOP_LAG_INTERVAL = float(os.getenv("METRICS_LOOP_LAG_INTERVAL", 0.5))
+
+describe("gateway_events_total", "Gateway events received, by event type", "event")
+describe("discord_api_requests_total", "Outbound Discord API requests, by route", "route")
+describe("discord_api_request_seconds", "Outbound Discord API request latency, by route", "route")
+describe("discord_api_errors_total", "Outbound Discord API requests that failed, by HTTP status", "status")
+describe("discord_api_ratelimits_total", "429 responses from the Discord API", "scope")
+describe("event_loop_lag_seconds", "Delay of the event loop in waking a sleeping task")
+
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Bot Hooks
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+def instrument_gateway(bot):
+    """Count gateway events by type from the ``socket_event_type`` dispatch."""
+    dispatch = bot.dispatch
+
+    def counting_dispatch(event, *args, **kwargs):
+        if event == "socket_event_type":
+            increment("gateway_events_total", args[0])
+        return dispatch(event, *args, **kwargs)
+
+    bot.dispatch = counting_dispatch
+
+def instrument_http(bot):
+    """Count and time every REST call by route template and status."""
+    request = bot.http.request
+
+    async def timed_request(route, **kwargs):
+        label = f"{route.method} {route.path}"
+        increment("discord_api_requests_total", label)
+        started = time.perf_counter()
+        try:
+            return await request(route, **kwargs)
+        except Exception as e:
+            increment("discord_api_errors_total", getattr(e, "status", "none"))
+            raise
+        finally:
+            histogram("discord_api_request_seconds", label).observe(time.perf_counter() - started)
+
+    bot.http.request = timed_request
+    # py-cord retries 429s inside HTTPClient.request and only logs them
+    logging.getLogger("discord.http").addHandler(_RateLimitCounter())
+
+class _RateLimitCounter(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.WARNING)
+
+    def emit(self, record):
+        message = str(record.msg)
+        if message.startswith("We are being rate limited"):
+            increment("discord_api_ratelimits_total", "route")
+        elif message.startswith("Global rate limit"):
+            increment("discord_api_ratelimits_total", "global")
+
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Metrics Exporter
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+class MetricsExporter:
+    """Serves ``/metrics`` in the Prometheus text format on a local port.
+
+    A scrape snapshots the registry on the event loop (a copy of the counters
+    and bucket lists) and renders the text in a worker thread, so a slow or
+    frequent scraper never holds the loop for more than the copy.
+    """
+
+    def __init__(self, bot, host=METRICS_HOST, port=METRICS_PORT):
+        self.bot = bot
+        self.host = host
+        self.port = port
+        self.loop_lag = 0.0
+        self._runner = None
+        self._lag_task = None
+
+    def install(self):
+        # Wrap the bot only once, even if the cog is reloaded
+        if not getattr(self.bot, "_metrics_installed", False):
+            instrument_gateway(self.bot)
+            instrument_http(self.bot)
+            self.bot._metrics_installed = True
+        register_gauge("asyncio_tasks", lambda: len(asyncio.all_tasks()), "Pending asyncio tasks")
+        register_gauge("event_loop_lag_last_seconds", lambda: self.loop_lag, "Most recent event loop lag sample")
+        register_gauge("guilds", lambda: len(self.bot.guilds), "Guilds the bot is in")
+        register_gauge("gateway_latency_seconds", lambda: self.bot.latency, "Gateway heartbeat latency")
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        self._lag_task = asyncio.create_task(self.monitor_loop_lag())
+        LogSystem(f"Metrics endpoint listening on http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self._lag_task:
+            self._lag_task.cancel()
+            self._lag_task = None
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def handle_metrics(self, request):
+        try:
+            families = collect()
+            body = await asyncio.get_running_loop().run_in_executor(None, format_prometheus, families)
+        except Exception as e:
+            LogError(f"Metrics scrape failed: {str(e)}")
+            raise web.HTTPInternalServerError()
+        return web.Response(body=body.encode(), headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+    async def monitor_loop_lag(self, interval=LOOP_LAG_INTERVAL):
+        loop = asyncio.get_running_loop()
+        lag_histogram = histogram("event_loop_lag_seconds")
+        while True:
+            started = loop.time()
+            await asyncio.sleep(interval)
+            self.loop_lag = max(0.0, loop.time() - started - interval)
+            lag_histogram.observe(self.loop_lag)
@@ -0,0 +1,187 @@
+from bisect import bisect_left, bisect_right, insort
+
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Rank Index
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Users ordered by (xp, user_id), kept up to date as XP changes so
+# leaderboards and "rank of user X" never sort the whole stats store.
+#
+# Each entry is one int: xp in fixed point (XP_SCALE) shifted above the 64-bit
+# user id. Entries live in a list of sorted buckets (at most 2 * BUCKET_SIZE
+# each) with a Fenwick tree over the bucket sizes, so insert/remove cost a
+# bisect plus a short list shift, and positional lookups are O(log n).
+XP_SCALE = 1_000_000
+BUCKET_SIZE = 1000
+_ID_SPACE = 1 << 64
+
+
+def encode(user_id, xp):
+    return round(xp * XP_SCALE) * _ID_SPACE + user_id
+
+def decode(key):
+    fixed, user_id = divmod(key, _ID_SPACE)
+    return user_id, fixed / XP_SCALE
+
+
+class SortedKeys:
+    """Minimal sorted multiset of ints with O(log n) positional access."""
+
+    def __init__(self, keys=()):
+        keys = sorted(keys)
+        self._buckets = [keys[i:i + BUCKET_SIZE] for i in range(0, len(keys), BUCKET_SIZE)]
+        self._len = len(keys)
+        self._rebuild()
+
+    def _rebuild(self):
+        self._maxes = [bucket[-1] for bucket in self._buckets]
+        # Fenwick tree over bucket lengths (1-based)
+        tree = [0] * (len(self._buckets) + 1)
+        for i, bucket in enumerate(self._buckets, 1):
+            tree[i] += len(bucket)
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _tree_add(self, bucket, delta):
+        i = bucket + 1
+        tree = self._tree
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, bucket):
+        """Number of keys in buckets before ``bucket``."""
+        total = 0
+        i = bucket
+        tree = self._tree
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+    def _locate(self, position):
+        """(bucket, offset) of the key at ``position``."""
+        tree = self._tree
+        bucket = 0
+        step = 1 << (len(tree).bit_length())
+        while step:
+            nxt = bucket + step
+            if nxt < len(tree) and tree[nxt] <= position:
+                bucket = nxt
+                position -= tree[nxt]
+            step >>= 1
+        return bucket, position
+
+    def __len__(self):
+        return self._len
+
+    def add(self, key):
+        if not self._buckets:
+            self._buckets.append([key])
+            self._len = 1
+            self._rebuild()
+            return
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            i -= 1
+        bucket = self._buckets[i]
+        insort(bucket, key)
+        self._maxes[i] = bucket[-1]
+        self._len += 1
+        if len(bucket) > 2 * BUCKET_SIZE:
+            self._buckets[i:i + 1] = [bucket[:BUCKET_SIZE], bucket[BUCKET_SIZE:]]
+            self._rebuild()
+        else:
+            self._tree_add(i, 1)
+
+    def discard(self, key):
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            return False
+        bucket = self._buckets[i]
+        j = bisect_left(bucket, key)
+        if j == len(bucket) or bucket[j] != key:
+            return False
+        del bucket[j]
+        self._len -= 1
+        if bucket:
+            self._maxes[i] = bucket[-1]
+            self._tree_add(i, -1)
+        else:
+            del self._buckets[i]
+            self._rebuild()
+        return True
+
+    def index(self, key):
+        """Number of keys smaller than ``key``."""
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            return self._len
+        return self._prefix(i) + bisect_left(self._buckets[i], key)
+
+    def count_above(self, key):
+        i = bisect_right(self._maxes, key)
+        if i == len(self._maxes):
+            return 0
+        below = self._prefix(i) + bisect_right(self._buckets[i], key)
+        return self._len - below
+
+    def iter_descending(self, skip=0):
+        """Keys from largest to smallest, skipping the first ``skip``."""
+        if skip >= self._len:
+            return
+        bucket, offset = self._locate(self._len - 1 - skip)
+        while bucket >= 0:
+            keys = self._buckets[bucket]
+            for j in range(offset, -1, -1):
+                yield keys[j]
+            bucket -= 1
+            if bucket >= 0:
+                offset = len(self._buckets[bucket]) - 1
+
+
+class RankIndex:
+    """XP ranking: rank 1 is the highest XP, ties go to the lower user id."""
+
+    def __init__(self, entries=()):
+        # Negate ids so equal XP puts the lower id higher in the ranking
+        self._keys = SortedKeys(encode(_ID_SPACE - 1 - user_id, xp) for user_id, xp in entries)
+
+    def __len__(self):
+        return len(self._keys)
+
+    @staticmethod
+    def _key(user_id, xp):
+        return encode(_ID_SPACE - 1 - int(user_id), xp)
+
+    @staticmethod
+    def _entry(key):
+        inverted, xp = decode(key)
+        return _ID_SPACE - 1 - inverted, xp
+
+    def insert(self, user_id, xp):
+        self._keys.add(self._key(user_id, xp))
+
+    def remove(self, user_id, xp):
+        return self._keys.discard(self._key(user_id, xp))
+
+    def update(self, user_id, old_xp, new_xp):
+        key = self._key(user_id, new_xp)
+        old_key = self._key(user_id, old_xp)
+        if key != old_key:
+            self._keys.discard(old_key)
+            self._keys.add(key)
+
+    def rank(self, user_id, xp):
+        """1-based rank of a user currently holding ``xp``."""
+        return self._keys.count_above(self._key(user_id, xp)) + 1
+
+    def top(self, count, offset=0):
+        """``[(user_id, xp), ...]`` for ranks ``offset + 1`` to ``offset + count``."""
+        result = []
+        for key in self._keys.iter_descending(offset):
+            if len(result) == count:
+                break
+            result.append(self._entry(key))
+        return result
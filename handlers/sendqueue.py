@@ -0,0 +1,232 @@
+import asyncio
+import os
+import time
+from collections import Counter, deque
+import discord
+from handlers.debug import LogDebug, LogError
+from handlers.metrics import describe, histogram, increment, register_gauge
+
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Send Queue Configuration
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Log posts are queued per destination channel and sent by one worker per
+# channel. A worker sends at most SEND_QUEUE_BURST messages per
+# SEND_QUEUE_WINDOW seconds (Discord's per-channel limit is 5 per 5s) and
+# packs queued embeds into as few messages as the embed limits allow.
+# Entries beyond SEND_QUEUE_MAX per channel are dropped and reported in one
+# summary embed. On shutdown the queues get SEND_QUEUE_DRAIN_TIMEOUT seconds
+# to empty.
+SEND_QUEUE_MAX = int(os.getenv("SEND_QUEUE_MAX", 100))
+SEND_QUEUE_BURST = int(os.getenv("SEND_QUEUE_BURST", 5))
+SEND_QUEUE_WINDOW = float(os.getenv("SEND_QUEUE_WINDOW", 5))
+SEND_QUEUE_DRAIN_TIMEOUT = float(os.getenv("SEND_QUEUE_DRAIN_TIMEOUT", 10))
+
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+MAX_THREAD_NAME = 100
+
+describe("send_queue_entries_total", "Queued log posts, by outcome", "outcome")
+describe("send_queue_requests_total", "Messages and threads sent by the send queue", "kind")
+describe("send_queue_wait_seconds", "Time log posts spent queued before they were sent")
+
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Send Queue
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+class _Destination:
+    __slots__ = ("channel", "entries", "sent_at", "dropped", "worker", "wakeup")
+
+    def __init__(self, channel, burst):
+        self.channel = channel
+        # (thread name or None, embed, queued at, send after)
+        self.entries = deque()
+        self.sent_at = deque(maxlen=burst)
+        self.dropped = Counter()
+        self.worker = None
+        # Set when an entry arrives, so a lingering worker re-checks due times
+        self.wakeup = asyncio.Event()
+
+class SendQueue:
+    """Per-channel outbound queues for log embeds.
+
+    ``enqueue`` and ``enqueue_thread`` return immediately; callers no longer
+    wait on (or sleep through) Discord's rate limits. Send failures are logged
+    here, since no caller is awaiting them.
+    """
+
+    def __init__(self, max_depth=SEND_QUEUE_MAX, burst=SEND_QUEUE_BURST, window=SEND_QUEUE_WINDOW):
+        self.max_depth = max_depth
+        self.burst = burst
+        self.window = window
+        self.closing = False
+        self._destinations = {}
+
+    def enqueue(self, channel, embed, linger=0.0):
+        """Queue ``embed`` for ``channel``. Returns False if it was dropped.
+
+        With ``linger`` the entry waits up to that many seconds before it is
+        sent, so events arriving in the meantime share its message.
+        """
+        now = time.monotonic()
+        return self._put(channel, (None, embed, now, now + linger))
+
+    def enqueue_thread(self, forum, name, embed):
+        """Queue a new ``forum`` thread named ``name`` that starts with ``embed``."""
+        now = time.monotonic()
+        return self._put(forum, (name[:MAX_THREAD_NAME], embed, now, now))
+
+    def depth(self):
+        return sum(len(destination.entries) for destination in self._destinations.values())
+
+    def active(self):
+        return sum(1 for destination in self._destinations.values() if destination.worker)
+
+    async def drain(self, timeout=SEND_QUEUE_DRAIN_TIMEOUT):
+        """Send everything still queued, skipping linger, for up to ``timeout``
+        seconds. Returns the number of entries that could not be sent.
+
+        Entries queued while draining are sent right away as well; afterwards
+        the queue works as before.
+        """
+        self.closing = True
+        try:
+            for destination in self._destinations.values():
+                destination.wakeup.set()
+            workers = [destination.worker for destination in self._destinations.values() if destination.worker]
+            if workers:
+                _, pending = await asyncio.wait(workers, timeout=timeout)
+                for worker in pending:
+                    worker.cancel()
+        finally:
+            self.closing = False
+        left = self.depth()
+        if left:
+            increment("send_queue_entries_total", "dropped", left)
+            LogError(f"[SENDQUEUE] {left} queued log entries were not sent before shutdown")
+        return left
+
+    def _put(self, channel, entry):
+        destination = self._destinations.get(channel.id)
+        if destination is None:
+            destination = self._destinations[channel.id] = _Destination(channel, self.burst)
+        destination.channel = channel
+
+        if len(destination.entries) >= self.max_depth:
+            destination.dropped[entry[1].title or "Untitled"] += 1
+            increment("send_queue_entries_total", "dropped")
+            return False
+
+        destination.entries.append(entry)
+        destination.wakeup.set()
+        increment("send_queue_entries_total", "queued")
+        if destination.worker is None:
+            destination.worker = asyncio.get_running_loop().create_task(self._drain(destination))
+        return True
+
+    async def _drain(self, destination):
+        try:
+            while True:
+                while destination.entries or destination.dropped:
+                    if destination.entries and not self.closing:
+                        # Send as soon as any entry is due; lingering ones ride along
+                        destination.wakeup.clear()
+                        delay = min(entry[3] for entry in destination.entries) - time.monotonic()
+                        if delay > 0:
+                            await self._wait_for_entry(destination, delay)
+                            continue
+                    await self._wait_for_slot(destination)
+                    thread_name, embeds = self._take_batch(destination)
+                    await self._send(destination, thread_name, embeds)
+
+                # Idle: the send times still matter for the rate limit until
+                # the window has passed, then the channel is forgotten
+                idle = destination.sent_at[-1] + self.window - time.monotonic() if destination.sent_at else 0
+                if idle <= 0 or self.closing:
+                    break
+                destination.wakeup.clear()
+                await self._wait_for_entry(destination, idle)
+        finally:
+            destination.worker = None
+            channel_id = destination.channel.id
+            if not (destination.entries or destination.dropped) and self._destinations.get(channel_id) is destination:
+                del self._destinations[channel_id]
+
+    @staticmethod
+    async def _wait_for_entry(destination, timeout):
+        try:
+            await asyncio.wait_for(destination.wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _wait_for_slot(self, destination):
+        # Entries keep queueing while we wait, so a burst leaves in full batches
+        sent_at = destination.sent_at
+        if len(sent_at) == self.burst:
+            delay = sent_at[0] + self.window - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+    def _take_batch(self, destination):
+        entries = destination.entries
+        now = time.monotonic()
+        wait_histogram = histogram("send_queue_wait_seconds")
+
+        if entries and entries[0][0] is not None:
+            thread_name, embed, queued_at, _ = entries.popleft()
+            wait_histogram.observe(now - queued_at)
+            return thread_name, [embed]
+
+        # The dropped summary shares the message limits with the entries
+        summary = self._dropped_summary(destination.dropped) if destination.dropped else None
+        max_embeds = MAX_EMBEDS_PER_MESSAGE - (summary is not None)
+        max_chars = MAX_EMBED_CHARS_PER_MESSAGE - (len(summary) if summary else 0)
+
+        embeds = []
+        chars = 0
+        while entries and entries[0][0] is None and len(embeds) < max_embeds:
+            size = len(entries[0][1])
+            if embeds and chars + size > max_chars:
+                break
+            _, embed, queued_at, _ = entries.popleft()
+            wait_histogram.observe(now - queued_at)
+            embeds.append(embed)
+            chars += size
+
+        # An oversized first entry goes alone; the summary then waits a batch
+        if summary is not None and chars + len(summary) <= MAX_EMBED_CHARS_PER_MESSAGE:
+            embeds.append(summary)
+            destination.dropped = Counter()
+        return None, embeds
+
+    @staticmethod
+    def _dropped_summary(dropped):
+        embed = discord.Embed(
+            title="⚠️ Log Entries Dropped",
+            description=f"{sum(dropped.values())} log entries for this channel were dropped because too many were queued at once.",
+            color=discord.Color.orange(),
+            timestamp=discord.utils.utcnow()
+        )
+        for title, count in dropped.most_common(10):
+            embed.add_field(name=title[:256], value=f"{count}x", inline=True)
+        return embed
+
+    async def _send(self, destination, thread_name, embeds):
+        channel = destination.channel
+        destination.sent_at.append(time.monotonic())
+        try:
+            if isinstance(channel, discord.ForumChannel):
+                await channel.create_thread(name=thread_name or embeds[0].title or "log", embeds=embeds)
+                increment("send_queue_requests_total", "thread")
+            else:
+                await channel.send(embeds=embeds)
+                increment("send_queue_requests_total", "message")
+            increment("send_queue_entries_total", "sent", len(embeds))
+            if len(embeds) > 1:
+                LogDebug(f"[SENDQUEUE] Sent {len(embeds)} embeds in one message to {channel.id}")
+        except Exception as e:
+            increment("send_queue_entries_total", "failed", len(embeds))
+            LogError(f"[SENDQUEUE] Failed to send {len(embeds)} embed(s) to {channel.id}: {str(e)}")
+
+send_queue = SendQueue()
+
+register_gauge("send_queue_depth", send_queue.depth, "Log posts waiting in the send queue")
+register_gauge("send_queue_active_channels", send_queue.active, "Channels with a running send queue worker")
@@ -0,0 +1,62 @@
+import time
+from collections import OrderedDict, deque
+
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Sliding Window Counter
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+class SlidingWindowCounter:
+    """Counts events per key over the last ``window`` seconds.
+
+    Each key keeps the timestamps of its newest ``max_events`` events in a
+    bounded deque; expired timestamps are dropped when the key is touched,
+    so there are no timers or background tasks. Keys are kept in LRU order:
+    idle keys whose events have all expired are dropped as new events come
+    in, and beyond ``max_keys`` the least recently used key is evicted.
+    Memory is bounded by ``max_keys * max_events`` timestamps.
+    """
+
+    def __init__(self, window, max_events, max_keys=10000):
+        self.window = window
+        self.max_events = max_events
+        self.max_keys = max_keys
+        self._events = OrderedDict()
+
+    def hit(self, key, now=None):
+        """Record one event for ``key`` and return its count in the window
+        (at most ``max_events``)."""
+        now = time.monotonic() if now is None else now
+        cutoff = now - self.window
+        events = self._events.get(key)
+        if events is None:
+            events = self._events[key] = deque(maxlen=self.max_events)
+        else:
+            self._events.move_to_end(key)
+            while events and events[0] <= cutoff:
+                events.popleft()
+        events.append(now)
+        self._evict(cutoff)
+        return len(events)
+
+    def count(self, key, now=None):
+        events = self._events.get(key)
+        if not events:
+            return 0
+        cutoff = (time.monotonic() if now is None else now) - self.window
+        return sum(1 for timestamp in events if timestamp > cutoff)
+
+    def reset(self, key):
+        self._events.pop(key, None)
+
+    def __len__(self):
+        return len(self._events)
+
+    def _evict(self, cutoff):
+        events = self._events
+        while len(events) > self.max_keys:
+            events.popitem(last=False)
+        # The least recently used key is idle once its newest event expired
+        while events:
+            oldest = next(iter(events.values()))
+            if oldest and oldest[-1] > cutoff:
+                break
+            events.popitem(last=False)
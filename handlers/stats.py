@@ -0,0 +1,209 @@
+import os
+import time
+from handlers.config import (
+    load_stats, save_stats, storage, SQLITE_STORES, STATS_FILE, MESSAGE_XP_COUNT, ATTACHMENT_XP_COUNT, VOICE_XP_COUNT,
+)
+from handlers.debug import LogDebug
+from handlers.statstable import StatsTable
+from handlers.ranking import RankIndex
+
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Write-Behind Configuration
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+STATS_FLUSH_INTERVAL = float(os.getenv("STATS_FLUSH_INTERVAL", 30))
+STATS_FLUSH_THRESHOLD = int(os.getenv("STATS_FLUSH_THRESHOLD", 500))
+# "columnar" keeps stats in typed arrays (handlers.statstable), loaded straight
+# from storage: about a tenth of the resident memory of nested dicts. "dict"
+# keeps the plain nested dicts, whose per-message updates are a little faster.
+STATS_TABLE = os.getenv("STATS_TABLE", "columnar").lower()
+
+def new_user_stats():
+    return {"xp": 0.0, "servers": {}, "level": 0}
+
+def new_server_stats():
+    return {"messages": 0, "media": 0, "voiceminutes": 0, "xp": 0.0}
+
+def estimate_server_xp(server_stats):
+    """Per-guild XP for entries saved before it was tracked: the base XP of
+    their counters (multipliers applied back then are not recorded)."""
+    return (
+        server_stats.get("messages", 0) * MESSAGE_XP_COUNT
+        + server_stats.get("media", 0) * ATTACHMENT_XP_COUNT
+        + server_stats.get("voiceminutes", 0) * VOICE_XP_COUNT
+    )
+
+def _table_from_rows(users, servers):
+    servers = (
+        (user_id, guild_id, messages, media, voiceminutes, xp if xp is not None else estimate_server_xp(
+            {"messages": messages, "media": media, "voiceminutes": voiceminutes}
+        ))
+        for user_id, guild_id, messages, media, voiceminutes, xp in servers
+    )
+    return StatsTable.from_rows(users, servers)
+
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Stats Service
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+class StatsService:
+    """Keeps user stats in memory and persists them write-behind.
+
+    Listeners mutate the in-memory records and call ``mark_dirty``. The data is
+    written out when ``flush`` runs, either from the periodic task in
+    ``UserStats``, when ``flush_threshold`` users are dirty, or on shutdown.
+    """
+
+    def __init__(self, flush_interval=STATS_FLUSH_INTERVAL, flush_threshold=STATS_FLUSH_THRESHOLD, table=STATS_TABLE):
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.columnar = table == "columnar"
+        self.flush_count = 0
+        self._stats = None
+        self._ranking = None
+        self._guild_rankings = {}
+        self._dirty = set()
+        self._last_flush = time.monotonic()
+
+    @property
+    def stats(self):
+        if self._stats is None:
+            if self.columnar and storage and STATS_FILE in SQLITE_STORES:
+                self._stats = storage.load_stats_rows(_table_from_rows)
+                return self._stats
+            stats = load_stats()
+            for user_stats in stats.values():
+                for server_stats in user_stats.get("servers", {}).values():
+                    if "xp" not in server_stats:
+                        server_stats["xp"] = estimate_server_xp(server_stats)
+            # Consume the dicts while copying so both are never fully resident
+            self._stats = StatsTable.from_dict(stats, consume=True) if self.columnar else stats
+        return self._stats
+
+    @property
+    def ranking(self):
+        """Global XP RankIndex, built on first use and then kept current by
+        ``ensure_user``/``add_xp``."""
+        if self._ranking is None:
+            stats = self.stats
+            if isinstance(stats, StatsTable):
+                entries = stats.iter_xp()
+            else:
+                entries = ((int(user_id), user_stats.get("xp", 0.0)) for user_id, user_stats in stats.items())
+            self._ranking = RankIndex(entries)
+        return self._ranking
+
+    def guild_ranking(self, guild_id):
+        """Per-guild XP RankIndex for ``guild_id``, built on first use."""
+        guild_id = str(guild_id)
+        ranking = self._guild_rankings.get(guild_id)
+        if ranking is None:
+            stats = self.stats
+            if isinstance(stats, StatsTable):
+                entries = stats.iter_guild_xp(guild_id)
+            else:
+                entries = (
+                    (int(user_id), user_stats["servers"][guild_id].get("xp", 0.0))
+                    for user_id, user_stats in stats.items()
+                    if guild_id in user_stats.get("servers", {})
+                )
+            ranking = self._guild_rankings[guild_id] = RankIndex(entries)
+        return ranking
+
+    @property
+    def dirty_count(self):
+        return len(self._dirty)
+
+    def get_user(self, user_id):
+        return self.stats.get(str(user_id))
+
+    def ensure_user(self, user_id):
+        user_id = str(user_id)
+        user_stats = self.stats.get(user_id)
+        if user_stats is None:
+            self.stats[user_id] = new_user_stats()
+            user_stats = self.stats[user_id]
+            if self._ranking is not None:
+                self._ranking.insert(user_id, user_stats["xp"])
+        # Initialize level if not present (for old users)
+        if "level" not in user_stats:
+            user_stats["level"] = int(user_stats["xp"] // 20)
+        return user_stats
+
+    def ensure_server(self, user_stats, guild_id, user_id=None):
+        guild_id = str(guild_id)
+        servers = user_stats["servers"]
+        server_stats = servers.get(guild_id)
+        if server_stats is not None:
+            return server_stats
+        server_stats = servers.setdefault(guild_id, new_server_stats())
+        ranking = self._guild_rankings.get(guild_id)
+        if ranking is not None and user_id is not None:
+            ranking.insert(user_id, server_stats["xp"])
+        return server_stats
+
+    def add_xp(self, user_id, user_stats, amount, server_stats=None, guild_id=None):
+        """Add XP to ``user_stats`` (and to ``server_stats`` for ``guild_id``)
+        and move the user in the rankings. Returns the new global total."""
+        old_xp = user_stats["xp"]
+        user_stats["xp"] = old_xp + amount
+        if self._ranking is not None:
+            self._ranking.update(user_id, old_xp, user_stats["xp"])
+
+        if server_stats is not None:
+            old_guild_xp = server_stats.get("xp", 0.0)
+            server_stats["xp"] = old_guild_xp + amount
+            ranking = self._guild_rankings.get(str(guild_id))
+            if ranking is not None:
+                ranking.update(user_id, old_guild_xp, server_stats["xp"])
+        return user_stats["xp"]
+
+    def rank_of(self, user_id):
+        """1-based global XP rank of ``user_id``, or None if they have no stats."""
+        user_stats = self.get_user(user_id)
+        if user_stats is None:
+            return None
+        return self.ranking.rank(user_id, user_stats.get("xp", 0.0))
+
+    def top(self, count=10, offset=0):
+        """``[(user_id, user_stats), ...]`` for the given leaderboard page."""
+        return [(str(user_id), self.get_user(user_id)) for user_id, _ in self.ranking.top(count, offset)]
+
+    def guild_rank_of(self, user_id, guild_id):
+        """1-based XP rank of ``user_id`` within ``guild_id``, or None."""
+        user_stats = self.get_user(user_id)
+        server_stats = user_stats["servers"].get(str(guild_id)) if user_stats else None
+        if server_stats is None:
+            return None
+        return self.guild_ranking(guild_id).rank(user_id, server_stats.get("xp", 0.0))
+
+    def guild_top(self, guild_id, count=10, offset=0):
+        """``[(user_id, user_stats), ...]`` for a page of the ``guild_id`` leaderboard."""
+        ranking = self.guild_ranking(guild_id)
+        return [(str(user_id), self.get_user(user_id)) for user_id, _ in ranking.top(count, offset)]
+
+    def mark_dirty(self, user_id):
+        self._dirty.add(str(user_id))
+        if len(self._dirty) >= self.flush_threshold:
+            self.flush()
+
+    def flush_due(self):
+        return bool(self._dirty) and time.monotonic() - self._last_flush >= self.flush_interval
+
+    def flush(self):
+        """Persist pending changes. Returns True if anything was written."""
+        if not self._dirty or self._stats is None:
+            return False
+
+        dirty, self._dirty = self._dirty, set()
+        try:
+            save_stats(self._stats, user_ids=dirty)
+        except Exception:
+            self._dirty |= dirty
+            raise
+
+        self._last_flush = time.monotonic()
+        self.flush_count += 1
+        LogDebug(f"[STATS] Flushed {len(dirty)} dirty user(s)")
+        return True
+
+
+stats_service = StatsService()
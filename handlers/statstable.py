@@ -0,0 +1,518 @@
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+from handlers.debug import LogError
+
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Columnar Stats Table
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Holds the same data as the nested stats dict
+#     {user_id: {"xp": float, "level": int, "servers": {guild_id: {...}}}}
+# in typed arrays: one row per user (xp, level) and one row per (user, guild)
+# pair (messages, media, voiceminutes, xp). A user's guild rows form a linked list
+# through ``_s_next``. The user index is a sorted int64 array built at load
+# plus a dict for users added since, so a million users cost a few dozen bytes
+# each instead of several hundred.
+#
+# UserRecord / ServersView / ServerRecord are thin views that behave like the
+# old dicts (``stats[user]["xp"] += 1``, ``user["servers"].items()``, ...).
+#
+# Rows stay dense: deleting a user (or one of its guilds) moves the last row
+# into the freed slot. Views taken before a delete must not be used after it;
+# the bot itself never deletes users at runtime.
+USER_FIELDS = ("xp", "servers", "level")
+SERVER_FIELDS = ("messages", "media", "voiceminutes", "xp")
+_NO_ROW = -1
+
+def _as_id(value):
+    return value if type(value) is int else int(value)
+
+
+class ServerRecord(Mapping):
+    __slots__ = ("_table", "_srow")
+
+    def __init__(self, table, srow):
+        self._table = table
+        self._srow = srow
+
+    def __getitem__(self, key):
+        return self._table._server_columns[key][self._srow]
+
+    def __setitem__(self, key, value):
+        column = self._table._server_columns[key]
+        try:
+            column[self._srow] = value
+        except TypeError:
+            column[self._srow] = float(value) if column.typecode == "d" else int(value)
+
+    def get(self, key, default=None):
+        column = self._table._server_columns.get(key)
+        return default if column is None else column[self._srow]
+
+    def __iter__(self):
+        return iter(SERVER_FIELDS)
+
+    def __len__(self):
+        return len(SERVER_FIELDS)
+
+    def __contains__(self, key):
+        return key in SERVER_FIELDS
+
+    def to_json(self):
+        table, srow = self._table, self._srow
+        return {
+            "messages": table._messages[srow],
+            "media": table._media[srow],
+            "voiceminutes": table._voice[srow],
+            "xp": table._s_xp[srow],
+        }
+
+
+class ServersView(Mapping):
+    """``{guild_id (str): ServerRecord}`` for one user."""
+
+    __slots__ = ("_table", "_row")
+
+    def __init__(self, table, row):
+        self._table = table
+        self._row = row
+
+    def _rows(self):
+        table = self._table
+        srow = table._first_server[self._row]
+        while srow != _NO_ROW:
+            yield srow
+            srow = table._s_next[srow]
+
+    def _find(self, guild_id):
+        table = self._table
+        guild = table._guild_index.get(guild_id)
+        if guild is None:
+            guild = table._guild_index.get(_as_id(guild_id))
+            if guild is None:
+                return _NO_ROW
+        s_guild, s_next = table._s_guild, table._s_next
+        srow = table._first_server[self._row]
+        while srow != _NO_ROW and s_guild[srow] != guild:
+            srow = s_next[srow]
+        return srow
+
+    def __getitem__(self, guild_id):
+        srow = self._find(guild_id)
+        if srow == _NO_ROW:
+            raise KeyError(guild_id)
+        return ServerRecord(self._table, srow)
+
+    def __setitem__(self, guild_id, values):
+        srow = self._find(guild_id)
+        if srow == _NO_ROW:
+            srow = self._table._add_server(self._row, _as_id(guild_id))
+        self._table._fill_server(srow, values)
+
+    def get(self, guild_id, default=None):
+        try:
+            srow = self._find(guild_id)
+        except (TypeError, ValueError):
+            return default
+        return default if srow == _NO_ROW else ServerRecord(self._table, srow)
+
+    def setdefault(self, guild_id, default=None):
+        srow = self._find(guild_id)
+        if srow == _NO_ROW:
+            srow = self._table._add_server(self._row, _as_id(guild_id))
+            self._table._fill_server(srow, default or {})
+        return ServerRecord(self._table, srow)
+
+    def __iter__(self):
+        guild_ids = self._table._guild_ids
+        s_guild = self._table._s_guild
+        for srow in self._rows():
+            yield str(guild_ids[s_guild[srow]])
+
+    def __len__(self):
+        return sum(1 for _ in self._rows())
+
+    def __contains__(self, guild_id):
+        try:
+            return self._find(guild_id) != _NO_ROW
+        except (TypeError, ValueError):
+            return False
+
+    def items(self):
+        guild_ids = self._table._guild_ids
+        s_guild = self._table._s_guild
+        return [(str(guild_ids[s_guild[srow]]), ServerRecord(self._table, srow)) for srow in self._rows()]
+
+    def values(self):
+        return [ServerRecord(self._table, srow) for srow in self._rows()]
+
+    def to_json(self):
+        return {guild_id: record.to_json() for guild_id, record in self.items()}
+
+
+class UserRecord(Mapping):
+    __slots__ = ("_table", "_row")
+
+    def __init__(self, table, row):
+        self._table = table
+        self._row = row
+
+    def __getitem__(self, key):
+        column = self._table._user_columns.get(key)
+        if column is not None:
+            return column[self._row]
+        if key == "servers":
+            return ServersView(self._table, self._row)
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        column = self._table._user_columns.get(key)
+        if column is not None:
+            try:
+                column[self._row] = value
+            except TypeError:
+                column[self._row] = float(value) if column.typecode == "d" else int(value)
+        elif key == "servers":
+            servers = ServersView(self._table, self._row)
+            for guild_id, values in value.items():
+                servers[guild_id] = values
+        else:
+            raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __iter__(self):
+        return iter(USER_FIELDS)
+
+    def __len__(self):
+        return len(USER_FIELDS)
+
+    def __contains__(self, key):
+        return key in USER_FIELDS
+
+    def to_json(self):
+        return {
+            "xp": self._table._xp[self._row],
+            "servers": ServersView(self._table, self._row).to_json(),
+            "level": self._table._level[self._row],
+        }
+
+
+class StatsTable(Mapping):
+    """Dict-like ``{user_id (str): UserRecord}`` backed by typed arrays."""
+
+    def __init__(self):
+        # User rows
+        self._user_ids = array("q")
+        self._xp = array("d")
+        self._level = array("i")
+        self._first_server = array("i")
+        # Index: sorted ids from the last build + users added since
+        self._sorted_ids = array("q")
+        self._sorted_rows = array("i")
+        self._recent = {}
+        # (user, guild) rows
+        self._s_user = array("i")
+        self._s_guild = array("i")
+        self._s_next = array("i")
+        self._messages = array("i")
+        self._media = array("i")
+        self._voice = array("i")
+        self._s_xp = array("d")
+        # Field name -> column, so record item access is one dict lookup
+        self._user_columns = {"xp": self._xp, "level": self._level}
+        self._server_columns = {
+            "messages": self._messages,
+            "media": self._media,
+            "voiceminutes": self._voice,
+            "xp": self._s_xp,
+        }
+        # Guild ids are few; map them (as int and str) to small ints
+        self._guild_ids = []
+        self._guild_index = {}
+
+    @classmethod
+    def from_dict(cls, stats, consume=False):
+        """Build a table from the nested dict returned by ``load_stats``.
+
+        With ``consume`` every user is popped from ``stats`` as it is copied,
+        so the dicts are freed while the table grows instead of both being
+        resident at the end.
+        """
+        table = cls()
+        skipped = 0
+        for user_id in list(stats) if consume else stats:
+            user_stats = stats.pop(user_id) if consume else stats[user_id]
+            try:
+                user_id = _as_id(user_id)
+            except (TypeError, ValueError):
+                skipped += 1
+                continue
+            xp = float(user_stats.get("xp", 0.0))
+            row = table._add_user(user_id, xp, user_stats.get("level", xp // 20))
+            table._fill_servers(row, user_stats.get("servers", {}))
+        if skipped:
+            LogError(f"[STATS] Skipped {skipped} stats entries with invalid user IDs")
+        table.rebuild_index()
+        return table
+
+    @classmethod
+    def from_rows(cls, users, servers):
+        """Build a table straight from ``(user_id, xp, level)`` rows and
+        ``(user_id, guild_id, messages, media, voiceminutes, xp)`` rows, both
+        ordered by user_id (the SQLite store), without an intermediate dict."""
+        table = cls()
+        for user_id, xp, level in users:
+            table._add_user(user_id, xp, level)
+
+        ids = table._user_ids
+        count = len(ids)
+        i = 0
+        current = row = None
+        for user_id, guild_id, messages, media, voiceminutes, xp in servers:
+            if user_id != current:
+                current = user_id
+                while i < count and ids[i] < user_id:
+                    i += 1
+                if i < count and ids[i] == user_id:
+                    row = i
+                else:
+                    # Guild stats without a user_xp row
+                    row = table._add_user(user_id, 0.0, 0)
+            srow = table._add_server(row, guild_id)
+            table._messages[srow] = messages
+            table._media[srow] = media
+            table._voice[srow] = voiceminutes
+            table._s_xp[srow] = xp
+        table.rebuild_index()
+        return table
+
+    #=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+    # Rows
+    #=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+    def _guild(self, guild_id):
+        guild = self._guild_index.get(guild_id)
+        if guild is None:
+            guild = len(self._guild_ids)
+            self._guild_index[guild_id] = self._guild_index[str(guild_id)] = guild
+            self._guild_ids.append(guild_id)
+        return guild
+
+    def _add_user(self, user_id, xp, level):
+        """Append a user row (not indexed yet) and return it."""
+        row = len(self._user_ids)
+        self._user_ids.append(user_id)
+        self._xp.append(float(xp))
+        self._level.append(int(level))
+        self._first_server.append(_NO_ROW)
+        return row
+
+    def _fill_servers(self, row, servers):
+        for guild_id, server_stats in servers.items():
+            self._fill_server(self._add_server(row, _as_id(guild_id)), server_stats)
+
+    def _fill_server(self, srow, values):
+        self._messages[srow] = int(values.get("messages", 0))
+        self._media[srow] = int(values.get("media", 0))
+        self._voice[srow] = int(values.get("voiceminutes", 0))
+        self._s_xp[srow] = float(values.get("xp", 0.0))
+
+    def _add_server(self, row, guild_id):
+        srow = len(self._s_guild)
+        s_next = self._s_next
+        self._s_user.append(row)
+        self._s_guild.append(self._guild(guild_id))
+        s_next.append(_NO_ROW)
+        self._messages.append(0)
+        self._media.append(0)
+        self._voice.append(0)
+        self._s_xp.append(0.0)
+
+        # Append at the tail so guilds keep their insertion order
+        tail = self._first_server[row]
+        if tail == _NO_ROW:
+            self._first_server[row] = srow
+        else:
+            while s_next[tail] != _NO_ROW:
+                tail = s_next[tail]
+            s_next[tail] = srow
+        return srow
+
+    def _clear_servers(self, row):
+        """Remove every guild row of user ``row``."""
+        srows = list(ServersView(self, row)._rows())
+        self._first_server[row] = _NO_ROW
+        # Highest first, so the row moved into each slot is never one of these
+        for srow in sorted(srows, reverse=True):
+            self._remove_server_row(srow)
+
+    def _remove_server_row(self, srow):
+        columns = (
+            self._s_user, self._s_guild, self._s_next, self._messages, self._media, self._voice, self._s_xp,
+        )
+        last = len(self._s_guild) - 1
+        if srow != last:
+            for column in columns:
+                column[srow] = column[last]
+            # Re-point whatever linked to the moved row
+            row = self._s_user[srow]
+            prev = self._first_server[row]
+            if prev == last:
+                self._first_server[row] = srow
+            else:
+                while self._s_next[prev] != last:
+                    prev = self._s_next[prev]
+                self._s_next[prev] = srow
+        for column in columns:
+            column.pop()
+
+    def _remove_user_row(self, row):
+        self._clear_servers(row)
+        columns = (self._user_ids, self._xp, self._level, self._first_server)
+        last = len(self._user_ids) - 1
+        if row != last:
+            for column in columns:
+                column[row] = column[last]
+            srow = self._first_server[row]
+            while srow != _NO_ROW:
+                self._s_user[srow] = row
+                srow = self._s_next[srow]
+            self._move_index(self._user_ids[row], row)
+        for column in columns:
+            column.pop()
+
+    def _move_index(self, user_id, row):
+        if user_id in self._recent:
+            self._recent[user_id] = row
+            return
+        ids = self._sorted_ids
+        i = bisect_left(ids, user_id)
+        if i < len(ids) and ids[i] == user_id:
+            self._sorted_rows[i] = row
+
+    def _row(self, user_id):
+        row = self._recent.get(user_id)
+        if row is not None:
+            return row
+        ids = self._sorted_ids
+        i = bisect_left(ids, user_id)
+        if i < len(ids) and ids[i] == user_id:
+            # Entries of deleted users stay until the next rebuild; their
+            # row now holds someone else (or is gone)
+            row = self._sorted_rows[i]
+            if row < len(self._user_ids) and self._user_ids[row] == user_id:
+                return row
+        return None
+
+    def rebuild_index(self):
+        """Move every user into the sorted index. O(n log n); run at load."""
+        ids = self._user_ids
+        rows = sorted(range(len(ids)), key=ids.__getitem__)
+        self._sorted_ids = array("q", (ids[row] for row in rows))
+        self._sorted_rows = array("i", rows)
+        self._recent = {}
+
+    #=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+    # Mapping API
+    #=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+    def __getitem__(self, user_id):
+        try:
+            row = self._row(_as_id(user_id))
+        except (TypeError, ValueError):
+            row = None
+        if row is None:
+            raise KeyError(user_id)
+        return UserRecord(self, row)
+
+    def get(self, user_id, default=None):
+        # The per-message lookup, so ``_row`` is inlined here
+        try:
+            user_id = _as_id(user_id)
+        except (TypeError, ValueError):
+            return default
+        row = self._recent.get(user_id)
+        if row is None:
+            ids = self._sorted_ids
+            i = bisect_left(ids, user_id)
+            if i == len(ids) or ids[i] != user_id:
+                return default
+            row = self._sorted_rows[i]
+            if row >= len(self._user_ids) or self._user_ids[row] != user_id:
+                return default
+        return UserRecord(self, row)
+
+    def __setitem__(self, user_id, user_stats):
+        user_id = _as_id(user_id)
+        xp = float(user_stats.get("xp", 0.0))
+        level = user_stats.get("level", xp // 20)
+        row = self._row(user_id)
+        if row is None:
+            row = self._recent[user_id] = self._add_user(user_id, xp, level)
+        else:
+            self._clear_servers(row)
+            self._xp[row] = xp
+            self._level[row] = int(level)
+        self._fill_servers(row, user_stats.get("servers", {}))
+
+    def __delitem__(self, user_id):
+        user_id = _as_id(user_id)
+        row = self._row(user_id)
+        if row is None:
+            raise KeyError(user_id)
+        self._recent.pop(user_id, None)
+        self._remove_user_row(row)
+
+    def pop(self, user_id, default=None):
+        try:
+            record = self[user_id].to_json()
+        except KeyError:
+            return default
+        del self[user_id]
+        return record
+
+    def __contains__(self, user_id):
+        try:
+            return self._row(_as_id(user_id)) is not None
+        except (TypeError, ValueError):
+            return False
+
+    def __iter__(self):
+        return map(str, self._user_ids)
+
+    def __len__(self):
+        return len(self._user_ids)
+
+    def items(self):
+        for row, user_id in enumerate(self._user_ids):
+            yield str(user_id), UserRecord(self, row)
+
+    def values(self):
+        return (UserRecord(self, row) for row in range(len(self._user_ids)))
+
+    def iter_xp(self):
+        """``(user_id, xp)`` for every user, straight from the columns."""
+        return zip(self._user_ids, self._xp)
+
+    def iter_guild_xp(self, guild_id):
+        """``(user_id, guild xp)`` for every member with stats in ``guild_id``."""
+        guild = self._guild_index.get(_as_id(guild_id))
+        if guild is None:
+            return iter(())
+        ids = self._user_ids
+        return ((ids[row], xp) for g, row, xp in zip(self._s_guild, self._s_user, self._s_xp) if g == guild)
+
+    def to_json(self):
+        return {user_id: record.to_json() for user_id, record in self.items()}
+
+    def memory_bytes(self):
+        """Approximate bytes held by the arrays and index (excluding views)."""
+        arrays = (
+            self._user_ids, self._xp, self._level, self._first_server, self._sorted_ids,
+            self._sorted_rows, self._s_user, self._s_guild, self._s_next, self._messages, self._media,
+            self._voice, self._s_xp,
+        )
+        return sum(a.buffer_info()[1] * a.itemsize for a in arrays)
@@ -0,0 +1,372 @@
+import json
+import os
+import sqlite3
+import threading
+from dotenv import load_dotenv
+from handlers.debug import LogDebug, LogError, LogSystem
+
+load_dotenv()
+
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Storage Backend Configuration
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# STORAGE_TYPE=json keeps every store in its JSON file, STORAGE_TYPE=sqlite
+# moves them into one WAL-mode SQLite database. MAC bans keep using DB_TYPE.
+STORAGE_TYPE = os.getenv("STORAGE_TYPE", "json")
+STORAGE_DB = os.getenv("STORAGE_DB", "data/maggibot.db")
+
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Schema
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Document stores: every dict level listed in ``keys`` becomes a key column and
+# whatever sits below it is stored as one JSON value per row. ``columns``
+# copies selected fields of that value into real, indexed columns.
+DOCUMENT_STORES = {
+    "server_config": {"keys": ("guild_id",)},
+    "voicegate_config": {"keys": ("guild_id",)},
+    "admin_feedback": {"keys": ("section", "entry_id")},
+    "lockdown": {"keys": ("name",)},
+    "only_images": {"keys": ("channel_id",)},
+    "random_math": {"keys": ("guild_id",)},
+    "cookies": {"keys": ("user_id",)},
+    "tags": {"keys": ("guild_id", "tag")},
+    "tickets": {"keys": ("guild_id", "user_id"), "columns": ("channel_id",)},
+    "activity": {"keys": ("guild_id", "user_id")},
+    "voice_sessions": {"keys": ("guild_id", "user_id")},
+    "logging_threads": {"keys": ("guild_id", "thread_key")},
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_xp (
+    user_id INTEGER PRIMARY KEY,
+    xp REAL NOT NULL DEFAULT 0,
+    level INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS user_server_stats (
+    user_id INTEGER NOT NULL,
+    guild_id INTEGER NOT NULL,
+    messages INTEGER NOT NULL DEFAULT 0,
+    media INTEGER NOT NULL DEFAULT 0,
+    voiceminutes INTEGER NOT NULL DEFAULT 0,
+    xp REAL,
+    PRIMARY KEY (user_id, guild_id)
+);
+CREATE INDEX IF NOT EXISTS idx_user_server_stats_guild ON user_server_stats (guild_id);
+CREATE INDEX IF NOT EXISTS idx_user_xp_xp ON user_xp (xp);
+CREATE TABLE IF NOT EXISTS xp_boost_channels (
+    channel_id TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS xp_role_multipliers (
+    role_id TEXT PRIMARY KEY,
+    multiplier REAL NOT NULL
+);
+"""
+
+# Columns added after the first release: (table, column, definition)
+COLUMN_MIGRATIONS = (
+    ("user_server_stats", "xp", "REAL"),
+)
+
+def _document_schema(table, spec):
+    key_columns = ", ".join(f"{key} TEXT NOT NULL" for key in spec["keys"])
+    extra_columns = "".join(f", {column} INTEGER" for column in spec.get("columns", ()))
+    statements = [
+        f"CREATE TABLE IF NOT EXISTS {table} ({key_columns}{extra_columns}, data TEXT NOT NULL, "
+        f"PRIMARY KEY ({', '.join(spec['keys'])}))"
+    ]
+    for column in spec.get("columns", ()):
+        statements.append(f"CREATE INDEX IF NOT EXISTS idx_{table}_{column} ON {table} ({column})")
+    return statements
+
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# SQLite Storage
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+def _dumps(value):
+    return json.dumps(value, sort_keys=True)
+
+def _flatten(data, depth, prefix=()):
+    # Yields (key tuple, value); a tuple shorter than ``depth`` marks a value
+    # that has no row (an empty dict or a non-dict above the row level)
+    if depth == 0:
+        yield prefix, data
+        return
+    if not isinstance(data, dict) or not data:
+        yield prefix, data
+        return
+    for key, value in data.items():
+        yield from _flatten(value, depth - 1, prefix + (str(key),))
+
+class SQLiteStorage:
+    """Row-level persistence for every JSON store.
+
+    Saves only touch rows whose content changed since the last load or save,
+    so a single ticket update or a flush of a few dirty users becomes a
+    handful of upserts instead of a whole-file rewrite. Writes come from the
+    save worker threads, so the connection is shared behind a lock.
+    """
+
+    def __init__(self, path=STORAGE_DB):
+        self.path = path
+        self._conn = None
+        self._lock = threading.RLock()
+        self._row_cache = {}   # table -> {top-level key: {row key: payload}}
+        self._skipped = {}     # table -> keys last reported as having no row
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            for table, column, definition in COLUMN_MIGRATIONS:
+                existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+            for table, spec in DOCUMENT_STORES.items():
+                for statement in _document_schema(table, spec):
+                    conn.execute(statement)
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # ---------------------------------------------------------------------
+    # Generic entry points
+    # ---------------------------------------------------------------------
+    def load(self, store):
+        if store == "stats":
+            return self.load_stats()
+        if store == "xp_multiplier":
+            return self.load_multipliers()
+        return self.load_document(store)
+
+    def save(self, store, data, keys=None):
+        if store == "stats":
+            return self.save_stats(data, keys)
+        if store == "xp_multiplier":
+            return self.save_multipliers(data)
+        return self.save_document(store, data, keys)
+
+    # ---------------------------------------------------------------------
+    # Document stores
+    # ---------------------------------------------------------------------
+    def load_document(self, table):
+        keys = DOCUMENT_STORES[table]["keys"]
+        with self._lock:
+            rows = self.conn.execute(f"SELECT {', '.join(keys)}, data FROM {table}").fetchall()
+            cache = self._row_cache[table] = {}
+            for row in rows:
+                cache.setdefault(row[0], {})[tuple(row[:-1])] = row[-1]
+
+        data = {}
+        for row in rows:
+            key, payload = tuple(row[:-1]), row[-1]
+            node = data
+            for part in key[:-1]:
+                node = node.setdefault(part, {})
+            node[key[-1]] = json.loads(payload)
+        return data
+
+    def save_document(self, table, data, changed=None):
+        """Write ``data`` as rows of ``table``. With ``changed`` only the rows
+        under those top-level keys are dumped and compared."""
+        spec = DOCUMENT_STORES[table]
+        keys = spec["keys"]
+        columns = spec.get("columns", ())
+        with self._lock:
+            return self._save_document(table, keys, columns, data, changed)
+
+    def _save_document(self, table, keys, columns, data, changed=None):
+        cache = self._row_cache.setdefault(table, {})
+        if changed is None:
+            items = {str(top): value for top, value in data.items()}
+            tops = list(items) + [top for top in cache if top not in items]
+        else:
+            items = {str(top): data[top] for top in changed if top in data}
+            tops = [str(top) for top in changed]
+
+        upserts = []
+        deletes = []
+        skipped = []
+        written = {}
+        for top in tops:
+            cached = cache.get(top, {})
+            rows = {}
+            if top in items:
+                for key, value in _flatten(items[top], len(keys) - 1, (top,)):
+                    if len(key) == len(keys):
+                        rows[key] = _dumps(value)
+                        if cached.get(key) != rows[key]:
+                            extra = tuple(value.get(column) if isinstance(value, dict) else None for column in columns)
+                            upserts.append(key + extra + (rows[key],))
+                    else:
+                        skipped.append((key, value))
+            deletes.extend(key for key in cached if key not in rows)
+            written[top] = rows
+
+        if skipped:
+            self._report_skipped(table, len(keys), skipped, changed is None)
+
+        if upserts or deletes:
+            all_columns = keys + columns + ("data",)
+            placeholders = ", ".join("?" for _ in all_columns)
+            where = " AND ".join(f"{key} = ?" for key in keys)
+            with self.conn:
+                if upserts:
+                    self.conn.executemany(
+                        f"INSERT OR REPLACE INTO {table} ({', '.join(all_columns)}) VALUES ({placeholders})",
+                        upserts,
+                    )
+                if deletes:
+                    self.conn.executemany(f"DELETE FROM {table} WHERE {where}", deletes)
+
+        for top, rows in written.items():
+            if rows:
+                cache[top] = rows
+            else:
+                cache.pop(top, None)
+        return len(upserts), len(deletes)
+
+    def _report_skipped(self, table, depth, skipped, full):
+        # Logged once per key (until it changes), not on every save
+        reported = self._skipped.setdefault(table, set())
+        if full:
+            reported.intersection_update(key for key, _ in skipped)
+        for key, value in skipped:
+            if key in reported:
+                continue
+            reported.add(key)
+            path = "/".join(key) or "<root>"
+            if isinstance(value, dict):
+                LogDebug(f"[STORAGE] {table}: empty entry {path} has no rows and is not stored")
+            else:
+                LogError(
+                    f"[STORAGE] {table}: entry {path} is a {type(value).__name__}, expected "
+                    f"{depth - len(key)} more level(s) of keys; it is not stored"
+                )
+
+    # ---------------------------------------------------------------------
+    # Stats
+    # ---------------------------------------------------------------------
+    def load_stats(self):
+        with self._lock:
+            users = self.conn.execute("SELECT user_id, xp, level FROM user_xp").fetchall()
+            servers = self.conn.execute(
+                "SELECT user_id, guild_id, messages, media, voiceminutes, xp FROM user_server_stats"
+            ).fetchall()
+
+        stats = {str(user_id): {"xp": xp, "servers": {}, "level": level} for user_id, xp, level in users}
+        for user_id, guild_id, messages, media, voiceminutes, xp in servers:
+            user_stats = stats.setdefault(str(user_id), {"xp": 0.0, "servers": {}, "level": 0})
+            server_stats = user_stats["servers"][str(guild_id)] = {
+                "messages": messages,
+                "media": media,
+                "voiceminutes": voiceminutes,
+            }
+            # NULL for rows written before per-guild XP existed
+            if xp is not None:
+                server_stats["xp"] = xp
+        return stats
+
+    def load_stats_rows(self, build):
+        """Return ``build(users, servers)`` over cursors of ``(user_id, xp, level)``
+        and ``(user_id, guild_id, messages, media, voiceminutes, xp)`` rows,
+        both ordered by user_id, so the caller can stream them into its own
+        structure instead of the nested dict ``load_stats`` builds."""
+        with self._lock:
+            users = self.conn.execute("SELECT user_id, xp, level FROM user_xp ORDER BY user_id")
+            servers = self.conn.cursor().execute(
+                "SELECT user_id, guild_id, messages, media, voiceminutes, xp FROM user_server_stats "
+                "ORDER BY user_id"
+            )
+            return build(users, servers)
+
+    def save_stats(self, stats, keys=None):
+        """Upsert the given users (all users when ``keys`` is None)."""
+        user_ids = list(stats) if keys is None else list(keys)
+        user_rows = []
+        server_rows = []
+        removed = []
+        for user_id in user_ids:
+            user_stats = stats.get(user_id)
+            if user_stats is None:
+                removed.append((int(user_id),))
+                continue
+            xp = user_stats.get("xp", 0.0)
+            user_rows.append((int(user_id), xp, user_stats.get("level", int(xp // 20))))
+            for guild_id, server_stats in list(user_stats.get("servers", {}).items()):
+                server_rows.append((
+                    int(user_id),
+                    int(guild_id),
+                    server_stats.get("messages", 0),
+                    server_stats.get("media", 0),
+                    server_stats.get("voiceminutes", 0),
+                    server_stats.get("xp"),
+                ))
+
+        with self._lock:
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT INTO user_xp (user_id, xp, level) VALUES (?, ?, ?) "
+                    "ON CONFLICT(user_id) DO UPDATE SET xp = excluded.xp, level = excluded.level",
+                    user_rows,
+                )
+                self.conn.executemany(
+                    "INSERT INTO user_server_stats (user_id, guild_id, messages, media, voiceminutes, xp) "
+                    "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(user_id, guild_id) DO UPDATE SET "
+                    "messages = excluded.messages, media = excluded.media, voiceminutes = excluded.voiceminutes, "
+                    "xp = excluded.xp",
+                    server_rows,
+                )
+                if removed:
+                    self.conn.executemany("DELETE FROM user_xp WHERE user_id = ?", removed)
+                    self.conn.executemany("DELETE FROM user_server_stats WHERE user_id = ?", removed)
+        return len(user_rows), len(removed)
+
+    # ---------------------------------------------------------------------
+    # XP multipliers
+    # ---------------------------------------------------------------------
+    def load_multipliers(self):
+        with self._lock:
+            channels = self.conn.execute("SELECT channel_id FROM xp_boost_channels").fetchall()
+            multipliers = self.conn.execute("SELECT role_id, multiplier FROM xp_role_multipliers").fetchall()
+        return {
+            "channels": [channel_id for (channel_id,) in channels],
+            "multipliers": {role_id: multiplier for role_id, multiplier in multipliers},
+        }
+
+    def save_multipliers(self, config):
+        channels = [(str(channel_id),) for channel_id in config.get("channels", [])]
+        multipliers = [(str(role_id), float(mult)) for role_id, mult in config.get("multipliers", {}).items()]
+        with self._lock:
+            with self.conn:
+                self.conn.execute("DELETE FROM xp_boost_channels")
+                self.conn.execute("DELETE FROM xp_role_multipliers")
+                self.conn.executemany("INSERT INTO xp_boost_channels (channel_id) VALUES (?)", channels)
+                self.conn.executemany(
+                    "INSERT INTO xp_role_multipliers (role_id, multiplier) VALUES (?, ?)", multipliers
+                )
+        return len(channels) + len(multipliers), 0
+
+
+storage = SQLiteStorage() if STORAGE_TYPE == "sqlite" else None
+
+def migrate_json_stores(stores):
+    """Import ``{store name: data}`` read from the JSON files into SQLite."""
+    target = storage or SQLiteStorage()
+    results = {}
+    for store, data in stores.items():
+        target.load(store)  # prime the row cache so stale rows get removed
+        written, removed = target.save(store, data)
+        LogSystem(f"Migrated store '{store}' to SQLite: {written} row(s) written, {removed} removed")
+        results[store] = written
+    return results
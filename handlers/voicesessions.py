@@ -0,0 +1,130 @@
+import os
+import time
+from handlers.config import load_voice_sessions, save_voice_sessions
+from handlers.debug import LogDebug
+
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Voice Session Configuration
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Every VOICE_TICK_INTERVAL seconds the whole minutes of all open sessions are
+# credited in one batch. After a restart a member still in voice keeps their
+# session if it was last confirmed less than VOICE_RESUME_GRACE seconds ago.
+VOICE_TICK_INTERVAL = float(os.getenv("VOICE_TICK_INTERVAL", 60))
+VOICE_RESUME_GRACE = float(os.getenv("VOICE_RESUME_GRACE", 300))
+
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# Voice Sessions
+#=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+# {guild_id: {user_id: {"channel": id, "since": ts, "seen": ts}}}
+#   since - wall-clock time up to which the session has been credited
+#   seen  - last time the bot knew the member was still in voice
+# Only members who earn voice XP (not AFK, not self-deafened) have a session.
+class VoiceSessions:
+    """Open voice sessions, persisted so a restart does not lose them."""
+
+    def __init__(self):
+        self._sessions = None
+        self._dirty = False
+
+    @property
+    def sessions(self):
+        if self._sessions is None:
+            self._sessions = load_voice_sessions()
+        return self._sessions
+
+    def __len__(self):
+        return sum(len(members) for members in self.sessions.values())
+
+    def get(self, guild_id, user_id):
+        return self.sessions.get(str(guild_id), {}).get(str(user_id))
+
+    def start(self, guild_id, user_id, channel_id, now=None):
+        now = time.time() if now is None else now
+        self.sessions.setdefault(str(guild_id), {})[str(user_id)] = {
+            "channel": channel_id,
+            "since": now,
+            "seen": now,
+        }
+        self._dirty = True
+
+    def stop(self, guild_id, user_id, now=None):
+        """Close a session. Returns ``(channel_id, minutes)`` still to be
+        credited, or None if there was no session."""
+        now = time.time() if now is None else now
+        guild_id = str(guild_id)
+        members = self.sessions.get(guild_id, {})
+        session = members.pop(str(user_id), None)
+        if session is None:
+            return None
+        if not members:
+            del self.sessions[guild_id]
+        self._dirty = True
+        return session["channel"], int(max(0, now - session["since"]) // 60)
+
+    def accrue(self, now=None):
+        """Advance every session by its whole elapsed minutes.
+
+        Returns ``[(guild_id, user_id, channel_id, minutes), ...]`` for the
+        sessions that earned at least one minute; the remainder carries over.
+        """
+        now = time.time() if now is None else now
+        credits = []
+        for guild_id, members in self.sessions.items():
+            for user_id, session in members.items():
+                session["seen"] = now
+                minutes = int(max(0, now - session["since"]) // 60)
+                if minutes:
+                    session["since"] += minutes * 60
+                    credits.append((guild_id, user_id, session["channel"], minutes))
+        if self.sessions:
+            self._dirty = True
+        return credits
+
+    def restore(self, present, now=None, grace=VOICE_RESUME_GRACE):
+        """Reconcile stored sessions with the members in voice right now.
+
+        ``present`` maps ``(guild_id, user_id)`` to a channel id for every
+        member currently earning voice XP. Stored sessions that are gone or
+        went stale (last seen more than ``grace`` seconds ago) are closed at
+        their ``seen`` time, the bot cannot tell what happened after that.
+        Returns ``[(guild_id, user_id, channel_id, minutes), ...]`` to credit.
+        """
+        now = time.time() if now is None else now
+        present = {(str(guild_id), str(user_id)): channel_id for (guild_id, user_id), channel_id in present.items()}
+        credits = []
+        resumed = 0
+
+        for guild_id, members in list(self.sessions.items()):
+            for user_id, session in list(members.items()):
+                key = (guild_id, user_id)
+                if key in present and now - session["seen"] <= grace:
+                    session["channel"] = present.pop(key)
+                    resumed += 1
+                    continue
+                minutes = int(max(0, session["seen"] - session["since"]) // 60)
+                if minutes:
+                    credits.append((guild_id, user_id, session["channel"], minutes))
+                del members[user_id]
+            if not members:
+                del self.sessions[guild_id]
+
+        for (guild_id, user_id), channel_id in present.items():
+            self.start(guild_id, user_id, channel_id, now)
+
+        self._dirty = True
+        LogDebug(f"[VOICE] Restored sessions: {resumed} resumed, {len(present)} started, {len(credits)} closed")
+        return credits
+
+    def save(self, force=False):
+        if self._sessions is None or not (self._dirty or force):
+            return False
+        self._dirty = False
+        try:
+            save_voice_sessions(self._sessions)
+        except Exception:
+            self._dirty = True
+            raise
+        return True
+
+
+voice_sessions = VoiceSessions()
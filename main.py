@@ -12,7 +12,9 @@ from dotenv import load_dotenv
 
 # Local imports
 from handlers.debug import LogError, LogSystem
-from handlers.config import get_config_files, get_data_files
+from handlers.config import get_config_files, get_data_files, migrate_json_to_sqlite
+from handlers.database import init_database
+from handlers.instrumentation import instrument_bot
 
 #=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
 # Initialization
@@ -28,6 +30,7 @@ TOKEN = os.getenv('TOKEN')
 currenttime = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 intents = discord.Intents.all()
 bot = discord.Bot(intents=intents)
+instrument_bot(bot)
 
 #=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
 # Core Functions
@@ -45,9 +48,13 @@ def handle_installation():
         if sys.argv[1].lower() == "install":
             install_for_first_use()
             sys.exit(0)
+        elif sys.argv[1].lower() == "migrate-sqlite":
+            migrate_to_sqlite()
+            sys.exit(0)
         else:
             print(Fore.RED + "Invalid command. Available commands:")
             print(Fore.YELLOW + "python main.py install" + Fore.WHITE + " - Setup required files")
+            print(Fore.YELLOW + "python main.py migrate-sqlite" + Fore.WHITE + " - Import JSON files into SQLite")
             sys.exit(1)
 
 def install_for_first_use():
@@ -86,6 +93,26 @@ def install_for_first_use():
     print(Fore.YELLOW + Style.BRIGHT + "Setup completed successfully!")
     print(Fore.GREEN + Style.BRIGHT + "-"*65)
 
+def migrate_to_sqlite():
+    """One-shot import of every JSON store into the SQLite backend"""
+    print(Fore.GREEN + Style.BRIGHT + "-"*65)
+    print(Fore.YELLOW + Style.BRIGHT + "JSON -> SQLite Migration")
+    print(Fore.GREEN + Style.BRIGHT + "-"*65)
+
+    try:
+        results = migrate_json_to_sqlite()
+    except Exception as e:
+        LogError(f"SQLite migration failed: {str(e)}")
+        print(Fore.RED + f"[ERROR] {str(e)}")
+        sys.exit(1)
+
+    for file_path, rows in results.items():
+        print(Fore.CYAN + f"Imported: {file_path}" + Fore.BLUE + f" [{rows} rows]")
+
+    print(Fore.GREEN + Style.BRIGHT + "-"*65)
+    print(Fore.YELLOW + Style.BRIGHT + "Migration completed! Set STORAGE_TYPE=sqlite to use it.")
+    print(Fore.GREEN + Style.BRIGHT + "-"*65)
+
 #=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
 # System Checks
 #=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
@@ -186,6 +213,7 @@ def main():
     
     clear_screen()
     delete_traceback_files()
+    init_database()
     
     # Startup display
     print(Fore.GREEN + Style.BRIGHT + "\n" + "="*45)
@@ -0,0 +1,68 @@
+import random
+
+from handlers.activity import ActivitySeries, ActivityStore, DAY, HOUR, PERIODS
+
+START = 1_700_000_000 - 1_700_000_000 % DAY
+
+
+def reference_page(store, period, guild_id, metric, now):
+    """Every ranked user, sorted the slow way."""
+    user_ids = store.guilds.get(guild_id, {}) if guild_id is not None else store._users
+    entries = [(user_id, store.totals(user_id, period, guild_id, now)) for user_id in user_ids]
+    entries = [entry for entry in entries if entry[1][metric] > 0]
+    entries.sort(key=lambda entry: (-entry[1][metric], int(entry[0])))
+    return entries
+
+
+def test_series_windows_roll_off():
+    series = ActivitySeries(START // HOUR, START // DAY)
+    series.record(START, messages=2, xp=1.0)
+    series.record(START + 2 * HOUR, messages=1, xp=0.5)
+    assert series.window("24h", START + 2 * HOUR) == [3.0, 0.0, 1.5]
+    assert series.window("24h", START + 25 * HOUR) == [1.0, 0.0, 0.5]
+    assert series.window("7d", START + 3 * DAY) == [3.0, 0.0, 1.5]
+    assert series.window("7d", START + 8 * DAY) == [0.0, 0.0, 0.0]
+    assert series.window("30d", START + 8 * DAY) == [3.0, 0.0, 1.5]
+    assert not series.expired(START + 29 * DAY)
+    assert series.expired(START + 30 * DAY)
+
+
+def test_series_json_round_trip():
+    series = ActivitySeries(START // HOUR, START // DAY)
+    series.record(START, messages=1, voiceminutes=5, xp=2.25)
+    copy = ActivitySeries.from_json(series.to_json())
+    assert copy.window("30d", START) == series.window("30d", START)
+
+
+def test_rankings_match_sorted_reference(monkeypatch):
+    monkeypatch.setattr("handlers.activity.load_activity", dict)
+    store = ActivityStore()
+    rng = random.Random(5)
+    now = START
+    for step in range(3_000):
+        now += rng.randrange(0, 600)
+        user_id = str(rng.randrange(1, 60))
+        guild_id = str(rng.randrange(100, 103))
+        store.record(user_id, guild_id, messages=1, voiceminutes=rng.randrange(3), xp=rng.random(), now=now)
+        if step % 97 == 0:
+            for period in PERIODS:
+                for guild_id in (None, "100", "101"):
+                    for metric in ("messages", "xp"):
+                        expected = reference_page(store, period, guild_id, metric, now)
+                        total, page = store.top(period, count=5, offset=2, guild_id=guild_id, metric=metric, now=now)
+                        assert total == len(expected)
+                        assert [user_id for user_id, _ in page] == [user_id for user_id, _ in expected[2:7]]
+                        for rank, (user_id, _) in enumerate(expected, 1):
+                            assert store.rank_of(user_id, period, guild_id, metric, now) == rank
+                        assert store.rank_of("999", period, guild_id, metric, now) is None
+
+
+def test_prune_drops_expired_series(monkeypatch):
+    monkeypatch.setattr("handlers.activity.load_activity", dict)
+    store = ActivityStore()
+    store.record(1, 10, messages=1, xp=1.0, now=START)
+    store.record(2, 10, messages=1, xp=1.0, now=START + 20 * DAY)
+    assert store.top("30d", now=START + 20 * DAY)[0] == 2
+    assert store.prune(now=START + 31 * DAY) == 1
+    assert store.top("30d", now=START + 31 * DAY) == (1, [("2", store.totals(2, "30d", now=START + 31 * DAY))])
+    assert "1" not in store._users
@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from handlers import config
+from handlers.config import journal_path, load_data, save_data
+
+
+@pytest.fixture
+def stats_file(tmp_path, monkeypatch):
+    filename = str(tmp_path / "stats.json")
+    monkeypatch.setattr(config, "JOURNALED_FILES", {filename})
+    monkeypatch.setattr(config, "JOURNAL_ENABLED", True)
+    return filename
+
+
+def journal_entries(filename):
+    with open(journal_path(filename), "rb") as f:
+        return f.read().count(b"\n") - 1
+
+
+def test_keyed_saves_append_and_replay(stats_file):
+    data = {"1": {"xp": 1.0}, "2": {"xp": 2.0}}
+    save_data(stats_file, data)
+    data["1"]["xp"] = 5.0
+    save_data(stats_file, data, keys={"1"})
+    del data["2"]
+    save_data(stats_file, data, keys={"2"})
+
+    assert journal_entries(stats_file) == 2
+    with open(stats_file) as f:
+        assert json.load(f) == {"1": {"xp": 1.0}, "2": {"xp": 2.0}}
+    assert load_data(stats_file, default=dict) == {"1": {"xp": 5.0}}
+
+
+def test_replay_after_compaction(stats_file, monkeypatch):
+    monkeypatch.setattr(config, "JOURNAL_MAX_LINES", 5)
+    data = {}
+    for i in range(23):
+        data[str(i % 7)] = {"xp": float(i)}
+        save_data(stats_file, data, keys={str(i % 7)})
+        # The save that fills the journal compacts it right away
+        assert journal_entries(stats_file) < 5
+    assert load_data(stats_file, default=dict) == data
+
+
+def test_compaction_by_size(stats_file, monkeypatch):
+    monkeypatch.setattr(config, "JOURNAL_MAX_BYTES", 200)
+    data = {}
+    for i in range(20):
+        data[str(i)] = {"xp": float(i), "note": "x" * 40}
+        save_data(stats_file, data, keys={str(i)})
+    assert config.journal_size(stats_file) < 200
+    assert load_data(stats_file, default=dict) == data
+
+
+def test_torn_entry_is_truncated(stats_file):
+    data = {"1": 1}
+    save_data(stats_file, data)
+    data["2"] = 2
+    save_data(stats_file, data, keys={"2"})
+    with open(journal_path(stats_file), "ab") as f:
+        f.write(b'{"k": "3", "v"')
+
+    assert load_data(stats_file, default=dict) == {"1": 1, "2": 2}
+    # Later appends land after the last complete entry
+    data["4"] = 4
+    save_data(stats_file, data, keys={"4"})
+    assert load_data(stats_file, default=dict) == {"1": 1, "2": 2, "4": 4}
+
+
+def test_stale_journal_is_discarded(stats_file):
+    data = {"1": 1}
+    save_data(stats_file, data)
+    save_data(stats_file, {"1": 2}, keys={"1"})
+    # A snapshot written without resetting the journal (crash in between)
+    config.write_atomic(stats_file, {"1": 3})
+    assert load_data(stats_file, default=dict) == {"1": 3}
+    assert journal_entries(stats_file) == 0
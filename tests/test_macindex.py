@@ -0,0 +1,65 @@
+from handlers.macindex import MacBanIndex
+
+
+def loaded_index():
+    index = MacBanIndex()
+    bans = {"1": {"id": "1", "reason": "spam"}, "bad": {"id": "bad"}}
+    bypasses = {"1": ["10", "x"], "2": []}
+    assert index.load(lambda: bans, lambda: bypasses)
+    return index
+
+
+def test_load_skips_invalid_ids():
+    index = loaded_index()
+    assert index.loaded
+    assert len(index) == 1
+    assert index.get_ban(1) == {"id": "1", "reason": "spam"}
+    assert index.is_banned(2) is False
+    assert index.has_bypass(1, 10)
+    assert not index.has_bypass(2, 10)
+    assert index.bans() == {"1": {"id": "1", "reason": "spam"}}
+    stats = index.stats()
+    assert (stats["lookups"], stats["hits"], stats["bypass_checks"], stats["bypass_hits"]) == (2, 1, 2, 1)
+
+
+def test_mutations_keep_the_index_current():
+    index = loaded_index()
+    index.put_bans([{"id": 5}, {"id": "nope"}])
+    assert index.is_banned(5)
+    index.drop_ban("1")
+    assert not index.is_banned(1)
+    index.add_bypasses([(5, 20), (5, 21)])
+    index.drop_bypass("5", "20")
+    assert not index.has_bypass(5, 20) and index.has_bypass(5, 21)
+    index.drop_bypass(5, 21)
+    assert index.stats()["bypass_users"] == 1
+    index.replace_bans({"7": {"id": "7"}})
+    assert len(index) == 1 and index.is_banned(7)
+
+
+def test_load_retries_when_a_mutation_races_it():
+    index = MacBanIndex()
+    calls = []
+
+    def load_bans():
+        calls.append(1)
+        if len(calls) == 1:
+            # A ban lands while the first snapshot is being read
+            index.put_bans([{"id": 9}])
+            return {}
+        return {"9": {"id": 9}}
+
+    assert index.load(load_bans, dict)
+    assert len(calls) == 2
+    assert index.is_banned(9)
+
+
+def test_load_gives_up_when_never_stable():
+    index = MacBanIndex()
+
+    def load_bans():
+        index.invalidate()
+        return {}
+
+    assert not index.load(load_bans, dict, retries=2)
+    assert not index.loaded
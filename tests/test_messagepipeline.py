@@ -0,0 +1,105 @@
+import asyncio
+from types import SimpleNamespace
+
+import discord
+import pytest
+
+from handlers import messagepipeline
+from handlers.messagepipeline import (
+    AUTHOR_BOT, CHANNEL_ONLYIMAGES, DM, FEATURE_PROTECTION, GUILD, MessagePipeline, message_pipeline,
+)
+
+
+@pytest.fixture(autouse=True)
+def guild_config(monkeypatch):
+    monkeypatch.setattr(messagepipeline, "get_guild_config", lambda guild_id: {"protection": guild_id == 1})
+    monkeypatch.setattr(messagepipeline, "load_onlyimages", lambda: {"55": True})
+
+
+def make_bot():
+    listeners = []
+    return SimpleNamespace(user=SimpleNamespace(id=999), add_listener=lambda fn, name: listeners.append((name, fn)), listeners=listeners)
+
+
+def make_message(guild_id=1, channel_id=5, bot=False):
+    return SimpleNamespace(
+        guild=SimpleNamespace(id=guild_id) if guild_id else None,
+        author=SimpleNamespace(id=42, bot=bot),
+        channel=SimpleNamespace(id=channel_id),
+        webhook_id=None,
+        type=discord.MessageType.default,
+    )
+
+
+def test_context_flags():
+    bot = make_bot()
+    ctx = messagepipeline.MessageContext(bot, make_message(guild_id=1, channel_id=55, bot=True))
+    assert ctx.flags == GUILD | FEATURE_PROTECTION | CHANNEL_ONLYIMAGES | AUTHOR_BOT
+    ctx = messagepipeline.MessageContext(bot, make_message(guild_id=2))
+    assert ctx.flags == GUILD
+    assert not ctx.flags & DM
+
+
+def test_stages_are_filtered_and_ordered():
+    pipeline = MessagePipeline(make_bot())
+    calls = []
+
+    def stage(name):
+        async def handler(ctx):
+            calls.append(name)
+        handler.__qualname__ = name
+        return handler
+
+    pipeline.register(stage("late"), require=GUILD, priority=90)
+    pipeline.register(stage("protection"), require=FEATURE_PROTECTION, priority=10)
+    pipeline.register(stage("humans"), exclude=AUTHOR_BOT)
+    pipeline.register(stage("predicate"), predicate=lambda ctx: ctx.guild_id == 2)
+
+    asyncio.run(pipeline.dispatch(make_message(guild_id=1)))
+    assert calls == ["protection", "humans", "late"]
+    calls.clear()
+    asyncio.run(pipeline.dispatch(make_message(guild_id=2, bot=True)))
+    assert calls == ["predicate", "late"]
+    assert len(pipeline._routes) == 2
+
+
+def test_stages_run_concurrently_and_failures_are_isolated():
+    pipeline = MessagePipeline(make_bot())
+    events = []
+
+    async def slow(ctx):
+        events.append("slow start")
+        await asyncio.sleep(0.05)
+        events.append("slow end")
+
+    async def fast(ctx):
+        events.append("fast")
+
+    async def broken(ctx):
+        raise RuntimeError("boom")
+
+    pipeline.register(slow, priority=1)
+    pipeline.register(broken, priority=2)
+    pipeline.register(fast, priority=3)
+    asyncio.run(pipeline.dispatch(make_message()))
+    assert events == ["slow start", "fast", "slow end"]
+
+
+def test_register_replaces_and_unregister_removes():
+    pipeline = MessagePipeline(make_bot())
+
+    async def handler(ctx):
+        pass
+
+    pipeline.register(handler, priority=5)
+    pipeline.register(handler, priority=1)
+    assert [stage.priority for stage in pipeline.stages] == [1]
+    pipeline.unregister(handler)
+    assert pipeline.stages == []
+    asyncio.run(pipeline.dispatch(make_message()))
+
+
+def test_one_pipeline_per_bot():
+    bot = make_bot()
+    assert message_pipeline(bot) is message_pipeline(bot)
+    assert [name for name, _ in bot.listeners] == ["on_message"]
@@ -0,0 +1,46 @@
+from handlers.metrics import Histogram, get_histograms, histogram
+
+
+def test_histogram_buckets_and_percentiles():
+    hist = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.05, 0.5, 3.0):
+        hist.observe(value)
+    assert hist.counts == [2, 1, 1]
+    assert hist.count == 4 and hist.max == 3.0
+    assert hist.mean == 3.6 / 4
+    assert hist.percentile(0.5) == 0.1
+    assert hist.percentile(0.75) == 1.0
+    # Above the last bucket the largest observation is the best bound
+    assert hist.percentile(1.0) == 3.0
+    hist.reset()
+    assert hist.percentile(0.5) == 0.0 and hist.mean == 0.0
+
+
+def test_histograms_are_registered_once():
+    first = histogram("test_metrics_latency", "a")
+    assert histogram("test_metrics_latency", "a") is first
+    histogram("test_metrics_latency", "b")
+    assert set(get_histograms("test_metrics_latency")) == {"a", "b"}
+
+
+def test_prometheus_exposition():
+    from handlers.metrics import collect, describe, format_prometheus, increment, register_gauge
+
+    describe("test_metrics_events_total", 'Events "seen"', "kind")
+    increment("test_metrics_events_total", "a", 2)
+    register_gauge("test_metrics_depth", lambda: {"x": 3}, "Queue depth", "queue")
+    register_gauge("test_metrics_idle", lambda: {}, "Nothing to report")
+    hist = histogram("test_metrics_wait")
+    hist.observe(0.00002)
+
+    families = [family for family in collect() if family[0].startswith("test_metrics_")]
+    text = format_prometheus(families)
+    assert '# HELP maggibot_test_metrics_events_total Events \\"seen\\"' in text
+    assert "# TYPE maggibot_test_metrics_events_total counter" in text
+    assert 'maggibot_test_metrics_events_total{kind="a"} 2' in text
+    assert 'maggibot_test_metrics_depth{queue="x"} 3' in text
+    # A gauge with no samples only gets its header lines
+    assert not [line for line in text.splitlines() if line.startswith("maggibot_test_metrics_idle")]
+    assert 'maggibot_test_metrics_wait_bucket{le="2.5e-05"} 1' in text
+    assert 'maggibot_test_metrics_wait_bucket{le="+Inf"} 1' in text
+    assert "maggibot_test_metrics_wait_count 1" in text
@@ -0,0 +1,89 @@
+import asyncio
+import json
+import os
+import stat
+
+import pytest
+
+from handlers import config
+from handlers.config import CachedJSONStore, flush_pending_saves, load_data, save_data, wait_for_save, write_atomic
+
+
+def read(filename):
+    with open(filename) as f:
+        return json.load(f)
+
+
+def test_write_atomic_keeps_the_file_mode(tmp_path):
+    filename = str(tmp_path / "store.json")
+    write_atomic(filename, {"a": 1})
+    os.chmod(filename, 0o640)
+    write_atomic(filename, {"a": 2})
+    assert read(filename) == {"a": 2}
+    assert stat.S_IMODE(os.stat(filename).st_mode) == 0o640
+    assert os.listdir(tmp_path) == ["store.json"]
+
+
+def test_saves_outside_the_loop_are_synchronous(tmp_path):
+    filename = str(tmp_path / "sub" / "store.json")
+    assert save_data(filename, {"a": 1}, mkdir=True) is True
+    assert load_data(filename, default=dict) == {"a": 1}
+    with pytest.raises(OSError):
+        save_data(str(tmp_path / "missing" / "store.json"), {})
+
+
+def test_saves_in_the_loop_are_coalesced(tmp_path, monkeypatch):
+    filename = str(tmp_path / "store.json")
+    writes = []
+    write_store = config._write_store
+
+    def counting_write(*args):
+        writes.append(args[1]["n"])
+        write_store(*args)
+
+    monkeypatch.setattr(config, "_write_store", counting_write)
+
+    async def scenario():
+        futures = [save_data(filename, {"n": n}) for n in range(10)]
+        await wait_for_save(filename)
+        assert all(future.done() for future in futures)
+        # A save arriving while one is in flight is queued behind it
+        save_data(filename, {"n": 10})
+        await asyncio.sleep(0)
+        for n in range(11, 15):
+            save_data(filename, {"n": n})
+        await flush_pending_saves()
+
+    asyncio.run(scenario())
+    assert read(filename) == {"n": 14}
+    # Only the newest snapshot of each queued run is written
+    assert writes == [9, 10, 14]
+
+
+def test_save_errors_reach_the_awaiting_caller(tmp_path):
+    filename = str(tmp_path / "missing" / "store.json")
+
+    async def scenario():
+        future = save_data(filename, {"a": 1})
+        with pytest.raises(OSError):
+            await future
+        await flush_pending_saves()
+
+    asyncio.run(scenario())
+
+
+def test_cached_store_shares_data_and_sees_outside_edits(tmp_path):
+    filename = str(tmp_path / "store.json")
+    store = CachedJSONStore(filename, check_interval=0)
+    data = store.get()
+    assert data == {}
+    data["a"] = 1
+    store.save(data)
+    assert store.get() is data
+    assert read(filename) == {"a": 1}
+
+    # Another process rewrites the file
+    with open(filename, "w") as f:
+        json.dump({"b": 2}, f)
+    os.utime(filename, ns=(0, 0))
+    assert store.get() == {"b": 2}
@@ -0,0 +1,84 @@
+import random
+
+import pytest
+
+from handlers import ranking
+from handlers.ranking import RankIndex, SortedKeys, decode, encode
+
+
+@pytest.fixture(autouse=True)
+def small_buckets(monkeypatch):
+    # Tiny buckets so splits and emptied buckets happen constantly
+    monkeypatch.setattr(ranking, "BUCKET_SIZE", 4)
+
+
+def reference_order(scores):
+    """``[(user_id, xp), ...]`` best first, ties to the lower id."""
+    return sorted(scores.items(), key=lambda entry: (-round(entry[1] * ranking.XP_SCALE), entry[0]))
+
+
+def ids(entries):
+    return [user_id for user_id, _ in entries]
+
+
+def test_encode_round_trip():
+    assert decode(encode(123456789012345678, 42.5)) == (123456789012345678, 42.5)
+    assert encode(1, 2.0) > encode(2, 1.0)
+
+
+def test_sorted_keys_positions():
+    rng = random.Random(2)
+    keys = SortedKeys(rng.sample(range(1000), 50))
+    reference = sorted(keys.iter_descending())[::-1]
+    for _ in range(500):
+        key = rng.randrange(1000)
+        if rng.random() < 0.5:
+            keys.add(key)
+            reference.append(key)
+        elif key in reference:
+            assert keys.discard(key)
+            reference.remove(key)
+        else:
+            assert not keys.discard(key)
+        reference.sort(reverse=True)
+        assert len(keys) == len(reference)
+    assert list(keys.iter_descending()) == reference
+    assert list(keys.iter_descending(7)) == reference[7:]
+    for key in range(0, 1000, 37):
+        assert keys.index(key) == sum(1 for k in reference if k < key)
+        assert keys.count_above(key) == sum(1 for k in reference if k > key)
+
+
+def test_rank_and_top_match_sorted_reference():
+    rng = random.Random(4)
+    scores = {user_id: float(rng.randrange(50)) for user_id in rng.sample(range(1, 10_000), 60)}
+    index = RankIndex(scores.items())
+
+    for step in range(2_000):
+        user_id = rng.choice(list(scores)) if rng.random() < 0.8 else rng.randrange(1, 10_000)
+        if user_id in scores:
+            if rng.random() < 0.1:
+                index.remove(user_id, scores.pop(user_id))
+            else:
+                new = scores[user_id] + rng.choice((0.5, 1.0, 2.25))
+                index.update(user_id, scores[user_id], new)
+                scores[user_id] = new
+        else:
+            scores[user_id] = rng.random() * 10
+            index.insert(user_id, scores[user_id])
+
+        if step % 100 == 0:
+            expected = reference_order(scores)
+            assert len(index) == len(expected)
+            assert ids(index.top(10)) == ids(expected[:10])
+            assert ids(index.top(10, offset=25)) == ids(expected[25:35])
+            assert [xp for _, xp in index.top(10)] == pytest.approx([xp for _, xp in expected[:10]], abs=1e-6)
+            for rank, (user_id, xp) in enumerate(expected, 1):
+                assert index.rank(user_id, xp) == rank
+
+
+def test_ties_go_to_lower_id():
+    index = RankIndex([(5, 10.0), (3, 10.0), (9, 10.0), (1, 2.0)])
+    assert ids(index.top(4)) == [3, 5, 9, 1]
+    assert index.rank(9, 10.0) == 3
+    assert index.top(5, offset=4) == []
@@ -0,0 +1,124 @@
+import asyncio
+import time
+
+import discord
+
+from handlers.sendqueue import MAX_EMBED_CHARS_PER_MESSAGE, MAX_EMBEDS_PER_MESSAGE, SendQueue
+
+SUMMARY_TITLE = "⚠️ Log Entries Dropped"
+
+
+class FakeChannel:
+    def __init__(self, channel_id=1):
+        self.id = channel_id
+        self.sends = []
+
+    async def send(self, embeds):
+        self.sends.append((time.monotonic(), list(embeds)))
+
+
+def embed(title="entry", size=10):
+    return discord.Embed(title=title, description="x" * size)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_batches_respect_embed_limits():
+    async def scenario():
+        queue = SendQueue(max_depth=100, burst=100, window=1)
+        channel = FakeChannel()
+        for i in range(25):
+            queue.enqueue(channel, embed(size=10))
+        for i in range(6):
+            queue.enqueue(channel, embed(size=2500))
+        await queue.drain(timeout=2)
+        return channel
+
+    channel = run(scenario())
+    batches = [embeds for _, embeds in channel.sends]
+    assert sum(len(embeds) for embeds in batches) == 31
+    for embeds in batches:
+        assert len(embeds) <= MAX_EMBEDS_PER_MESSAGE
+        assert sum(len(e) for e in embeds) <= MAX_EMBED_CHARS_PER_MESSAGE
+    assert [len(embeds) for embeds in batches] == [10, 10, 7, 2, 2]
+
+
+def test_dropped_entries_are_summarised_within_limits():
+    async def scenario():
+        queue = SendQueue(max_depth=12, burst=100, window=1)
+        channel = FakeChannel()
+        results = [queue.enqueue(channel, embed(title=f"t{i % 2}", size=550)) for i in range(20)]
+        await queue.drain(timeout=2)
+        return results, channel
+
+    results, channel = run(scenario())
+    assert results.count(False) == 8
+    sent = [e for _, embeds in channel.sends for e in embeds]
+    assert len(sent) == 13
+    summaries = [e for e in sent if e.title == SUMMARY_TITLE]
+    assert len(summaries) == 1
+    assert "8 log entries" in summaries[0].description
+    for _, embeds in channel.sends:
+        assert len(embeds) <= MAX_EMBEDS_PER_MESSAGE
+        assert sum(len(e) for e in embeds) <= MAX_EMBED_CHARS_PER_MESSAGE
+
+
+def test_rate_limit_and_idle_cleanup():
+    async def scenario():
+        queue = SendQueue(max_depth=100, burst=2, window=0.3)
+        channel = FakeChannel()
+        for i in range(5):
+            # Too large to share a message: one send each
+            queue.enqueue(channel, embed(size=5000))
+        await asyncio.sleep(0.1)
+        assert queue.active() == 1
+        await asyncio.sleep(0.6)
+        times = [sent_at for sent_at, _ in channel.sends]
+        assert len(times) == 5
+        assert all(times[i + 2] - times[i] >= 0.29 for i in range(len(times) - 2))
+        # Still inside the rate window: the channel is remembered
+        assert channel.id in queue._destinations
+        await asyncio.sleep(0.3)
+        assert queue._destinations == {}
+        assert queue.active() == 0
+
+    run(scenario())
+
+
+def test_linger_batches_entries():
+    async def scenario():
+        queue = SendQueue(max_depth=100, burst=5, window=1)
+        channel = FakeChannel()
+        queue.enqueue(channel, embed(), linger=0.2)
+        await asyncio.sleep(0.05)
+        queue.enqueue(channel, embed(), linger=0.2)
+        await asyncio.sleep(0.05)
+        assert channel.sends == []
+        # An entry without linger takes the lingering ones along
+        queue.enqueue(channel, embed())
+        await asyncio.sleep(0.05)
+        assert [len(embeds) for _, embeds in channel.sends] == [3]
+
+    run(scenario())
+
+
+def test_drain_skips_linger_and_reopens():
+    async def scenario():
+        queue = SendQueue(max_depth=100, burst=5, window=0.1)
+        channel = FakeChannel()
+        queue.enqueue(channel, embed(), linger=60)
+        start = time.monotonic()
+        assert await queue.drain(timeout=1) == 0
+        assert time.monotonic() - start < 0.5
+        assert len(channel.sends) == 1
+        assert not queue.closing
+        # Linger applies again after the drain
+        queue.enqueue(channel, embed(), linger=0.2)
+        await asyncio.sleep(0.05)
+        assert len(channel.sends) == 1
+        await asyncio.sleep(0.3)
+        assert len(channel.sends) == 2
+
+    run(scenario())
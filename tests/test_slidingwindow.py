@@ -0,0 +1,50 @@
+from handlers.slidingwindow import SlidingWindowCounter
+
+
+def test_counts_expire_after_the_window():
+    counter = SlidingWindowCounter(window=10, max_events=100)
+    assert counter.hit("a", now=0) == 1
+    assert counter.hit("a", now=5) == 2
+    assert counter.count("a", now=9.9) == 2
+    assert counter.count("a", now=10) == 1
+    assert counter.hit("a", now=14) == 2
+    assert counter.count("a", now=30) == 0
+    assert counter.count("missing", now=0) == 0
+
+
+def test_counts_are_capped_at_max_events():
+    counter = SlidingWindowCounter(window=10, max_events=3)
+    for i in range(10):
+        count = counter.hit("a", now=i * 0.1)
+    assert count == 3
+    assert counter.count("a", now=1) == 3
+
+
+def test_idle_keys_are_dropped():
+    counter = SlidingWindowCounter(window=10, max_events=5)
+    counter.hit("old", now=0)
+    counter.hit("recent", now=8)
+    counter.hit("new", now=12)
+    assert len(counter) == 2
+    assert counter.count("old", now=12) == 0
+    assert counter.count("recent", now=12) == 1
+
+
+def test_least_recently_used_key_is_evicted():
+    counter = SlidingWindowCounter(window=100, max_events=5, max_keys=3)
+    for key in ("a", "b", "c"):
+        counter.hit(key, now=1)
+    # Touching "a" makes "b" the least recently used
+    counter.hit("a", now=2)
+    counter.hit("d", now=3)
+    assert len(counter) == 3
+    assert counter.count("b", now=3) == 0
+    assert counter.count("a", now=3) == 2
+
+
+def test_reset():
+    counter = SlidingWindowCounter(window=10, max_events=5)
+    counter.hit("a", now=0)
+    counter.reset("a")
+    counter.reset("missing")
+    assert counter.hit("a", now=1) == 1
@@ -0,0 +1,85 @@
+import random
+
+import pytest
+
+from handlers import stats as stats_module
+from handlers.stats import StatsService
+
+
+@pytest.fixture
+def saves(monkeypatch):
+    saved = []
+    monkeypatch.setattr(stats_module, "load_stats", dict)
+    monkeypatch.setattr(stats_module, "save_stats", lambda stats, user_ids=None: saved.append(user_ids))
+    return saved
+
+
+def test_ensure_user_and_server(saves):
+    service = StatsService(flush_interval=30, flush_threshold=100)
+    service._stats = {"1": {"xp": 45.0, "servers": {}}}
+    user_stats = service.ensure_user(1)
+    assert user_stats["level"] == 2
+    server_stats = service.ensure_server(user_stats, 10)
+    server_stats["messages"] += 1
+    assert service.ensure_server(user_stats, "10")["messages"] == 1
+    assert service.ensure_user(2)["xp"] == 0.0
+    assert service.get_user(3) is None
+
+
+def test_flush_is_write_behind(saves):
+    service = StatsService(flush_interval=30, flush_threshold=3)
+    service._stats = {}
+    for user_id in (1, 2, 2):
+        service.ensure_user(user_id)
+        service.mark_dirty(user_id)
+    assert saves == [] and service.dirty_count == 2
+    assert not service.flush_due()
+
+    service.mark_dirty(3)
+    assert len(saves) == 1 and service.dirty_count == 0
+    assert service.flush_count == 1
+    assert not service.flush()
+
+
+def test_failed_flush_keeps_users_dirty(monkeypatch):
+    def failing_save(stats, user_ids=None):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(stats_module, "save_stats", failing_save)
+    service = StatsService(flush_interval=0, flush_threshold=100)
+    service._stats = {}
+    service.ensure_user(1)
+    service.mark_dirty(1)
+    assert service.flush_due()
+    with pytest.raises(OSError):
+        service.flush()
+    assert service.dirty_count == 1
+
+
+@pytest.mark.parametrize("table", ["dict", "columnar"])
+def test_rankings_follow_xp_changes(saves, table):
+    rng = random.Random(11)
+    service = StatsService(flush_interval=30, flush_threshold=10_000, table=table)
+    # Build the indexes first so the updates below go through them
+    assert service.top(5) == []
+    assert service.guild_top(100) == []
+
+    for _ in range(1_500):
+        user_id, guild_id = rng.randrange(1, 80), rng.choice((100, 200))
+        user_stats = service.ensure_user(user_id)
+        server_stats = service.ensure_server(user_stats, guild_id, user_id)
+        service.add_xp(user_id, user_stats, rng.choice((0.5, 1.0, 3.0)), server_stats, guild_id)
+
+    stats = service.stats
+    expected = sorted(stats, key=lambda user_id: (-stats[user_id]["xp"], int(user_id)))
+    assert [user_id for user_id, _ in service.top(10, offset=3)] == expected[3:13]
+    for rank, user_id in enumerate(expected, 1):
+        assert service.rank_of(user_id) == rank
+
+    members = [user_id for user_id in stats if "200" in stats[user_id]["servers"]]
+    guild_xp = {user_id: stats[user_id]["servers"]["200"]["xp"] for user_id in members}
+    expected = sorted(members, key=lambda user_id: (-guild_xp[user_id], int(user_id)))
+    assert [user_id for user_id, _ in service.guild_top(200, 10)] == expected[:10]
+    for rank, user_id in enumerate(expected, 1):
+        assert service.guild_rank_of(user_id, 200) == rank
+    assert service.guild_rank_of(999, 200) is None
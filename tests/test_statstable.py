@@ -0,0 +1,181 @@
+import random
+
+import pytest
+
+from handlers.statstable import StatsTable
+from handlers.storage import SQLiteStorage
+from handlers.stats import StatsService, _table_from_rows, estimate_server_xp
+
+
+def make_stats(users=300, guilds=8, seed=1):
+    rng = random.Random(seed)
+    return {
+        str(10_000 + user): {
+            "xp": round(rng.random() * 500, 2),
+            "servers": {
+                str(90_000 + guild): {
+                    "messages": rng.randrange(100),
+                    "media": rng.randrange(10),
+                    "voiceminutes": rng.randrange(50),
+                    "xp": round(rng.random() * 100, 2),
+                }
+                for guild in rng.sample(range(guilds), rng.randrange(4))
+            },
+            "level": rng.randrange(30),
+        }
+        for user in range(users)
+    }
+
+
+def test_from_dict_round_trips():
+    stats = make_stats()
+    table = StatsTable.from_dict(stats)
+    assert len(table) == len(stats)
+    assert list(table) == list(stats)
+    assert table.to_json() == stats
+
+
+def test_from_dict_consume_empties_the_source():
+    stats = make_stats()
+    expected = {user_id: dict(user_stats) for user_id, user_stats in stats.items()}
+    table = StatsTable.from_dict(stats, consume=True)
+    assert stats == {}
+    assert table.to_json() == expected
+
+
+def test_random_operations_match_dict():
+    rng = random.Random(7)
+    reference = make_stats(users=100)
+    table = StatsTable.from_dict(reference)
+    user_ids = [str(10_000 + user) for user in range(150)]
+    guild_ids = [str(90_000 + guild) for guild in range(10)]
+
+    for step in range(5_000):
+        user_id = rng.choice(user_ids)
+        action = rng.random()
+        if action < 0.05:
+            assert table.pop(user_id) == reference.pop(user_id, None)
+        elif action < 0.10:
+            value = {"xp": 1.5, "servers": {rng.choice(guild_ids): {"messages": 3}}, "level": 2}
+            table[user_id] = value
+            reference[user_id] = {
+                "xp": 1.5,
+                "servers": {
+                    guild_id: {"messages": 3, "media": 0, "voiceminutes": 0, "xp": 0.0}
+                    for guild_id in value["servers"]
+                },
+                "level": 2,
+            }
+        else:
+            if user_id not in reference:
+                assert user_id not in table
+                reference[user_id] = {"xp": 0.0, "servers": {}, "level": 0}
+                table[user_id] = {"xp": 0.0, "servers": {}, "level": 0}
+            guild_id = rng.choice(guild_ids)
+            server = table[user_id]["servers"].setdefault(guild_id, {})
+            expected = reference[user_id]["servers"].setdefault(
+                guild_id, {"messages": 0, "media": 0, "voiceminutes": 0, "xp": 0.0}
+            )
+            server["messages"] += 1
+            server["xp"] += 0.5
+            table[user_id]["xp"] += 0.5
+            expected["messages"] += 1
+            expected["xp"] += 0.5
+            reference[user_id]["xp"] += 0.5
+
+        if step % 500 == 0:
+            table.rebuild_index()
+            assert table.to_json() == reference
+
+    assert len(table) == len(reference)
+    assert sorted(table) == sorted(reference)
+    assert table.to_json() == reference
+
+
+def test_deleting_users_keeps_rows_dense():
+    stats = make_stats(users=50)
+    table = StatsTable.from_dict(stats)
+    server_rows = len(table._s_guild)
+    victims = list(stats)[::3]
+    for user_id in victims:
+        removed = len(stats[user_id]["servers"])
+        del table[user_id]
+        del stats[user_id]
+        server_rows -= removed
+        assert len(table._user_ids) == len(table) == len(stats)
+        assert len(table._s_guild) == server_rows
+    assert table.to_json() == stats
+    for user_id in victims:
+        assert user_id not in table
+        assert table.get(user_id) is None
+    with pytest.raises(KeyError):
+        del table[victims[0]]
+
+
+def test_record_access():
+    table = StatsTable.from_dict(make_stats(users=5))
+    user = table["10000"]
+    assert set(user) == {"xp", "servers", "level"}
+    assert table.get("not a number") is None
+    assert "not a number" not in table
+    with pytest.raises(KeyError):
+        user["missing"]
+    user["level"] = 4.0
+    assert user["level"] == 4
+    servers = user["servers"]
+    server = servers.setdefault("123", None)
+    assert server.get("messages") == 0
+    assert server.get("missing", "x") == "x"
+    assert servers.get(123) is not None and "123" in servers
+    assert servers.get("abc") is None
+
+
+def test_iter_xp_and_guild_xp():
+    stats = make_stats()
+    table = StatsTable.from_dict(stats)
+    assert dict(table.iter_xp()) == {int(user_id): user_stats["xp"] for user_id, user_stats in stats.items()}
+    guild_id = "90003"
+    expected = {
+        int(user_id): user_stats["servers"][guild_id]["xp"]
+        for user_id, user_stats in stats.items()
+        if guild_id in user_stats["servers"]
+    }
+    assert dict(table.iter_guild_xp(guild_id)) == expected
+    assert list(table.iter_guild_xp("1")) == []
+
+
+def test_sqlite_rows_load_into_table(tmp_path):
+    stats = make_stats(users=80)
+    legacy_user = next(user_id for user_id, user_stats in stats.items() if user_stats["servers"])
+    legacy_guild, legacy = next(iter(stats[legacy_user]["servers"].items()))
+    legacy.pop("xp")
+    storage = SQLiteStorage(str(tmp_path / "stats.db"))
+    storage.save_stats(stats)
+    # Guild stats without a user_xp row
+    storage.conn.execute("INSERT INTO user_server_stats (user_id, guild_id, messages) VALUES (5, 90001, 2)")
+
+    table = storage.load_stats_rows(_table_from_rows)
+    legacy["xp"] = estimate_server_xp(legacy)
+    stats["5"] = {
+        "xp": 0.0,
+        "servers": {"90001": {"messages": 2, "media": 0, "voiceminutes": 0, "xp": estimate_server_xp({"messages": 2})}},
+        "level": 0,
+    }
+    assert dict(sorted(table.to_json().items())) == dict(sorted(stats.items()))
+    assert table[legacy_user]["servers"][legacy_guild]["xp"] == legacy["xp"]
+    storage.close()
+
+
+def test_service_hot_path_matches_dict():
+    services = [StatsService(flush_interval=0, flush_threshold=float("inf"), table=kind) for kind in ("dict", "columnar")]
+    services[0]._stats = make_stats(users=40)
+    services[1]._stats = StatsTable.from_dict(make_stats(users=40))
+    rng = random.Random(3)
+    operations = [(rng.randrange(10_000, 10_060), rng.randrange(90_000, 90_010)) for _ in range(2_000)]
+    for service in services:
+        for user_id, guild_id in operations:
+            user_stats = service.ensure_user(user_id)
+            server_stats = service.ensure_server(user_stats, guild_id, user_id)
+            server_stats["messages"] += 1
+            service.add_xp(user_id, user_stats, 1.5, server_stats, guild_id)
+    assert services[1].stats.to_json() == services[0].stats
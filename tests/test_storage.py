@@ -0,0 +1,63 @@
+import pytest
+
+from handlers.storage import SQLiteStorage
+
+
+@pytest.fixture
+def storage(tmp_path):
+    store = SQLiteStorage(str(tmp_path / "maggibot.db"))
+    yield store
+    store.close()
+
+
+def test_document_round_trip(storage):
+    tickets = {
+        "1": {"10": {"channel_id": 5, "open": True}, "11": {"channel_id": 6}},
+        "2": {"12": {"channel_id": 7}},
+    }
+    assert storage.save_document("tickets", tickets) == (3, 0)
+    assert storage.load_document("tickets") == tickets
+    row = storage.conn.execute("SELECT channel_id FROM tickets WHERE user_id = '12'").fetchone()
+    assert row[0] == 7
+
+
+def test_only_changed_rows_are_written(storage):
+    tickets = {"1": {"10": {"channel_id": 5}, "11": {"channel_id": 6}}, "2": {"12": {"channel_id": 7}}}
+    storage.save_document("tickets", tickets)
+    tickets["1"]["10"]["open"] = False
+    del tickets["1"]["11"]
+    assert storage.save_document("tickets", tickets, changed={"1"}) == (1, 1)
+    # Nothing changed under the other key
+    assert storage.save_document("tickets", tickets, changed={"2"}) == (0, 0)
+    del tickets["2"]
+    assert storage.save_document("tickets", tickets, changed={"2"}) == (0, 1)
+    assert storage.load_document("tickets") == tickets
+
+
+def test_full_save_drops_removed_keys(storage):
+    storage.save_document("cookies", {"1": 3, "2": 4})
+    assert storage.save_document("cookies", {"1": 3}) == (0, 1)
+    assert storage.load_document("cookies") == {"1": 3}
+
+
+def test_entries_without_rows_are_skipped(storage):
+    assert storage.save_document("tickets", {"1": {}, "2": "oops", "3": {"4": {"channel_id": 1}}}) == (1, 0)
+    assert storage.load_document("tickets") == {"3": {"4": {"channel_id": 1}}}
+
+
+def test_stats_round_trip(storage):
+    stats = {
+        "10": {"xp": 12.5, "servers": {"100": {"messages": 3, "media": 1, "voiceminutes": 2, "xp": 4.0}}, "level": 0},
+        "11": {"xp": 1.0, "servers": {}, "level": 0},
+    }
+    assert storage.save_stats(stats) == (2, 0)
+    assert storage.load_stats() == stats
+    stats.pop("11")
+    assert storage.save_stats(stats, keys={"11"}) == (0, 1)
+    assert storage.load_stats() == stats
+
+
+def test_multipliers_round_trip(storage):
+    config = {"channels": ["1", "2"], "multipliers": {"5": 1.5}}
+    storage.save_multipliers(config)
+    assert storage.load_multipliers() == config
@@ -0,0 +1,58 @@
+import pytest
+
+from handlers import voicesessions
+from handlers.voicesessions import VoiceSessions
+
+
+@pytest.fixture
+def sessions(monkeypatch):
+    saved = []
+    monkeypatch.setattr(voicesessions, "load_voice_sessions", dict)
+    monkeypatch.setattr(voicesessions, "save_voice_sessions", lambda data: saved.append(data))
+    store = VoiceSessions()
+    store.saved = saved
+    return store
+
+
+def test_accrue_credits_whole_minutes_and_keeps_the_rest(sessions):
+    sessions.start(1, 10, 100, now=0)
+    assert sessions.accrue(now=90) == [("1", "10", 100, 1)]
+    assert sessions.accrue(now=119) == []
+    assert sessions.accrue(now=120) == [("1", "10", 100, 1)]
+    assert sessions.stop(1, 10, now=200) == (100, 1)
+    assert sessions.stop(1, 10, now=200) is None
+    assert len(sessions) == 0 and sessions.sessions == {}
+
+
+def test_restore_resumes_closes_and_starts(sessions):
+    sessions.start(1, 10, 100, now=0)    # still in voice
+    sessions.start(1, 11, 100, now=0)    # left while the bot was down
+    sessions.start(2, 12, 200, now=0)    # in voice, but stale
+    sessions.accrue(now=600)
+    sessions.get(2, 12)["seen"] = 0
+
+    credits = sessions.restore({(1, 10): 101, (2, 12): 200, (3, 13): 300}, now=700, grace=300)
+    # Everything up to the last tick was credited already
+    assert credits == []
+    assert sessions.get(1, 10)["channel"] == 101
+    assert sessions.get(1, 11) is None
+    # The stale session is closed and a fresh one started
+    assert sessions.get(2, 12)["since"] == 700
+    assert sessions.get(3, 13)["since"] == 700
+    assert len(sessions) == 3
+
+
+def test_restore_credits_minutes_up_to_last_seen(sessions):
+    sessions.start(1, 10, 100, now=0)
+    sessions.get(1, 10)["seen"] = 150
+    assert sessions.restore({}, now=1000) == [("1", "10", 100, 2)]
+    assert len(sessions) == 0
+
+
+def test_save_only_when_dirty(sessions):
+    assert not sessions.save()
+    sessions.start(1, 10, 100, now=0)
+    assert sessions.save()
+    assert not sessions.save()
+    assert sessions.save(force=True)
+    assert len(sessions.saved) == 2
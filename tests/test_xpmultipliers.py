@@ -0,0 +1,25 @@
+from types import SimpleNamespace
+
+from handlers.config import XPMultiplierTable
+
+
+def roles(*role_ids):
+    return [SimpleNamespace(id=role_id) for role_id in role_ids]
+
+
+def test_resolve_picks_the_best_role_in_boosted_channels():
+    table = XPMultiplierTable()
+    table.compile({"channels": ["10", "11"], "multipliers": {"1": 1.5, "2": "3", "3": 0.5}})
+    assert table.resolve(10, roles(1, 2)) == 3.0
+    assert table.resolve(11, roles(3)) == 0.5
+    # Roles without a multiplier count as 1
+    assert table.resolve(11, roles(3, 4)) == 1
+    assert table.resolve(11, []) == 1
+    assert table.resolve(12, roles(2)) == 1
+
+
+def test_compile_replaces_the_previous_config():
+    table = XPMultiplierTable()
+    table.compile({"channels": ["10"], "multipliers": {"1": 2}})
+    table.compile({"channels": [], "multipliers": {}})
+    assert table.resolve(10, roles(1)) == 1